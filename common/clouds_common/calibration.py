@@ -0,0 +1,65 @@
+"""
+This module applies the probability calibration fitted by the pipeline's calibrate_model
+stage, in the pipeline's score_model stage and in the app alike. A calibrator is a plain
+isotonic or Platt map from model probabilities to calibrated probabilities, saved with
+the decision threshold chosen on held-out data, so applying it needs no sklearn objects.
+
+Functions:
+    logit: Maps probabilities to the logit scale.
+    apply_calibrator: Calibrates positive-class probabilities.
+    predict_calibrated: Returns calibrated probabilities and the classes at the chosen
+                        threshold.
+"""
+from typing import Tuple
+import numpy as np
+
+# Keeps probabilities of exactly 0 or 1 finite on the logit scale
+LOGIT_EPSILON = 1e-6
+
+
+def logit(prob: np.ndarray) -> np.ndarray:
+    """
+    Map probabilities to the logit scale.
+
+    Args:
+        prob (np.ndarray): The probabilities.
+
+    Returns:
+        np.ndarray: log(p / (1 - p)) of the probabilities clipped to [eps, 1 - eps].
+    """
+    prob = np.clip(prob, LOGIT_EPSILON, 1 - LOGIT_EPSILON)
+    return np.log(prob / (1 - prob))
+
+
+def apply_calibrator(calibrator: dict, prob: np.ndarray) -> np.ndarray:
+    """
+    Calibrate positive-class probabilities.
+
+    Args:
+        calibrator (dict): The "isotonic" (x, y) or "platt" (a, b) parameters.
+        prob (np.ndarray): The model's positive-class probabilities.
+
+    Returns:
+        np.ndarray: The calibrated probabilities.
+    """
+    prob = np.asarray(prob, dtype=np.float64)
+    if calibrator["method"] == "isotonic":
+        # np.interp holds the end values outside the fitted range, like out_of_bounds="clip"
+        return np.interp(prob, calibrator["x"], calibrator["y"])
+    return 1.0 / (1.0 + np.exp(-(calibrator["a"] * logit(prob) + calibrator["b"])))
+
+
+def predict_calibrated(calibration: dict, prob: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calibrate positive-class probabilities and classify them at the chosen threshold.
+
+    Args:
+        calibration (dict): The calibrator, threshold and class labels of a model.
+        prob (np.ndarray): The model's positive-class probabilities.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Calibrated probabilities and predicted classes.
+    """
+    prob = apply_calibrator(calibration["calibrator"], prob)
+    negative, positive = calibration["classes"]
+    return prob, np.where(prob >= calibration["threshold"], positive, negative)
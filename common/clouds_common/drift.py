@@ -0,0 +1,67 @@
+"""
+This module holds the drift statistics shared by the pipeline's monitor_drift stage and
+the app's online drift monitor. Both compare counts on the quantile bins of the reference
+sketch that the pipeline ships with each model, so a batch and an online window are
+binned and scored the same way.
+
+Functions:
+    bin_positions: Maps values to their bins of a sketch.
+    histogram: Counts values in the bins of a sketch.
+    psi_ks: Computes the population stability index and KS statistic of two histograms.
+"""
+from typing import Tuple
+import numpy as np
+
+# Keeps empty bins from producing infinite PSI terms
+PSI_EPSILON = 1e-4
+
+
+def bin_positions(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Map values to their bins.
+
+    Args:
+        values (np.ndarray): The values, a scalar or an array.
+        edges (np.ndarray): The inner bin edges of a sketch.
+
+    Returns:
+        np.ndarray: The bin of each value, 0 and edges.size for the open tails.
+    """
+    return np.searchsorted(edges, values, side="right")
+
+
+def histogram(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Count values in the bins delimited by the inner edges, plus two open tails.
+
+    Args:
+        values (np.ndarray): The finite values.
+        edges (np.ndarray): The inner bin edges of a sketch.
+
+    Returns:
+        np.ndarray: edges.size + 1 counts.
+    """
+    return np.bincount(bin_positions(values, edges), minlength=edges.size + 1)
+
+
+def psi_ks(reference: np.ndarray, current: np.ndarray) -> Tuple[float, float]:
+    """
+    Compare the bin counts of current values with those of the reference.
+
+    Args:
+        reference (np.ndarray): The reference counts per bin.
+        current (np.ndarray): The current counts on the same bins.
+
+    Returns:
+        Tuple[float, float]: The population stability index and the KS statistic
+                             over the bin edges.
+    """
+    ref = np.asarray(reference, dtype=np.float64)
+    cur = np.asarray(current, dtype=np.float64)
+    ref_share = ref / max(ref.sum(), 1)
+    cur_share = cur / max(cur.sum(), 1)
+    psi_ref = np.maximum(ref_share, PSI_EPSILON)
+    psi_cur = np.maximum(cur_share, PSI_EPSILON)
+    psi = float(((psi_cur - psi_ref) * np.log(psi_cur / psi_ref)).sum())
+    ks = float(np.abs(np.cumsum(ref_share) - np.cumsum(cur_share)).max())
+    return psi, ks
@@ -0,0 +1,60 @@
+"""
+This module holds the tree path attributions shared by the pipeline's explain_model
+stage and the app's explanations. Moving from a parent node to a child changes the
+predicted positive-class probability; that change is credited to the parent's split
+feature, so the bias plus the attributions of a row add up to the model's prediction.
+
+Functions:
+    is_explainable: Tells whether the attributions of a model are supported.
+    tree_edges: Derives the root probability and the change credited per node of a tree.
+"""
+from typing import Any, Tuple
+import numpy as np
+from scipy import sparse
+
+
+def is_explainable(model: Any) -> bool:
+    """
+    Tell whether a model is a decision tree classifier or a random or extra trees
+    forest of them. Boosted ensembles hold regression trees or weighted votes, whose
+    leaves are not class probabilities.
+
+    Args:
+        model (Any): A fitted model.
+
+    Returns:
+        bool: True if tree path attributions support the model.
+    """
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    return isinstance(model, (DecisionTreeClassifier, RandomForestClassifier, ExtraTreesClassifier))
+
+
+def tree_edges(tree: Any, n_features: int) -> Tuple[float, sparse.csr_matrix]:
+    """
+    Attribute every node of a tree to the feature split on to reach it.
+
+    Args:
+        tree (Any): A fitted sklearn decision tree classifier.
+        n_features (int): The number of model features.
+
+    Returns:
+        Tuple[float, sparse.csr_matrix]: The positive-class probability at the root and
+                                         the (n_nodes, n_features) change credited per node.
+    """
+    tree_ = tree.tree_
+    value = tree_.value[:, 0, :]
+    prob = value[:, -1] / value.sum(axis=1)
+
+    parent = np.full(tree_.node_count, -1)
+    internal = np.flatnonzero(tree_.children_left >= 0)
+    parent[tree_.children_left[internal]] = internal
+    parent[tree_.children_right[internal]] = internal
+
+    nodes = np.flatnonzero(parent >= 0)
+    edges = sparse.csr_matrix(
+        (prob[nodes] - prob[parent[nodes]], (nodes, tree_.feature[parent[nodes]])),
+        shape=(tree_.node_count, n_features),
+    )
+    return float(prob[0]), edges
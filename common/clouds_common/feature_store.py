@@ -0,0 +1,64 @@
+"""
+This module holds the layout and the point lookups of the feature tables written by the
+pipeline's generate_features stage and read by the pipeline and the app. A table version
+is a directory with the features in Parquet sorted by primary key, the sorted keys as a
+.npy index and a yaml description; a lookup searches the key index and reads only the
+row groups holding the requested rows.
+
+Functions:
+    key_positions: Finds the positions of primary keys in the sorted key index.
+    read_rows: Reads the rows at sorted-table positions, only from their row groups.
+"""
+from typing import Any, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+TABLE_FILE = "table.yaml"
+KEYS_FILE = "keys.npy"
+DATA_FILE = "features.parquet"
+
+
+def key_positions(index: np.ndarray, keys: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find primary keys in the sorted key index of a table.
+
+    Args:
+        index (np.ndarray): The sorted keys of the table, e.g. memory-mapped.
+        keys (array-like): The primary keys to find.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The positions of the found keys in the order of
+                                       keys, and whether each key was found.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    positions = np.searchsorted(index, keys)
+    found = positions < len(index)
+    found[found] = index[positions[found]] == keys[found]
+    return positions[found], found
+
+
+def read_rows(
+    parquet: Any, key: str, row_group_size: int, positions: np.ndarray, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Read the rows at sorted-table positions, reading only their row groups.
+
+    Args:
+        parquet (pyarrow.parquet.ParquetFile): The features of the table.
+        key (str): The name of the key column.
+        row_group_size (int): The rows per row group of the table.
+        positions (np.ndarray): The positions of the rows in the table.
+        columns (List[str], optional): The columns to read, all by default.
+
+    Returns:
+        pd.DataFrame: The rows in the order of positions, indexed by key.
+    """
+    groups = np.unique(positions // row_group_size)
+    columns = None if columns is None else [key] + list(columns)
+    if len(groups) == 0:
+        empty = parquet.schema_arrow.empty_table().to_pandas()
+        return empty[columns or empty.columns].set_index(key)
+    frame = parquet.read_row_groups(groups.tolist(), columns=columns).to_pandas()
+    # Position of each requested row within the row groups read
+    starts = np.searchsorted(groups, positions // row_group_size)
+    return frame.iloc[starts * row_group_size + positions % row_group_size].set_index(key)
@@ -0,0 +1,462 @@
+"""
+This module gives the pipeline and the app one interface to the stores their artifacts
+live in: a local directory, S3 or memory. Objects are read and written as streams copied
+in blocks, so no file is held in memory whole, and a file is always written aside and
+renamed into place, so a failed transfer never leaves a partial file. An S3 store shares
+one client whose connection pool is reused by every thread.
+
+Classes:
+    Storage: Flat key -> bytes store with streaming reads and writes.
+    LocalStorage: Objects as files under a root directory.
+    MemoryStorage: Objects held in a dict, for tests and throwaway runs.
+    S3Storage: Objects under a prefix of an S3 bucket, over a pooled client.
+    CachedStorage: Read-through, write-through local copy of another store.
+
+Functions:
+    snapshot: Size and modification time of every file under a directory.
+    open_storage: Opens the store of a URI.
+    fetch: Copies the objects missing from local paths in parallel.
+"""
+import abc
+import io
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("clouds")
+
+# Size and modification time of a local file, enough to notice it was rewritten
+Stamp = Tuple[int, int]
+
+
+class Storage(abc.ABC):
+    """
+    Flat key -> bytes store; keys are "/" separated paths relative to the root.
+
+    Subclasses implement open_read, open_write, list and delete. Files are copied in
+    blocks through the streams, so no object is held in memory whole.
+    """
+
+    @abc.abstractmethod
+    def open_read(self, key: str) -> BinaryIO:
+        """Binary stream of an object; raises FileNotFoundError if it is missing"""
+
+    @abc.abstractmethod
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        """Context manager of a binary stream that replaces the object when the block
+        exits without error"""
+
+    @abc.abstractmethod
+    def list(self, prefix: str = "") -> Dict[str, int]:
+        """Key -> size in bytes of every object whose key starts with prefix"""
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove an object; missing objects are ignored"""
+
+    def exists(self, key: str) -> bool:
+        """Whether the object exists"""
+        return key in self.list(key)
+
+    def get_file(self, key: str, path: Path) -> None:
+        """Stream an object to a local file, written aside and renamed into place"""
+        path = Path(path)
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        try:
+            with self.open_read(key) as source, open(partial, "wb") as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+
+    def put_file(self, path: Path, key: str) -> None:
+        """Stream a local file to an object"""
+        with open(path, "rb") as source, self.open_write(key) as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+
+
+class LocalStorage(Storage):
+    """
+    Objects as files under a root directory.
+
+    Args:
+        root (Path): The directory holding the objects, created on first write.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        """The file of an object"""
+        return self.root / key
+
+    def open_read(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Readers never see a partial file: write aside, then rename over it
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        try:
+            with open(partial, "wb") as file:
+                yield file
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+
+    def list(self, prefix: str = "") -> Dict[str, int]:
+        if not self.root.is_dir():
+            return {}
+        objects = {}
+        for path in self.root.rglob("*"):
+            key = path.relative_to(self.root).as_posix()
+            if path.is_file() and key.startswith(prefix) and not path.name.endswith(".part"):
+                objects[key] = path.stat().st_size
+        return objects
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+
+class MemoryStorage(Storage):
+    """
+    Objects held in a dict, for tests and throwaway runs.
+    """
+
+    def __init__(self):
+        self.objects: Dict[str, bytes] = {}
+
+    def open_read(self, key: str) -> BinaryIO:
+        if key not in self.objects:
+            raise FileNotFoundError(key)
+        return io.BytesIO(self.objects[key])
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        buffer = io.BytesIO()
+        yield buffer
+        self.objects[key] = buffer.getvalue()
+
+    def list(self, prefix: str = "") -> Dict[str, int]:
+        return {key: len(data) for key, data in self.objects.items() if key.startswith(prefix)}
+
+    def delete(self, key: str) -> None:
+        self.objects.pop(key, None)
+
+    def exists(self, key: str) -> bool:
+        return key in self.objects
+
+
+class S3Storage(Storage):
+    """
+    Objects under a prefix of an S3 bucket.
+
+    The client is shared by every thread and keeps up to max_pool_connections
+    connections open, so parallel transfers reuse connections instead of opening one
+    per request; files above multipart_threshold move as concurrent parts.
+
+    Args:
+        bucket (str): The bucket name.
+        prefix (str): The key prefix of the objects.
+        max_pool_connections (int): The connections kept open.
+        multipart_threshold (int): The bytes above which transfers use parts.
+        client (optional): A boto3 S3 client to use instead of a new pooled one.
+        metrics (optional): Counts the transferred bytes and objects, e.g. the METRICS
+                            registry of an app's telemetry module.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        max_pool_connections: int = 16,
+        multipart_threshold: int = 8 << 20,
+        client: Optional[Any] = None,
+        metrics: Optional[Any] = None,
+    ):
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            client = boto3.client(
+                "s3",
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={"max_attempts": 5, "mode": "standard"},
+                ),
+            )
+        self.client = client
+        self.metrics = metrics
+        # Part transfers of one file share the same pool
+        self.transfer = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            max_concurrency=max(1, max_pool_connections // 2),
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _missing(self, error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("NoSuchKey", "404", "NotFound")
+
+    def _uploaded(self, size: int) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("s3_bytes_uploaded_total", size)
+            self.metrics.inc("s3_objects_uploaded_total")
+
+    def open_read(self, key: str) -> BinaryIO:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e_1:
+            if self._missing(e_1):
+                raise FileNotFoundError(f"s3://{self.bucket}/{self._key(key)}") from e_1
+            raise
+        # The body streams from the open connection as it is read
+        return response["Body"]
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        # Small objects stay in memory, large ones spill to a temporary file
+        with tempfile.SpooledTemporaryFile(max_size=self.transfer.multipart_threshold) as buffer:
+            yield buffer
+            size = buffer.tell()
+            buffer.seek(0)
+            self.client.upload_fileobj(buffer, self.bucket, self._key(key), Config=self.transfer)
+        self._uploaded(size)
+
+    def get_file(self, key: str, path: Path) -> None:
+        # boto3 downloads to a temporary name and renames it into place, and reports
+        # the bytes of every chunk it transfers to the callback
+        chunks = []
+        start = time.perf_counter()
+        try:
+            self.client.download_file(
+                self.bucket, self._key(key), str(path), Config=self.transfer, Callback=chunks.append
+            )
+        except Exception as e_1:
+            if self._missing(e_1):
+                raise FileNotFoundError(f"s3://{self.bucket}/{self._key(key)}") from e_1
+            raise
+        if self.metrics is not None:
+            self.metrics.inc("s3_bytes_downloaded_total", sum(chunks))
+            self.metrics.observe("s3_download_seconds", time.perf_counter() - start)
+
+    def put_file(self, path: Path, key: str) -> None:
+        with open(path, "rb") as file:
+            self.client.upload_fileobj(file, self.bucket, self._key(key), Config=self.transfer)
+        self._uploaded(Path(path).stat().st_size)
+
+    def list(self, prefix: str = "") -> Dict[str, int]:
+        root = f"{self.prefix}/" if self.prefix else ""
+        objects = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=root + prefix):
+            for obj in page.get("Contents", []):
+                objects[obj["Key"][len(root) :]] = obj["Size"]
+        return objects
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e_1:
+            if self._missing(e_1):
+                return False
+            raise
+        return True
+
+
+class CachedStorage(Storage):
+    """
+    Read-through, write-through local copy of another store.
+
+    Reads are served from files under cache_dir, fetched from the remote store on first
+    use; writes go to the cache and then to the remote store. The cached files are plain
+    paths, so code that only works with paths (joblib, pandas, matplotlib) can use them
+    directly.
+
+    Args:
+        remote (Storage): The store holding the objects.
+        cache_dir (Path): The directory of the local copies, keyed like the store.
+        workers (int): The threads of prefetch and push.
+        metrics (optional): Counts cache hits and misses, e.g. the METRICS registry of
+                            an app's telemetry module.
+    """
+
+    def __init__(self, remote: Storage, cache_dir: Path, workers: int = 8, metrics: Optional[Any] = None):
+        self.remote = remote
+        self.cache = LocalStorage(cache_dir)
+        self.workers = workers
+        self.metrics = metrics
+
+    def local_path(self, key: str) -> Path:
+        """Path of the cached copy of an object, fetched if it is not cached yet"""
+        path = self.cache.path(key)
+        hit = path.is_file()
+        if self.metrics is not None:
+            self.metrics.inc("storage_cache_hits_total" if hit else "storage_cache_misses_total")
+        if not hit:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.remote.get_file(key, path)
+        return path
+
+    def open_read(self, key: str) -> BinaryIO:
+        return open(self.local_path(key), "rb")
+
+    @contextmanager
+    def open_write(self, key: str) -> Iterator[BinaryIO]:
+        with self.cache.open_write(key) as file:
+            yield file
+        self.remote.put_file(self.cache.path(key), key)
+
+    def list(self, prefix: str = "") -> Dict[str, int]:
+        return self.remote.list(prefix)
+
+    def delete(self, key: str) -> None:
+        self.cache.delete(key)
+        self.remote.delete(key)
+
+    def exists(self, key: str) -> bool:
+        return self.cache.exists(key) or self.remote.exists(key)
+
+    def prefetch(self, keys: Iterable[str]) -> List[Path]:
+        """
+        Fetch objects missing from the cache in parallel.
+
+        Args:
+            keys (Iterable[str]): The keys to have cached.
+
+        Returns:
+            List[Path]: The cached path of each key, in order.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch") as pool:
+            return list(pool.map(self.local_path, keys))
+
+    def pull(self) -> Dict[str, Stamp]:
+        """
+        Fetch every remote object missing from the cache.
+
+        Returns:
+            Dict[str, Stamp]: The stamps of the cached files matching their remote copy,
+                              for push.
+        """
+        remote = self.remote.list()
+        self.prefetch(key for key in remote if not self.cache.exists(key))
+        stamps = snapshot(self.cache.root)
+        return {key: stamp for key, stamp in stamps.items() if remote.get(key) == stamp[0]}
+
+    def push(self, pushed: Dict[str, Stamp]) -> Dict[str, Stamp]:
+        """
+        Write the files added or changed in the cache since the last push to the remote
+        store in parallel, and delete the remote copies of files removed since.
+
+        Args:
+            pushed (Dict[str, Stamp]): The stamps returned by the previous push or pull.
+
+        Returns:
+            Dict[str, Stamp]: The stamps of every file now in the remote store.
+        """
+        current = snapshot(self.cache.root)
+        changed = [key for key, stamp in current.items() if pushed.get(key) != stamp]
+        removed = [key for key in pushed if key not in current]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="push") as pool:
+            list(pool.map(lambda key: self.remote.put_file(self.cache.path(key), key), changed))
+            list(pool.map(self.remote.delete, removed))
+        if changed or removed:
+            logger.info(
+                "Stored %(n)s changed and removed %(r)s artifacts",
+                {"n": len(changed), "r": len(removed)},
+                extra={"stored": changed, "removed": removed},
+            )
+        return current
+
+
+def snapshot(root: Path) -> Dict[str, Stamp]:
+    """Size and modification time of every file under a directory, keyed like a store"""
+    root = Path(root)
+    stamps = {}
+    for path in root.rglob("*") if root.is_dir() else []:
+        if path.is_file() and not path.name.endswith(".part"):
+            stat = path.stat()
+            stamps[path.relative_to(root).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+    return stamps
+
+
+def open_storage(uri: str, **options) -> Storage:
+    """
+    Open the store of a URI.
+
+    Args:
+        uri (str): "s3://bucket/prefix", "memory://" or a local directory, optionally
+                   "file://" prefixed.
+        **options: S3Storage settings, e.g. max_pool_connections or metrics.
+
+    Returns:
+        Storage: The store.
+    """
+    uri = str(uri)
+    if uri.startswith("s3://"):
+        bucket, _, prefix = uri[len("s3://") :].partition("/")
+        return S3Storage(bucket, prefix, **options)
+    if uri.startswith("memory://"):
+        return MemoryStorage()
+    if uri.startswith("file://"):
+        uri = uri[len("file://") :]
+    return LocalStorage(Path(uri))
+
+
+def fetch(
+    store: Storage, targets: Dict[str, Path], workers: int = 8, refresh: bool = False
+) -> List[str]:
+    """
+    Copy the objects of a store that are missing from their local paths, in parallel.
+
+    Existing local files are kept unless refresh is set, so local copies act as a
+    read-through cache.
+
+    Args:
+        store (Storage): The store holding the objects.
+        targets (Dict[str, Path]): The object key -> local path.
+        workers (int): The threads fetching at once.
+        refresh (bool): Whether to fetch objects already copied too.
+
+    Returns:
+        List[str]: The keys fetched.
+    """
+    missing = {
+        key: Path(path) for key, path in targets.items() if refresh or not Path(path).exists()
+    }
+
+    def fetch_one(key: str) -> None:
+        missing[key].parent.mkdir(parents=True, exist_ok=True)
+        store.get_file(key, missing[key])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fetch") as pool:
+        list(pool.map(fetch_one, missing))
+    if missing:
+        logger.info(
+            "Fetched %(n)s files in %(sec).2fs",
+            {"n": len(missing), "sec": time.perf_counter() - start},
+            extra={"keys": list(missing), "cached": len(targets) - len(missing)},
+        )
+    return list(missing)
@@ -0,0 +1,192 @@
+"""
+This module holds the logging and metrics core of the pipeline and the app. Log records
+are written as JSON lines by queued handlers, so callers never wait on file or stream
+writes. Counters and histograms are kept in memory and written as JSON or in the
+Prometheus text format; each app keeps one process-wide registry.
+
+Classes:
+    JsonFormatter: Formats log records as JSON objects, including fields passed
+                   with `extra`.
+    MetricsRegistry: Thread-safe counters and fixed-bucket histograms.
+
+Functions:
+    start_queue_logging: Moves the handlers of the given loggers behind a queue
+                         drained by a listener thread.
+    stop_queue_logging: Flushes and stops the listeners.
+"""
+import atexit
+import bisect
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line
+    Fields passed with `extra={...}` are added to the object, so values such as
+    stage names and durations can be aggregated without parsing the message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def start_queue_logging(names: Sequence[str] = ("", "clouds")) -> List[QueueListener]:
+    """Move the handlers of the given loggers behind a queue
+    Logging calls only put the record on an in-memory queue; a listener thread
+    per logger formats it and writes it to the original handlers, so file and
+    stream writes never block the caller.
+    Args:
+        names (sequence of str): logger names, "" for the root logger
+
+    Returns:
+        list: the started listeners, also stopped (and flushed) at exit
+    """
+    listeners = []
+    for name in names:
+        target = logging.getLogger(name)
+        handlers = [h for h in target.handlers if not isinstance(h, QueueHandler)]
+        if not handlers:
+            continue
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, *handlers, respect_handler_level=True)
+        target.handlers = [QueueHandler(records)]
+        listener.start()
+        atexit.register(listener.stop)
+        listeners.append(listener)
+    return listeners
+
+
+def stop_queue_logging(listeners: List[QueueListener]) -> None:
+    """Flush and stop listeners started by start_queue_logging before exit"""
+    for listener in listeners:
+        listener.stop()
+        atexit.unregister(listener.stop)
+
+
+def _label_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe counters and fixed-bucket histograms
+
+    Series are keyed by metric name plus labels. Snapshots can be written as
+    JSON or in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, dict]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        """Add value to a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(
+        self, name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels
+    ) -> None:
+        """Record one observation in a histogram; the buckets of a name are fixed on first use"""
+        key = _label_key(labels)
+        with self._lock:
+            bounds = self._buckets.setdefault(name, tuple(buckets))
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = {"counts": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+            hist["counts"][bisect.bisect_left(bounds, value)] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of the block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        """Copy of all series as plain data"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {}
+            for name, series in self._histograms.items():
+                bounds = list(self._buckets[name])
+                histograms[name] = [
+                    {
+                        "labels": dict(key),
+                        "buckets": bounds,
+                        "counts": list(hist["counts"]),
+                        "sum": hist["sum"],
+                        "count": hist["count"],
+                    }
+                    for key, hist in series.items()
+                ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format"""
+
+        def fmt(labels: dict, **more) -> str:
+            pairs = {**labels, **more}
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}"
+
+        snap = self.snapshot()
+        lines = []
+        for name, series in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {name} counter")
+            lines += [f"{name}{fmt(s['labels'])} {s['value']:g}" for s in series]
+        for name, series in sorted(snap["histograms"].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for s in series:
+                cumulative = 0
+                for bound, count in zip(s["buckets"] + ["+Inf"], s["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt(s['labels'], le=bound)} {cumulative}")
+                lines.append(f"{name}_sum{fmt(s['labels'])} {s['sum']:g}")
+                lines.append(f"{name}_count{fmt(s['labels'])} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path) -> None:
+        """Write a JSON snapshot to path and the Prometheus text next to it (.prom)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.snapshot(), file, indent=1)
+        with open(path.with_suffix(".prom"), "w") as file:
+            file.write(self.to_prometheus())
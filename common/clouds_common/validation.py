@@ -0,0 +1,186 @@
+"""
+This module compiles the declarative column schema of the validation sections of the
+pipeline and the app into vectorized NumPy checks. Each column spec (dtype, range,
+nullability, allowed values) is compiled once, and a block of rows is validated in one
+pass over its columns.
+
+Classes:
+    Rule: One compiled check of a column.
+    ValidationResult: The bad row mask and violation counts of a block of rows.
+
+Functions:
+    compile_schema: Compiles column specs into rules.
+    column_values: Reads a column of a DataFrame as float64 values.
+    validate: Checks a block of rows against compiled rules.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("clouds")
+
+RULE_KEYS = {"dtype", "min", "max", "min_exclusive", "max_exclusive", "nullable", "finite", "allowed"}
+
+
+@dataclass
+class Rule:
+    """
+    One compiled check of a column.
+
+    Attributes:
+        column (str): The column checked.
+        name (str): The rule name, e.g. "min" or "nullable".
+        bad (Callable): Maps the float64 column values to a mask of violating rows.
+    """
+
+    column: str
+    name: str
+    bad: Callable[[np.ndarray], np.ndarray]
+
+    @property
+    def label(self) -> str:
+        """The column and rule name, e.g. "log_entropy.max\""""
+        return f"{self.column}.{self.name}"
+
+
+@dataclass
+class ValidationResult:
+    """
+    The outcome of checking a block of rows.
+
+    Attributes:
+        bad (np.ndarray): True for rows violating any rule.
+        counts (Dict[str, int]): The rows violating each rule, every rule listed.
+        masks (Dict[str, np.ndarray]): The violating rows of the rules with violations.
+    """
+
+    bad: np.ndarray
+    counts: Dict[str, int]
+    masks: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def n_bad(self) -> int:
+        """The number of rows violating any rule"""
+        return int(self.bad.sum())
+
+    def reasons(self) -> np.ndarray:
+        """
+        List the rules each row violates.
+
+        Returns:
+            np.ndarray: Comma separated rule labels per row, empty for valid rows.
+        """
+        reasons = [[] for _ in range(len(self.bad))]
+        for label, mask in self.masks.items():
+            for i in np.flatnonzero(mask):
+                reasons[i].append(label)
+        return np.array([",".join(reason) for reason in reasons], dtype=object)
+
+
+def _compile_column(column: str, spec: dict) -> List[Rule]:
+    """Rules of one column spec, nulls excluded from the value rules"""
+    unknown = set(spec) - RULE_KEYS
+    if unknown:
+        logger.error("Unknown rules %(r)s for column %(c)s", {"r": sorted(unknown), "c": column})
+        raise NotImplementedError
+    rules = []
+    if not spec.get("nullable", False):
+        rules.append(Rule(column, "nullable", np.isnan))
+    if spec.get("finite", True):
+        rules.append(Rule(column, "finite", np.isinf))
+    dtype = spec.get("dtype", "float")
+    if dtype == "int":
+        rules.append(Rule(column, "dtype", lambda v: np.isfinite(v) & (v != np.round(v))))
+    elif dtype != "float":
+        logger.error("Column %(c)s has unsupported dtype %(d)s", {"c": column, "d": dtype})
+        raise NotImplementedError
+    # Comparisons with NaN are False, so nulls never count as out of range
+    if spec.get("min") is not None:
+        low = float(spec["min"])
+        if spec.get("min_exclusive", False):
+            rules.append(Rule(column, "min", lambda v: v <= low))
+        else:
+            rules.append(Rule(column, "min", lambda v: v < low))
+    if spec.get("max") is not None:
+        high = float(spec["max"])
+        if spec.get("max_exclusive", False):
+            rules.append(Rule(column, "max", lambda v: v >= high))
+        else:
+            rules.append(Rule(column, "max", lambda v: v > high))
+    if spec.get("allowed") is not None:
+        allowed = np.asarray(spec["allowed"], dtype=np.float64)
+        rules.append(Rule(column, "allowed", lambda v: ~np.isin(v, allowed) & ~np.isnan(v)))
+    return rules
+
+
+def compile_schema(schema: Dict[str, Optional[dict]]) -> List[Rule]:
+    """
+    Compile column specs into vectorized rules.
+
+    Args:
+        schema (Dict): Column to spec with any of dtype ("float" or "int"), min, max,
+                       min_exclusive, max_exclusive (bounds are inclusive by default),
+                       nullable (default False), finite (default True) and allowed values.
+                       An empty spec checks that values are present and finite.
+
+    Returns:
+        List[Rule]: The rules in schema order.
+    """
+    rules = []
+    for column, spec in schema.items():
+        rules.extend(_compile_column(column, spec or {}))
+    return rules
+
+
+def column_values(rows: pd.DataFrame, column: str) -> np.ndarray:
+    """
+    Read a column as float64 values, a view when already float64.
+
+    Args:
+        rows (pd.DataFrame): The rows.
+        column (str): The column name.
+
+    Returns:
+        np.ndarray: The values, NaN for missing values and text that is not a number.
+    """
+    values = rows[column]
+    if not pd.api.types.is_numeric_dtype(values):
+        # Text that does not parse as a number becomes NaN and fails "nullable"
+        values = pd.to_numeric(values, errors="coerce")
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def validate(
+    rows: Any,
+    rules: List[Rule],
+    values: Callable[[Any, str], np.ndarray] = column_values,
+) -> ValidationResult:
+    """
+    Check a block of rows against compiled rules, one column at a time.
+
+    Args:
+        rows (Any): The rows, holding every column of the rules; a DataFrame unless
+                    values reads another container.
+        rules (List[Rule]): The output of compile_schema.
+        values (Callable, optional): Reads a column of rows as float64 values.
+                                     Defaults to column_values.
+
+    Returns:
+        ValidationResult: The bad row mask and violation counts per rule.
+    """
+    bad = np.zeros(len(rows), dtype=bool)
+    counts, masks = {}, {}
+    column, current = None, None
+    with np.errstate(invalid="ignore"):
+        for rule in rules:
+            if rule.column != current:
+                column, current = values(rows, rule.column), rule.column
+            mask = rule.bad(column)
+            count = int(np.count_nonzero(mask))
+            counts[rule.label] = count
+            if count:
+                masks[rule.label] = mask
+                bad |= mask
+    return ValidationResult(bad=bad, counts=counts, masks=masks)
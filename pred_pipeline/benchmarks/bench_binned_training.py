@@ -0,0 +1,79 @@
+"""Training time and accuracy of exact versus binned tree models.
+
+The dataset is tiled with a small jitter on the raw columns, so tiles are not
+exact copies, and split as train_model does. Each model is trained through
+train_model in exact mode and in binned mode; binned mode runs once with an
+empty bin cache ("cold") and once reusing the cached codes ("warm"). Run from
+the pred_pipeline directory:
+
+    python benchmarks/bench_binned_training.py --scale 200 --trees 50
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import yaml
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import create_dataset as cd  # noqa: E402
+from src import generate_features as gf  # noqa: E402
+from src import train_model as tm  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--raw", default="artifacts/1683774570/data/raw/clouds.data")
+    parser.add_argument("--scale", type=int, default=200, help="Times to tile the dataset")
+    parser.add_argument("--trees", type=int, default=50, help="Trees in the forest")
+    parser.add_argument("--max-bins", type=int, default=255)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    base = cd.create_dataset(Path(args.raw), config["create_dataset"])
+    frame = base.loc[np.tile(base.index.to_numpy(), args.scale)].reset_index(drop=True)
+    columns = config["generate_features"]["feature_col"]
+    rng = np.random.default_rng(0)
+    frame[columns] = frame[columns] * rng.normal(1.0, 0.01, size=(len(frame), len(columns)))
+    features = gf.generate_features(frame, config["generate_features"])
+    features = features[np.isfinite(features[config["train_model"]["initial_features"]]).all(axis=1)]
+
+    models = {
+        "random forest": {
+            "type": "RandomForestClassifier",
+            "hyperparam": {"n_estimators": args.trees, "max_depth": None, "n_jobs": 1, "random_state": 0},
+        },
+        "hist gradient boosting": {
+            "type": "HistGradientBoostingClassifier",
+            "hyperparam": {"max_iter": 200, "early_stopping": False, "random_state": 0},
+        },
+    }
+    print(f"{len(features):,} rows, {args.max_bins} bins per feature")
+    print(f"  {'model':>22s} {'mode':>11s} {'train s':>8s} {'roc auc':>8s} {'accuracy':>8s}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, model_config in models.items():
+            for mode in ("exact", "binned cold", "binned warm"):
+                train_config = dict(
+                    config["train_model"],
+                    model_config=dict(config["train_model"]["model_config"], **model_config),
+                    mode=mode.split()[0],
+                    binning={"max_bins": args.max_bins, "subsample": 200_000, "cache_dir": cache_dir},
+                )
+                if mode == "binned cold":
+                    for entry in Path(cache_dir).iterdir():
+                        for file in entry.iterdir():
+                            file.unlink()
+                        entry.rmdir()
+                start = time.perf_counter()
+                model, _, test, _ = tm.train_model(features, train_config)
+                seconds = time.perf_counter() - start
+                x_test = test[train_config["initial_features"]]
+                y_test = test[train_config["target"]]
+                auc = roc_auc_score(y_test, model.predict_proba(x_test)[:, 1])
+                accuracy = accuracy_score(y_test, model.predict(x_test))
+                print(f"  {name:>22s} {mode:>11s} {seconds:8.2f} {auc:8.4f} {accuracy:8.4f}")
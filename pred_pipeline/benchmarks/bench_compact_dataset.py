@@ -0,0 +1,66 @@
+"""Memory and throughput of the compact dataset against the float64 DataFrame path.
+
+The clouds dataset is tiled `--scale` times to emulate a larger archive. Run
+from the pred_pipeline directory:
+
+    python benchmarks/bench_compact_dataset.py --scale 500
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import compact_dataset as cds  # noqa: E402
+from src import create_dataset as cd  # noqa: E402
+from src import generate_features as gf  # noqa: E402
+from src import train_model as tm  # noqa: E402
+
+
+def measure(label: str, func):
+    """Run func under tracemalloc and report wall time and peak allocation"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:28s} {elapsed * 1000:9.1f} ms   peak {peak / 2**20:8.1f} MiB")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--raw", default="artifacts/1683774570/data/raw/clouds.data")
+    parser.add_argument("--scale", type=int, default=200, help="Times to tile the dataset")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    # Keep the forest small so the benchmark measures data handling more than tree building
+    train_config = dict(config["train_model"])
+    train_config["model_config"] = dict(train_config["model_config"], hyperparam={"n_estimators": 5, "max_depth": 8})
+
+    base = cd.create_dataset(Path(args.raw), config["create_dataset"])
+    columns = config["create_dataset"]["data"]["columns"]
+    frame = base.loc[np.tile(base.index.to_numpy(), args.scale)].reset_index(drop=True)
+    raw_values = frame[columns].to_numpy()
+    raw_labels = frame["class"].to_numpy()
+    reserve = len(config["generate_features"]["feature_eng"])
+    print(f"{len(frame):,} rows")
+
+    print("float64 DataFrame")
+    features = measure("generate_features", lambda: gf.generate_features(frame, config["generate_features"]))
+    print(f"  {'resident size':28s} {features.memory_usage(deep=True).sum() / 2**20:9.1f} MiB")
+    measure("train_model", lambda: tm.train_model(features, train_config))
+
+    print("compact float32 / uint8")
+    compact = measure("build compact", lambda: cds.from_arrays(raw_values, columns, raw_labels, "class", reserve))
+    measure("generate_features", lambda: gf.generate_features(compact, config["generate_features"]))
+    print(f"  {'resident size':28s} {compact.nbytes / 2**20:9.1f} MiB")
+    measure("train_model", lambda: tm.train_model(compact, train_config))
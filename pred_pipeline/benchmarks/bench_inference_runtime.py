@@ -0,0 +1,92 @@
+"""Cold start and per-call latency of the pickled sklearn model against its ONNX export.
+
+Cold start runs each runtime in a fresh interpreter: import, load the model and score
+one row. Latency is the median over repeated calls on one row and on a batch. Run from
+the pred_pipeline directory after the export_model stage:
+
+    python benchmarks/bench_inference_runtime.py --model-dir artifacts/<run>/model_artifacts
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import yaml
+
+SKLEARN_COLD = """
+import time; start = time.perf_counter()
+import joblib, pandas as pd
+model = joblib.load({model!r})
+model.predict_proba(pd.DataFrame([[0.0] * {n}], columns={features!r}))
+print(time.perf_counter() - start)
+"""
+
+ONNX_COLD = """
+import time; start = time.perf_counter()
+import numpy as np, onnxruntime as ort
+session = ort.InferenceSession({model!r}, providers=["CPUExecutionProvider"])
+session.run(None, {{"input": np.zeros((1, {n}), dtype=np.float32)}})
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(template: str, repeats: int, **kwargs) -> float:
+    """Median seconds from interpreter start to the first prediction"""
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", template.format(**kwargs)],
+            capture_output=True, text=True, check=True,
+        )
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def latency(func, repeats: int) -> float:
+    """Median seconds per call"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", required=True)
+    parser.add_argument("--model-file", default="trained_model_object.pkl")
+    parser.add_argument("--onnx-file", default="trained_model.onnx")
+    parser.add_argument("--spec-file", default="feature_spec.yaml")
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    import joblib
+    import onnxruntime as ort
+
+    model_dir = Path(args.model_dir)
+    with open(model_dir / args.spec_file) as file:
+        features = yaml.safe_load(file)["features"]
+    pkl, onnx_path = str(model_dir / args.model_file), str(model_dir / args.onnx_file)
+
+    print("Cold start (import + load + first prediction, fresh interpreter)")
+    for label, template, path in (("sklearn", SKLEARN_COLD, pkl), ("onnxruntime", ONNX_COLD, onnx_path)):
+        seconds = cold_start(template, 5, model=path, n=len(features), features=features)
+        print(f"  {label:12s} {seconds * 1000:9.1f} ms")
+
+    model = joblib.load(pkl)
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    rng = np.random.default_rng(0)
+    for rows in (1, args.batch):
+        frame = pd.DataFrame(rng.normal(size=(rows, len(features))), columns=features)
+        x = frame.to_numpy(dtype=np.float32)
+        repeats = args.repeats if rows == 1 else max(args.repeats // 20, 5)
+        print(f"Latency, {rows} row(s) per call (median of {repeats})")
+        seconds = latency(lambda: model.predict_proba(frame), repeats)
+        print(f"  {'sklearn':12s} {seconds * 1000:9.3f} ms")
+        seconds = latency(lambda: session.run(None, {"input": x}), repeats)
+        print(f"  {'onnxruntime':12s} {seconds * 1000:9.3f} ms")
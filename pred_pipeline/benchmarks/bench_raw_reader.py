@@ -0,0 +1,76 @@
+"""Parse time of the raw clouds file with line offsets, a first indexed read and a cached index.
+
+The data blocks of the raw file are repeated `--scale` times to emulate a larger
+archive, and `--files` copies are parsed to emulate many runs over the same data.
+Run from the pred_pipeline directory:
+
+    python benchmarks/bench_raw_reader.py --scale 50 --files 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import create_dataset as cd  # noqa: E402
+from src import raw_index as ri  # noqa: E402
+
+
+def timed(label: str, func, repeat: int):
+    """Run func repeat times and report the mean wall time"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:28s} {elapsed * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--raw", default="artifacts/1683774570/data/raw/clouds.data")
+    parser.add_argument("--scale", type=int, default=50, help="Times to repeat each data block")
+    parser.add_argument("--files", type=int, default=5, help="Copies of the raw file to parse")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)["create_dataset"]
+    lines = Path(args.raw).read_text().splitlines(keepends=True)
+    prep = config["data_prep"]
+    first = lines[prep["first_cloud"]["left"] : prep["first_cloud"]["right"]]
+    second = lines[prep["second_cloud"]["left"] : prep["second_cloud"]["right"]]
+    # Keep the headers and separators in place; grow the data blocks
+    head = lines[: prep["first_cloud"]["left"]]
+    middle = lines[prep["first_cloud"]["right"] : prep["second_cloud"]["left"]]
+    tail = lines[prep["second_cloud"]["right"] :]
+    text = "".join(head + first * args.scale + middle + second * args.scale + tail)
+
+    offsets = dict(prep, reader="offsets")
+    offsets["first_cloud"] = dict(prep["first_cloud"], right=len(head) + len(first) * args.scale)
+    offsets["second_cloud"] = dict(
+        prep["second_cloud"],
+        left=offsets["first_cloud"]["right"] + len(middle),
+        right=offsets["first_cloud"]["right"] + len(middle) + len(second) * args.scale,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            paths.append(Path(tmp) / f"run{i}" / "clouds.data")
+            paths[-1].parent.mkdir()
+            paths[-1].write_text(text)
+        index_dir = Path(tmp) / "index"
+        indexed = dict(prep, reader="index", index_dir=index_dir)
+        print(f"{len(text) / 2**20:.1f} MiB raw file, {args.files} copies")
+
+        timed("line offsets, per file", lambda: [cd._read_clouds(p, dict(config, data_prep=offsets)) for p in paths[:1]], 1)
+        timed("scan and index", lambda: ri.build_index(paths[0], index_dir), 1)
+        timed("indexed read, per file", lambda: cd._read_clouds(paths[0], dict(config, data_prep=indexed)), args.files)
+        timed(
+            f"indexed read, {args.files} copies",
+            lambda: [cd._read_clouds(p, dict(config, data_prep=indexed)) for p in paths],
+            1,
+        )
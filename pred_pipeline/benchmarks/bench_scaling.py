@@ -0,0 +1,63 @@
+"""Scaling curve of training and scoring the forest across job counts.
+
+Each job count runs under an execution profile (joblib jobs plus one BLAS/OpenMP
+thread per job). Counts above the detected cores show the cost of
+oversubscription. Run from the pred_pipeline directory:
+
+    python benchmarks/bench_scaling.py --scale 20 --jobs 1,2,4,8
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import create_dataset as cd  # noqa: E402
+from src import generate_features as gf  # noqa: E402
+from src import resources as res  # noqa: E402
+from src import score_model as sm  # noqa: E402
+from src import train_model as tm  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--raw", default="artifacts/1683774570/data/raw/clouds.data")
+    parser.add_argument("--scale", type=int, default=20, help="Times to tile the dataset")
+    parser.add_argument("--trees", type=int, default=100, help="Trees in the forest")
+    parser.add_argument("--jobs", default=None, help="Comma separated job counts, powers of 2 up to the cores by default")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    cores, memory = res.available_cores(), res.available_memory()
+    if args.jobs is None:
+        jobs = [2**i for i in range(int(np.log2(cores)) + 1)]
+    else:
+        jobs = [int(n) for n in args.jobs.split(",")]
+    train_config = dict(config["train_model"])
+    train_config["model_config"] = dict(
+        train_config["model_config"], hyperparam={"n_estimators": args.trees, "max_depth": 10}
+    )
+
+    base = cd.create_dataset(Path(args.raw), config["create_dataset"])
+    frame = base.loc[np.tile(base.index.to_numpy(), args.scale)].reset_index(drop=True)
+    features = gf.generate_features(frame, config["generate_features"])
+    print(f"{len(frame):,} rows, {cores} cores and {memory / 2**30:.1f} GiB detected")
+    print(f"  {'jobs':>4s} {'train s':>9s} {'speedup':>8s} {'score s':>9s} {'speedup':>8s}")
+
+    baseline = None
+    for n_jobs in jobs:
+        profile = {"n_jobs": n_jobs, "threads": 1, "chunk_size": None, "memory_budget": memory, "profile": "bench"}
+        with res.execution_context(profile):
+            start = time.perf_counter()
+            model, _, test, _ = tm.train_model(features, train_config)
+            train_s = time.perf_counter() - start
+            start = time.perf_counter()
+            sm.score_model(test, model, config["score_model"])
+            score_s = time.perf_counter() - start
+        baseline = baseline or (train_s, score_s)
+        print(f"  {n_jobs:4d} {train_s:9.2f} {baseline[0] / train_s:8.2f} {score_s:9.2f} {baseline[1] / score_s:8.2f}")
@@ -0,0 +1,50 @@
+"""Compare CLI startup time of pipeline.py against eagerly importing every stage.
+
+Run from the pred_pipeline directory:
+
+    python benchmarks/bench_startup.py --repeat 10
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+EAGER_IMPORTS = (
+    "import logging.config, yaml;"
+    "logging.config.fileConfig('config/logging/local.conf', disable_existing_loggers=True);"
+    "import src.acquire_data, src.analysis, src.aws_utils, src.create_dataset,"
+    " src.evaluate_performance, src.generate_features, src.score_model, src.train_model"
+)
+
+CASES = {
+    "eager imports (previous pipeline.py)": [sys.executable, "-c", EAGER_IMPORTS],
+    "lazy imports (pipeline.py --help)": [sys.executable, "pipeline.py", "--help"],
+}
+
+
+def time_command(command: list, repeat: int) -> list:
+    """Wall clock seconds of each run of a command in a fresh interpreter"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per case")
+    args = parser.parse_args()
+
+    # Warm the OS file cache so the first case is not penalised
+    time_command(CASES["eager imports (previous pipeline.py)"], 1)
+    results = {name: time_command(command, args.repeat) for name, command in CASES.items()}
+    for name, timings in results.items():
+        print(
+            f"{name:40s} median {statistics.median(timings) * 1000:8.1f} ms"
+            f"   min {min(timings) * 1000:8.1f} ms"
+        )
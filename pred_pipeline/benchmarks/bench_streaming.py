@@ -0,0 +1,93 @@
+"""Wall time and peak memory of scoring a large archive, materialized versus streamed.
+
+The processed dataset is tiled into a CSV archive. "batch" reads the whole archive,
+builds all features, scores them and writes the scores, as the staged pipeline does;
+"stream" runs the same steps through src/streaming.py with bounded queues. Each
+mode runs in a fresh process so its peak RSS is its own. Run from the pred_pipeline
+directory (Linux):
+
+    python benchmarks/bench_streaming.py --scale 500 --depth 2
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import generate_features as gf  # noqa: E402
+from src import score_model as sm  # noqa: E402
+from src import streaming as stm  # noqa: E402
+
+
+def peak_rss_mib():
+    """Peak RSS of this process image; unlike ru_maxrss it is not inherited across exec"""
+    with open("/proc/self/status", "r") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, archive, model_file, config, output):
+    import joblib
+
+    model = joblib.load(model_file)
+    start = time.perf_counter()
+    if mode == "batch":
+        frame = pd.read_csv(archive, index_col=0)
+        features = gf.generate_features(frame.assign(**{"class": np.nan}), config["generate_features"])
+        probability, label = sm.score_model(features, model, config["score_model"])
+        pd.DataFrame({"Probability": probability, "Class": label}, index=features.index).to_csv(output)
+    else:
+        stm.stream_score(str(archive), output, model, config)
+    seconds = time.perf_counter() - start
+    print(f"{seconds:.2f} {peak_rss_mib():.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--processed", default="artifacts/1683774570/data/processed/clouds.csv")
+    parser.add_argument("--scale", type=int, default=500, help="Times to tile the dataset")
+    parser.add_argument("--depth", type=int, default=2, help="Queue depth of the stream")
+    parser.add_argument("--chunk-bytes", type=int, default=1 << 20)
+    parser.add_argument("--mode", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--work", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    config["stream_score"].update(queue_depth=args.depth, chunk_bytes=args.chunk_bytes)
+    if args.mode is not None:
+        work = Path(args.work)
+        run_mode(args.mode, work / "archive.csv", work / "model.pkl", config, work / f"{args.mode}.csv")
+        sys.exit(0)
+
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    base = pd.read_csv(args.processed, index_col=0)
+    features = gf.generate_features(base, config["generate_features"])
+    x = features[config["score_model"]["initial_features"]]
+    model = RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(x, features["class"])
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        joblib.dump(model, work / "model.pkl")
+        archive = base.drop(columns="class").loc[np.tile(base.index.to_numpy(), args.scale)]
+        archive.reset_index(drop=True).to_csv(work / "archive.csv")
+        size = (work / "archive.csv").stat().st_size
+        print(f"{len(archive):,} rows, {size / 2**20:.0f} MiB archive, queue depth {args.depth}")
+        del archive
+        print(f"  {'mode':>6s} {'seconds':>8s} {'peak RSS MiB':>13s}")
+        for mode in ("batch", "stream"):
+            command = [sys.executable, __file__, "--mode", mode, "--work", tmp, "--config", args.config,
+                       "--depth", str(args.depth), "--chunk-bytes", str(args.chunk_bytes)]
+            seconds, peak = subprocess.run(command, capture_output=True, text=True, check=True).stdout.split()[-2:]
+            print(f"  {mode:>6s} {float(seconds):8.2f} {float(peak):13.0f}")
@@ -0,0 +1,54 @@
+"""Cost of validating rows against the configured schema, per chunk and per online row.
+
+The raw schema of config.yaml is compiled once and checked against the dataset tiled
+to each size, as a DataFrame and as a compact dataset. Run from the pred_pipeline
+directory:
+
+    python benchmarks/bench_validation.py --sizes 1,1000,100000,1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import compact_dataset as cds  # noqa: E402
+from src import create_dataset as cd  # noqa: E402
+from src import validation as val  # noqa: E402
+
+
+def best_of(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--raw", default="artifacts/1683774570/data/raw/clouds.data")
+    parser.add_argument("--sizes", default="1,1000,100000,1000000", help="Comma separated row counts")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    start = time.perf_counter()
+    rules = val.compile_schema(config["validation"]["raw"])
+    print(f"{len(rules)} rules compiled in {(time.perf_counter() - start) * 1e6:.0f} us")
+
+    base = cd.create_dataset(Path(args.raw), config["create_dataset"])
+    columns = config["create_dataset"]["data"]["columns"]
+    print(f"  {'rows':>9s} {'frame':>12s} {'compact':>12s} {'per row':>10s}")
+    for size in (int(n) for n in args.sizes.split(",")):
+        frame = base.iloc[np.resize(np.arange(len(base)), size)].reset_index(drop=True)
+        compact = cds.from_frame(frame, columns, "class")
+        repeat = max(3, min(1000, 100000 // size))
+        frame_s = best_of(lambda: val.validate(frame, rules), repeat)
+        compact_s = best_of(lambda: val.validate(compact, rules), repeat)
+        print(f"  {size:9d} {frame_s * 1e3:9.3f} ms {compact_s * 1e3:9.3f} ms {frame_s / size * 1e9:7.0f} ns")
@@ -1,20 +1,480 @@
 import argparse
 import datetime
 import logging.config
+import sys
+import time
 from pathlib import Path
 import yaml
-import src.acquire_data as ad
-import src.analysis as eda
-import src.aws_utils as aws
-import src.create_dataset as cd
-import src.evaluate_performance as ep
-import src.generate_features as gf
-import src.score_model as sm
-import src.train_model as tm
+import src.gate as gt
+import src.resources as res
+import src.snapshot as snap
+import src.telemetry as tel
 
 logging.config.fileConfig("config/logging/local.conf", disable_existing_loggers=True)
+tel.start_queue_logging()
 logger = logging.getLogger("clouds")
 
+# Stage modules are imported inside the stage that uses them, so heavy
+# dependencies (requests, matplotlib, sklearn, boto3) only load when needed.
+
+
+def run_acquire_data(config: dict, artifacts: Path, state: dict) -> None:
+    """Acquire data from online repository and save to disk"""
+    import src.acquire_data as ad
+
+    raw_data_dir = artifacts / Path(config["run_config"]["data_dir"]["raw"])
+    raw_data_dir.mkdir(parents=True, exist_ok=True)
+    ad.acquire_data(config["run_config"]["data_source"], raw_data_dir / "clouds.data")
+
+
+def run_create_dataset(config: dict, artifacts: Path, state: dict) -> None:
+    """Create structured dataset from raw data; save to disk"""
+    import src.create_dataset as cd
+
+    run_config = config["run_config"]
+    raw_data_dir = artifacts / Path(run_config["data_dir"]["raw"])
+    processed_data_dir = artifacts / Path(run_config["data_dir"]["processed"])
+    processed_data_dir.mkdir(parents=True, exist_ok=True)
+    if config["create_dataset"].get("compact"):
+        # Reserve a column per engineered feature so they are added without copying
+        reserve = len(config["generate_features"]["feature_eng"])
+        state["data"] = cd.create_compact_dataset(
+            raw_data_dir / "clouds.data", config["create_dataset"], reserve
+        )
+    else:
+        state["data"] = cd.create_dataset(raw_data_dir / "clouds.data", config["create_dataset"])
+    state["data"] = _validate(config, artifacts, state["data"], "raw")
+    cd.save_dataset(state["data"], processed_data_dir / "clouds.csv")
+
+
+def _validate(config: dict, artifacts: Path, data: object, name: str) -> object:
+    """Check rows against the validation schema of that name, if any; return the rows kept"""
+    validation = config.get("validation", {})
+    if validation.get(name) is None:
+        return data
+    import src.validation as val
+
+    quarantine_path = artifacts / Path(validation["quarantine_dir"]) / f"{name}.csv"
+    return val.apply_schema(data, validation[name], validation["action"], name, quarantine_path)
+
+
+def _load_dataset(config: dict, path: Path) -> object:
+    """Load a dataset written by save_dataset, as a compact dataset if configured"""
+    import src.create_dataset as cd
+
+    data = cd.load_dataset(path)
+    if config["create_dataset"].get("compact"):
+        import src.compact_dataset as cds
+
+        data = cds.from_frame(
+            data,
+            config["create_dataset"]["data"]["columns"],
+            config["generate_features"]["target_col"],
+            len(config["generate_features"]["feature_eng"]),
+            config["create_dataset"]["data"].get("decimals"),
+        )
+    return data
+
+
+def run_sample_data(config: dict, artifacts: Path, state: dict) -> None:
+    """Sample the dataset for fast iteration; with size null the full dataset passes through"""
+    import numpy as np
+    import pandas as pd
+    import src.sample_data as sd
+
+    sample_config = config["sample_data"]
+    processed_data = artifacts / Path(config["run_config"]["data_dir"]["processed"]) / "clouds.csv"
+    sample_dir = artifacts / Path(sample_config["sample_dir"])
+    sample_dir.mkdir(parents=True, exist_ok=True)
+    full = sample_config["method"] == "none" or sample_config["size"] is None
+    if sample_config["method"] == "reservoir" and not full:
+        # Stream the processed dataset from disk instead of loading all of it
+        chunks = pd.read_csv(processed_data, index_col=0, chunksize=sample_config["chunk_size"])
+        sample, n_rows = sd.reservoir_sample(chunks, sample_config["size"], sample_config["seed"])
+        index, labels = sample.index, sample[sample_config["strat_col"]]
+        if config["create_dataset"].get("compact"):
+            import src.compact_dataset as cds
+
+            sample = cds.from_frame(
+                sample,
+                config["create_dataset"]["data"]["columns"],
+                config["generate_features"]["target_col"],
+                len(config["generate_features"]["feature_eng"]),
+                config["create_dataset"]["data"].get("decimals"),
+            )
+    else:
+        if "data" not in state:
+            state["data"] = _load_dataset(config, processed_data)
+        n_rows = len(state["data"])
+        if full:
+            sample, rows = state["data"], np.arange(n_rows)
+        else:
+            sample, rows = sd.sample_data(state["data"], sample_config)
+        if isinstance(sample, pd.DataFrame):
+            index, labels = sample.index, sample[sample_config["strat_col"]]
+        else:
+            index, labels = rows, sample.labels
+    state["data"] = sample
+    state["sample"] = sd.sample_record(index, labels, n_rows, sample_config)
+    if not full:
+        import src.create_dataset as cd
+
+        cd.save_dataset(sample, sample_dir / "clouds.csv")
+    sd.save_sample_record(state["sample"], sample_dir / "sample.yaml")
+
+
+def run_generate_features(config: dict, artifacts: Path, state: dict) -> None:
+    """Enrich dataset with features for model training"""
+    import src.generate_features as gf
+
+    if "data" not in state:
+        # Prefer the sample of an earlier sample_data run over the full dataset
+        path = artifacts / Path(config["run_config"]["data_dir"]["processed"]) / "clouds.csv"
+        if "sample_data" in config:
+            sample_path = artifacts / Path(config["sample_data"]["sample_dir"]) / "clouds.csv"
+            if sample_path.exists():
+                path = sample_path
+        state["data"] = _load_dataset(config, path)
+    if "feature_store" not in config:
+        features = gf.generate_features(state["data"], config["generate_features"])
+        state["features"] = _validate(config, artifacts, features, "features")
+        return
+
+    # Reuse the stored features of the same spec and input rows instead of recomputing them
+    import src.feature_store as fs
+
+    store_config = config["feature_store"]
+    store = fs.FeatureStore(store_config["root"], store_config["row_group_size"])
+    table, version = store_config["table"], fs.spec_version(config["generate_features"])
+    # Only rows passing the features schema are stored, so the schema is part of the source
+    checks = config.get("validation", {})
+    schema = None if checks.get("features") is None else {key: checks[key] for key in ("features", "action")}
+    source = fs.data_digest(state["data"], schema)
+    compact = config["create_dataset"].get("compact")
+    if store.has(table, version, source):
+        features = store.read(table, version).rename_axis(None)
+        if compact:
+            import src.compact_dataset as cds
+
+            target = config["generate_features"]["target_col"]
+            columns = [column for column in features.columns if column != target]
+            features = cds.from_frame(features, columns, target)
+        logger.info("Features of spec %s read from the feature store", version)
+        state["features"] = _validate(config, artifacts, features, "features")
+        return
+
+    features = gf.generate_features(state["data"], config["generate_features"])
+    # Validate first so the store holds only the accepted rows, keyed by their row ids
+    frame = _validate(config, artifacts, features.to_frame() if compact else features, "features")
+    store.write(table, version, frame, config["generate_features"], source)
+    if compact and len(frame) < len(features):
+        features = features.take(frame.index.to_numpy())
+    state["features"] = features if compact else frame
+
+
+def run_analysis(config: dict, artifacts: Path, state: dict) -> None:
+    """Generate statistics and visualizations for summarizing the data; save to disk"""
+    import src.analysis as eda
+
+    if "features" not in state:
+        run_generate_features(config, artifacts, state)
+    figures = artifacts / Path(config["run_config"]["figure_dir"])
+    figures.mkdir(exist_ok=True)
+    features = state["features"]
+    if config["create_dataset"].get("compact"):
+        features = features.to_frame()
+    eda.save_figures(features, figures, config)
+
+
+def run_train_model(config: dict, artifacts: Path, state: dict) -> None:
+    """Split data into train/test set and train model based on config; save each to disk"""
+    import src.train_model as tm
+
+    if "features" not in state:
+        run_generate_features(config, artifacts, state)
+    if config["create_dataset"].get("compact"):
+        nbytes = state["features"].nbytes
+    else:
+        nbytes = int(state["features"].memory_usage().sum())
+    res.check_budget(nbytes, state.get("profile"), "The training data")
+    state["model"], state["train"], state["test"], state["calibration"] = tm.train_model(
+        state["features"], config["train_model"]
+    )
+    model_data_dir = artifacts / Path(config["train_model"]["data_dir"])
+    model_data_dir.mkdir(parents=True, exist_ok=True)
+    tm.save_data(state["train"], state["test"], model_data_dir, state["calibration"])
+
+    model_dir = artifacts / Path(config["train_model"]["model_dir"])
+    model_dir.mkdir(parents=True, exist_ok=True)
+    tm.save_model(state["model"], model_dir / "trained_model_object.pkl")
+
+
+def run_compare_models(config: dict, artifacts: Path, state: dict) -> None:
+    """Train candidate models in parallel on the same split and rank them against the champion"""
+    import src.compare_models as cmp
+
+    _load_trained(config, artifacts, state)
+    compare_config = res.cap_workers(config["compare_models"], state.get("profile"))
+    models = {"champion": state["model"]}
+    models.update(cmp.train_candidates(state["train"], compare_config))
+    comparison = cmp.compare_models(
+        models, state["test"], compare_config, config["evaluate_performance"]
+    )
+    model_dir = artifacts / Path(config["train_model"]["model_dir"]) / compare_config["model_dir"]
+    model_dir.mkdir(parents=True, exist_ok=True)
+    compare_dir = artifacts / Path(compare_config["compare_dir"])
+    compare_dir.mkdir(parents=True, exist_ok=True)
+    cmp.save_candidates(models, comparison, compare_config, model_dir, compare_dir)
+
+
+def run_calibrate_model(config: dict, artifacts: Path, state: dict) -> None:
+    """Fit a probability calibrator and decision threshold on held-out rows; save with the model"""
+    import src.calibrate_model as cm
+    import src.train_model as tm
+
+    _load_trained(config, artifacts, state)
+    if "calibration" not in state:
+        model_data_dir = artifacts / Path(config["train_model"]["data_dir"])
+        state["calibration"] = tm.load_calibration_data(model_data_dir)
+    calibrate_config = config["calibrate_model"]
+    state["calibrator"] = cm.calibrate_model(state["calibration"], state["model"], calibrate_config)
+    model_dir = artifacts / Path(config["train_model"]["model_dir"])
+    model_dir.mkdir(parents=True, exist_ok=True)
+    cm.save_calibration(state["calibrator"], model_dir / calibrate_config["calibration_file"])
+
+
+def run_export_model(config: dict, artifacts: Path, state: dict) -> None:
+    """Export the trained model to ONNX and check it against sklearn on the test set"""
+    import src.export_model as xm
+
+    _load_trained(config, artifacts, state)
+    export_config = config["export_model"]
+    model_dir = artifacts / Path(config["train_model"]["model_dir"])
+    model_dir.mkdir(parents=True, exist_ok=True)
+    onnx_model = xm.export_model(state["model"], export_config)
+    xm.save_export(
+        onnx_model,
+        xm.feature_spec(state["model"], export_config),
+        model_dir / export_config["export_file"],
+        model_dir / export_config["spec_file"],
+    )
+    xm.check_parity(
+        state["model"], model_dir / export_config["export_file"], state["test"], export_config
+    )
+
+
+def run_monitor_drift(config: dict, artifacts: Path, state: dict) -> None:
+    """Sketch feature distributions of the training rows and check the test rows for drift"""
+    import src.monitor_drift as md
+
+    _load_trained(config, artifacts, state)
+    if "features" not in state:
+        run_generate_features(config, artifacts, state)
+    features = state["features"]
+    if config["create_dataset"].get("compact"):
+        features = features.to_frame()
+
+    drift_config = config["monitor_drift"]
+    columns = md.monitored_features(config["generate_features"])
+    sketches = md.build_feature_sketches(
+        features.loc[state["train"].index], columns, drift_config["bins"]
+    )
+    # The sketches ship with the model so scoring can check drift without training data
+    model_dir = artifacts / Path(config["train_model"]["model_dir"])
+    model_dir.mkdir(parents=True, exist_ok=True)
+    md.save_sketches(sketches, model_dir / drift_config["sketch_file"])
+
+    report = md.check_drift(sketches, features.loc[state["test"].index], drift_config)
+    report_dir = artifacts / Path(drift_config["report_dir"])
+    report_dir.mkdir(parents=True, exist_ok=True)
+    md.save_report(report, report_dir / "drift_report.yaml")
+
+
+def _load_trained(config: dict, artifacts: Path, state: dict) -> None:
+    """Load model and test set of an earlier run when train_model did not run"""
+    import src.train_model as tm
+
+    if "test" not in state:
+        model_data_dir = artifacts / Path(config["train_model"]["data_dir"])
+        state["train"], state["test"] = tm.load_data(model_data_dir)
+    if "model" not in state:
+        model_dir = artifacts / Path(config["train_model"]["model_dir"])
+        state["model"] = tm.load_model(model_dir / "trained_model_object.pkl")
+
+
+def run_score_model(config: dict, artifacts: Path, state: dict) -> None:
+    """Score model on test set; save scores to disk"""
+    import src.score_model as sm
+
+    _load_trained(config, artifacts, state)
+    if config["score_model"].get("calibrated") and "calibrator" not in state:
+        import src.calibrate_model as cm
+
+        model_dir = artifacts / Path(config["train_model"]["model_dir"])
+        state["calibrator"] = cm.load_calibration(
+            model_dir / config["calibrate_model"]["calibration_file"]
+        )
+    # Budget each row for its features plus the class probabilities of the model
+    row_bytes = 8 * (len(config["score_model"]["initial_features"]) + 2)
+    state["scores"] = sm.score_model(
+        state["test"],
+        state["model"],
+        config["score_model"],
+        state.get("calibrator"),
+        res.chunk_rows(state.get("profile"), row_bytes),
+    )
+    score_dir = artifacts / Path(config["score_model"]["score_dir"])
+    score_dir.mkdir(parents=True, exist_ok=True)
+    sm.save_scores(state["scores"], score_dir / "scores.csv")
+
+
+def run_stream_score(config: dict, artifacts: Path, state: dict) -> None:
+    """Score a CSV archive chunk by chunk, overlapping reading, features, scoring and writing"""
+    import src.streaming as stm
+
+    _load_trained(config, artifacts, state)
+    stream_config = config["stream_score"]
+    if config["score_model"].get("calibrated") and "calibrator" not in state:
+        import src.calibrate_model as cm
+
+        model_dir = artifacts / Path(config["train_model"]["model_dir"])
+        state["calibrator"] = cm.load_calibration(
+            model_dir / config["calibrate_model"]["calibration_file"]
+        )
+    source = stream_config["source"]
+    if source is None:
+        source = artifacts / Path(config["run_config"]["data_dir"]["processed"]) / "clouds.csv"
+    profile = state.get("profile")
+    if profile is not None:
+        stream_config = {
+            **stream_config,
+            "cpu_workers": min(stream_config["cpu_workers"], profile["n_jobs"]),
+        }
+    stm.stream_score(
+        str(source),
+        artifacts / Path(stream_config["stream_dir"]) / "stream_scores.csv",
+        state["model"],
+        {**config, "stream_score": stream_config},
+        state.get("calibrator"),
+    )
+
+
+def run_explain_model(config: dict, artifacts: Path, state: dict) -> None:
+    """Attribute each test prediction to the model features; save attributions to disk"""
+    import src.explain_model as em
+
+    _load_trained(config, artifacts, state)
+    # Boosted champions have no tree path attributions; the rest of the run goes on
+    if not em.is_explainable(state["model"]):
+        logger.warning(
+            "Model %s cannot be attributed to features; skipping explain_model",
+            type(state["model"]).__name__,
+        )
+        return
+    explain_config = res.cap_workers(config["explain_model"], state.get("profile"))
+    cache = em.AttributionCache(explain_config["cache_size"])
+    explanations = em.explain_model(state["test"], state["model"], explain_config, cache)
+    explanation_dir = artifacts / Path(explain_config["explanation_dir"])
+    explanation_dir.mkdir(parents=True, exist_ok=True)
+    em.save_explanations(explanations, explanation_dir / "explanations.csv")
+
+
+def run_evaluate_performance(config: dict, artifacts: Path, state: dict) -> None:
+    """Evaluate model performance metrics; save metrics to disk"""
+    import src.evaluate_performance as ep
+
+    if "scores" not in state:
+        import src.score_model as sm
+
+        score_dir = artifacts / Path(config["score_model"]["score_dir"])
+        state["scores"] = sm.load_scores(score_dir / "scores.csv")
+    _load_trained(config, artifacts, state)
+    metrics = ep.evaluate_performance(state["test"], state["scores"], config["evaluate_performance"])
+    metric_dir = artifacts / Path(config["evaluate_performance"]["metric_dir"])
+    metric_dir.mkdir(parents=True, exist_ok=True)
+    index_path = config["evaluate_performance"].get("index_path")
+    run_info = {"run_id": artifacts.name, "config": config, "timings": state.get("timings")}
+    ep.save_metrics(metrics, metric_dir / "metrics.yaml", index_path, run_info)
+
+
+def record_sample_use(config: dict, artifacts: Path, state: dict, stage: str) -> None:
+    """Add a stage that ran on the sampled data to the sample record of the run"""
+    import src.sample_data as sd
+
+    record_path = artifacts / Path(config["sample_data"]["sample_dir"]) / "sample.yaml"
+    record = state.get("sample") or sd.load_sample_record(record_path)
+    if record is None or stage in record["used_by"]:
+        return
+    record["used_by"].append(stage)
+    state["sample"] = record
+    sd.save_sample_record(record, record_path)
+    logger.info("Stage %(stage)s used sample %(id)s", {"stage": stage, "id": record["sample_id"]})
+
+
+def write_manifest(config: dict, artifacts: Path) -> dict:
+    """Record path, size, hash and producing stage of every artifact in the run"""
+    import src.manifest as mf
+
+    stages = mf.artifact_stages(config)
+    mf.save_manifest(mf.build_manifest(artifacts, stages), artifacts / mf.MANIFEST_NAME)
+    return stages
+
+
+def export_telemetry(config: dict, artifacts: Path) -> None:
+    """Write the metrics snapshot of the run, before the manifest lists the run's files"""
+    if "telemetry" in config:
+        tel.METRICS.export(artifacts / Path(config["telemetry"]["metrics_file"]))
+
+
+def run_gate(config: dict, artifacts: Path, state: dict) -> None:
+    """Compare quality, stage durations and peak memory with a baseline run; flag regressions"""
+    gate_config = config["gate"]
+    baseline = gt.find_baseline(
+        gate_config["baseline"], artifacts, Path(config["run_config"]["output"]["runs"]), config
+    )
+    report = gt.run_gate(artifacts, baseline, config)
+    # The run fails once its artifacts, the report included, are written and stored
+    state["gate_failed"] = not report["passed"] and gate_config.get("fail", True)
+
+
+def run_upload(config: dict, artifacts: Path, state: dict) -> None:
+    """Sync artifacts from all runs to S3, transferring only missing or changed files"""
+    stages = write_manifest(config, artifacts)
+    if state.get("store") is not None:
+        # Each stage already stored its artifacts; the manifest follows this stage
+        logger.info("Artifacts of run %s are in the store, skipping upload", artifacts.name)
+        return
+    # Partitioned folders by timestamp in S3
+    aws_config = config.get("aws")
+    if aws_config.get("upload"):
+        import src.aws_utils as aws
+
+        all_artifacts = Path(config["run_config"]["output"]["runs"])
+        aws.sync_artifacts(all_artifacts, aws_config, stages, snap.open_blob_store(config))
+
+
+STAGES = {
+    "acquire_data": run_acquire_data,
+    "create_dataset": run_create_dataset,
+    "sample_data": run_sample_data,
+    "generate_features": run_generate_features,
+    "analysis": run_analysis,
+    "train_model": run_train_model,
+    "compare_models": run_compare_models,
+    "calibrate_model": run_calibrate_model,
+    "export_model": run_export_model,
+    "monitor_drift": run_monitor_drift,
+    "score_model": run_score_model,
+    "stream_score": run_stream_score,
+    "explain_model": run_explain_model,
+    "evaluate_performance": run_evaluate_performance,
+    "gate": run_gate,
+    "upload": run_upload,
+}
+
+# Stages working on the output of sample_data, directly or through earlier stages
+SAMPLED_STAGES = list(STAGES)[list(STAGES).index("sample_data") + 1 : list(STAGES).index("gate")]
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Acquire, clean, and create features from clouds data"
@@ -22,8 +482,45 @@ if __name__ == "__main__":
     parser.add_argument(
         "--config", default="config/config.yaml", help="Path to configuration file"
     )
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"Comma separated stages to run, in pipeline order. Choose from: {', '.join(STAGES)}",
+    )
+    parser.add_argument(
+        "--sample-size",
+        default=None,
+        help="Override sample_data.size: a row count, a fraction below 1, or 'full'",
+    )
+    parser.add_argument(
+        "--run-dir",
+        default=None,
+        help="Existing run directory to read and write artifacts; required unless acquire_data runs",
+    )
     args = parser.parse_args()
 
+    selected = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in selected if stage not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+    if args.run_dir is None and "acquire_data" not in selected:
+        parser.error("--run-dir is required when acquire_data is not among the stages")
+    sample_override = None
+    if args.sample_size is not None and args.sample_size != "full":
+        try:
+            sample_override = float(args.sample_size)
+        except ValueError:
+            parser.error(f"--sample-size {args.sample_size} is not a number or 'full'")
+        # A count of rows is a whole number, anything smaller a fraction of them
+        if not 0 < sample_override < float("inf") or (
+            sample_override >= 1 and not sample_override.is_integer()
+        ):
+            parser.error(
+                f"--sample-size {args.sample_size} is neither a row count nor a fraction in (0, 1)"
+            )
+        if sample_override >= 1:
+            sample_override = int(sample_override)
+
     # Load configuration file for parameters and run config
     with open(args.config, "r") as f:
         try:
@@ -33,62 +530,92 @@ if __name__ == "__main__":
         else:
             logger.info("Configuration file loaded from %s", args.config)
 
+    if args.sample_size is not None:
+        config["sample_data"]["size"] = sample_override
+
     run_config = config.get("run_config", {})
     # Set up output directory for saving artifacts
-    now = int(datetime.datetime.now().timestamp())
-    artifacts = Path(run_config["output"]["runs"]) / str(now)
-    artifacts.mkdir(parents=True)
-
-    # Create separate directories for raw and processed data
-    raw_data_dir = artifacts / Path(run_config["data_dir"]["raw"])
-    processed_data_dir = artifacts / Path(run_config["data_dir"]["processed"])
-    raw_data_dir.mkdir(parents=True)
-    processed_data_dir.mkdir(parents=True)
+    if args.run_dir is None:
+        now = int(datetime.datetime.now().timestamp())
+        artifacts = Path(run_config["output"]["runs"]) / str(now)
+        artifacts.mkdir(parents=True)
+    else:
+        artifacts = Path(args.run_dir)
+        if config.get("snapshot") is not None:
+            # Before anything is written: files of a snapshot may be shared with other runs
+            snap.checkout_run(artifacts, snap.open_blob_store(config))
 
     # Save config file to artifacts directory for traceability
     with (artifacts / "config.yaml").open("w") as f:
         yaml.dump(config, f)
 
-    # Acquire data from online repository and save to disk
-    ad.acquire_data(run_config["data_source"], raw_data_dir / "clouds.data")
+    # Run selected stages in pipeline order; each reuses earlier outputs kept in
+    # memory, or reloads them from the run directory when the stage was skipped
+    state = {"timings": {}, "store": None}
+    if config.get("storage", {}).get("uri") is not None:
+        import src.storage as sto
 
-    # Create structured dataset from raw data; save to disk
-    data = cd.create_dataset(raw_data_dir / "clouds.data", config["create_dataset"])
-    cd.save_dataset(data, processed_data_dir / "clouds.csv")
+        # The run directory caches the run's objects in the store: artifacts of an
+        # earlier run are fetched in parallel up front, and each stage's outputs are
+        # stored as soon as it finishes rather than in a final upload pass
+        state["store"] = sto.open_run_store(config["storage"], artifacts)
+        state["stored"] = state["store"].pull() if args.run_dir is not None else {}
+    for stage, run_stage in STAGES.items():
+        if stage in selected:
+            if stage == "upload":
+                # The upload stage manifests and stores the snapshot with the other
+                # artifacts, so it covers every stage but the upload itself
+                export_telemetry(config, artifacts)
+            state["profile"] = res.stage_profile(config, stage)
+            if state["profile"] is not None:
+                logger.info(
+                    "Running stage %(stage)s with %(n_jobs)s jobs of %(threads)s threads",
+                    {"stage": stage, **state["profile"]},
+                    extra={"stage": stage, "execution": state["profile"]},
+                )
+            else:
+                logger.info("Running stage %s", stage)
+            res.reset_peak_rss()
+            start = time.perf_counter()
+            with res.execution_context(state["profile"]):
+                run_stage(config, artifacts, state)
+            state["timings"][stage] = time.perf_counter() - start
+            tel.METRICS.observe("pipeline_stage_seconds", state["timings"][stage], stage=stage)
+            if "gate" in config:
+                gt.record_stage(
+                    artifacts / Path(config["gate"]["gate_dir"]) / gt.STATS_NAME,
+                    stage,
+                    state["timings"][stage],
+                    res.peak_rss(),
+                )
+            if "sample_data" in config and stage in SAMPLED_STAGES:
+                record_sample_use(config, artifacts, state, stage)
+            if state["store"] is not None:
+                state["stored"] = state["store"].push(state["stored"])
+            logger.info(
+                "Stage %(stage)s finished in %(sec).2fs",
+                {"stage": stage, "sec": state["timings"][stage]},
+                extra={"stage": stage, "seconds": state["timings"][stage]},
+            )
 
-    # Enrich dataset with features for model training; save to disk
-    features = gf.generate_features(data, config["generate_features"])
+    if "upload" not in selected:
+        export_telemetry(config, artifacts)
+        write_manifest(config, artifacts)
+    if state["store"] is not None:
+        state["store"].push(state["stored"])
+    if config.get("snapshot") is not None:
+        snap.snapshot_run(
+            artifacts, snap.open_blob_store(config), config["snapshot"]["mode"], gt.record_paths(config)
+        )
 
-    # Generate statistics and visualizations for summarizing the data; save to disk
-    figures = artifacts / Path(run_config["figure_dir"])
-    figures.mkdir()
-    eda.save_figures(features, figures, config)
-
-    # Split data into train/test set and train model based on config; save each to disk
-    tmo, train, test = tm.train_model(features, config["train_model"])
-    model_data_dir = artifacts / Path(config["train_model"]["data_dir"])
-    model_data_dir.mkdir(parents=True)
-    tm.save_data(train, test, model_data_dir)
+    # Stages after evaluate_performance finish once the run is indexed, so
+    # refresh its timings with the complete set
+    index_path = config["evaluate_performance"].get("index_path")
+    if index_path is not None and "evaluate_performance" in selected:
+        import src.metrics_index as mi
 
-    model_dir = artifacts / Path(config["train_model"]["model_dir"])
-    model_dir.mkdir(parents=True)
-    tm.save_model(tmo, model_dir / "trained_model_object.pkl")
+        mi.record_timings(index_path, artifacts.name, state["timings"])
 
-    # Score model on test set; save scores to disk
-    scores = sm.score_model(test, tmo, config["score_model"])
-    score_dir = artifacts / Path(config["score_model"]["score_dir"])
-    score_dir.mkdir(parents=True)
-    sm.save_scores(scores, score_dir / "scores.csv")
-
-    # Evaluate model performance metrics; save metrics to disk
-    metrics = ep.evaluate_performance(test, scores, config["evaluate_performance"])
-    metric_dir = artifacts / Path(config["evaluate_performance"]["metric_dir"])
-    metric_dir.mkdir(parents=True)
-    ep.save_metrics(metrics, metric_dir / "metrics.yaml")
-
-    # Upload all artifacts from all runs to S3
-    # Partitioned folders by timestamp in S3
-    aws_config = config.get("aws")
-    all_artifacts = Path(run_config["output"]["runs"])
-    if aws_config.get("upload"):
-        aws.upload_artifacts(all_artifacts, aws_config)
+    if state.get("gate_failed"):
+        logger.error("Run %s failed the regression gate, see its gate report", artifacts.name)
+        sys.exit(1)
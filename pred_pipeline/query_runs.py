@@ -0,0 +1,50 @@
+import argparse
+import json
+import time
+import yaml
+import src.metrics_index as mi
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Query the metrics index for the best runs and metric trends"
+    )
+    parser.add_argument(
+        "--config", default="config/config.yaml", help="Path to configuration file"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    best = subparsers.add_parser("best", help="Rank runs by a metric")
+    best.add_argument("--metric", default="accuracy_score", help="Metric to rank by")
+    best.add_argument("-n", type=int, default=5, help="Number of runs to show")
+    best.add_argument("--ascending", action="store_true", help="Lowest value first")
+
+    trend = subparsers.add_parser("trend", help="Metric values over runs, oldest first")
+    trend.add_argument(
+        "--metric",
+        default="accuracy_score",
+        help="Metric name, or stage:<name> for a stage duration in seconds",
+    )
+    trend.add_argument("--last", type=int, default=None, help="Only the most recent runs")
+
+    subparsers.add_parser("index", help="Index existing runs from their metrics.yaml files")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.load(f, Loader=yaml.FullLoader)
+    index_path = config["evaluate_performance"]["index_path"]
+
+    start = time.perf_counter()
+    if args.command == "best":
+        for row in mi.best_runs(index_path, args.metric, args.n, args.ascending):
+            print(
+                f"{row['run_id']}  {args.metric}={row[args.metric]:.6f}  "
+                f"config={row['config_hash'][:12]}  hyperparam={json.dumps(row['hyperparams'])}"
+            )
+    elif args.command == "trend":
+        for run_id, value in mi.metric_trend(index_path, args.metric, args.last):
+            print(f"{run_id}  {value:.6f}")
+    else:
+        metrics_file = f"{config['evaluate_performance']['metric_dir']}/metrics.yaml"
+        count = mi.index_runs(index_path, config["run_config"]["output"]["runs"], metrics_file)
+        print(f"Indexed {count} runs")
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
@@ -0,0 +1,69 @@
+import argparse
+import logging.config
+from pathlib import Path
+import yaml
+import src.snapshot as snap
+
+logging.config.fileConfig("config/logging/local.conf", disable_existing_loggers=True)
+logger = logging.getLogger("clouds")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Inspect, restore and garbage collect content-addressed run snapshots"
+    )
+    parser.add_argument(
+        "--config", default="config/config.yaml", help="Path to configuration file"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("usage", help="Bytes referenced by all runs against bytes stored")
+
+    snapshot = subparsers.add_parser("snapshot", help="Snapshot runs written before snapshots")
+    snapshot.add_argument("runs", nargs="*", help="Run directories; all runs by default")
+
+    checkout = subparsers.add_parser("checkout", help="Restore the artifacts of a run as plain files")
+    checkout.add_argument("run", help="Run directory")
+
+    gc = subparsers.add_parser("gc", help="Delete blobs no run manifest references")
+    gc.add_argument("--dry-run", action="store_true", help="Report without deleting")
+    gc.add_argument("--remote", action="store_true", help="Collect the S3 blobs of the aws section too")
+    gc.add_argument("--grace", type=float, default=None, help="Override gc_grace_seconds")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.load(f, Loader=yaml.FullLoader)
+    blobs = snap.open_blob_store(config)
+    if blobs is None:
+        parser.error("The configuration has no snapshot section")
+    runs_dir = Path(config["run_config"]["output"]["runs"])
+
+    if args.command == "usage":
+        usage = snap.usage(blobs, runs_dir)
+        saved = 1 - usage["stored"] / usage["referenced"] if usage["referenced"] else 0.0
+        print(
+            f"{usage['runs']} runs reference {usage['referenced']:,} bytes; "
+            f"{usage['blobs']} blobs store {usage['stored']:,} bytes ({saved:.1%} saved)"
+        )
+    elif args.command == "snapshot":
+        import src.gate as gt
+        import src.manifest as mf
+
+        stages = mf.artifact_stages(config)
+        runs = [Path(run) for run in args.runs] or [
+            path for path in sorted(runs_dir.iterdir()) if path.is_dir() and (path / "config.yaml").exists()
+        ]
+        for run in runs:
+            if not (run / mf.MANIFEST_NAME).exists():
+                mf.save_manifest(mf.build_manifest(run, stages), run / mf.MANIFEST_NAME)
+            snap.snapshot_run(run, blobs, config["snapshot"]["mode"], gt.record_paths(config))
+    elif args.command == "checkout":
+        print(f"{snap.checkout_run(Path(args.run), blobs)} artifacts restored")
+    else:
+        grace = config["snapshot"]["gc_grace_seconds"] if args.grace is None else args.grace
+        result = snap.collect_garbage(blobs, runs_dir, grace, args.dry_run)
+        print(f"local: {result['deleted']} blobs ({result['bytes']:,} bytes) deleted, {result['kept']} kept")
+        if args.remote:
+            import src.aws_utils as aws
+
+            result = aws.collect_remote_garbage(config["aws"], grace, args.dry_run)
+            print(f"s3: {result['deleted']} blobs ({result['bytes']:,} bytes) deleted, {result['kept']} kept")
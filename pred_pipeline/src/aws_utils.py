@@ -1,8 +1,13 @@
 import os
 import logging
-from typing import List
+import time
 from pathlib import Path
+from typing import List, Optional, Set
 import boto3
+import yaml
+from botocore.exceptions import ClientError
+from src import manifest as mf
+from src.telemetry import METRICS
 
 logger = logging.getLogger("clouds")
 
@@ -70,6 +75,8 @@ def upload_artifacts(artifacts: Path, config: dict) -> List[str]:
                     s_3.put_object(
                         Bucket=bucket_name, Key=str(s3_key_final), Body=file_data
                     )
+                    METRICS.inc("s3_bytes_uploaded_total", os.path.getsize(local_file_path))
+                    METRICS.inc("s3_objects_uploaded_total")
                     logger.info(
                         "Uploaded %(lfp)s to S3 location:  %(bucket_name)s/%(prefix)s/%(s3_key)s",
                         {
@@ -94,3 +101,172 @@ def upload_artifacts(artifacts: Path, config: dict) -> List[str]:
             s3_uris.append(f"s3://{bucket_name}/{prefix}/{s3_key}")
 
     return s3_uris
+
+
+def _fetch_remote_manifest(s_3, bucket_name: str, key: str) -> Optional[dict]:
+    """Download the manifest of a run from S3, None if it was never synced"""
+    try:
+        response = s_3.get_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+    return yaml.safe_load(response["Body"].read())
+
+
+def _list_remote_blobs(s_3, bucket_name: str, blob_prefix: str) -> Set[str]:
+    """List the hashes of every blob already stored under the blob prefix"""
+    blobs = set()
+    paginator = s_3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=blob_prefix + "/"):
+        for obj in page.get("Contents", []):
+            blobs.add(obj["Key"].rsplit("/", 1)[-1])
+    return blobs
+
+
+def sync_artifacts(
+    artifacts: Path, config: dict, stages: dict, blobs: Optional[object] = None
+) -> List[str]:
+    """Upload only the artifacts that are missing or changed in S3
+    Each run is compared against the manifest stored next to its remote copy.
+    Runs without a local manifest get one built on the fly. With `dedup` set,
+    files are stored once per content hash under `<prefix>/blobs/` and the
+    remote manifest is the only per-run object.
+    Args:
+        artifacts (Path): Path to the directory holding all runs
+        config (dict): Configuration of s3 bucket
+        stages (dict): relative path -> stage name, see manifest.artifact_stages
+        blobs (BlobStore, optional): local blob store of run snapshots; artifacts
+            missing from a run directory are read from it, and its directory is
+            not synced as a run
+    Return:
+        s3_uris (list): URIs of the objects transferred
+    """
+    s_3 = boto3.client("s3")
+    bucket_name = config["bucket_name"]
+    prefix = config["prefix"]
+    dedup = config.get("dedup", False)
+    layout = "blobs" if dedup else "runs"
+
+    check_bucket_exists(bucket_name, s_3)
+
+    blob_prefix = f"{prefix}/blobs"
+    remote_blobs = _list_remote_blobs(s_3, bucket_name, blob_prefix) if dedup else set()
+    s3_uris = []
+
+    for run_dir in sorted(Path(artifacts).iterdir()):
+        if not run_dir.is_dir():
+            continue
+        if blobs is not None and run_dir.resolve() == blobs.root.resolve():
+            continue
+        manifest_path = run_dir / mf.MANIFEST_NAME
+        local = mf.load_manifest(manifest_path)
+        if local is None:
+            local = mf.build_manifest(run_dir, stages)
+            mf.save_manifest(local, manifest_path)
+        local["layout"] = layout
+
+        manifest_key = f"{prefix}/{run_dir.name}/{mf.MANIFEST_NAME}"
+        remote = _fetch_remote_manifest(s_3, bucket_name, manifest_key)
+        if remote is not None and remote.get("layout", "runs") != layout:
+            remote = None
+        changed = mf.diff_manifests(local, remote)
+        if not changed:
+            logger.info("Run %s already in sync", run_dir.name)
+            continue
+
+        for rel_path in changed:
+            sha256 = local["artifacts"][rel_path]["sha256"]
+            if dedup:
+                if sha256 in remote_blobs:
+                    continue
+                s3_key = f"{blob_prefix}/{sha256}"
+            else:
+                s3_key = f"{prefix}/{run_dir.name}/{rel_path}"
+            source = run_dir / rel_path
+            if blobs is not None and not source.exists():
+                source = blobs.path(sha256)
+            try:
+                with open(source, "rb") as file_data:
+                    s_3.put_object(Bucket=bucket_name, Key=s3_key, Body=file_data)
+                METRICS.inc("s3_bytes_uploaded_total", local["artifacts"][rel_path]["size"])
+                METRICS.inc("s3_objects_uploaded_total")
+            except Exception as e:
+                logger.error(
+                    "Failed to upload %(lfp)s to S3 location: %(bucket_name)s/%(s3_key)s",
+                    {"lfp": run_dir / rel_path, "bucket_name": bucket_name, "s3_key": s3_key},
+                )
+                raise NotImplementedError from e
+            remote_blobs.add(sha256)
+            s3_uris.append(f"s3://{bucket_name}/{s3_key}")
+
+        # Manifest goes last so an interrupted sync is retried on the next run
+        s_3.put_object(
+            Bucket=bucket_name, Key=manifest_key, Body=yaml.dump(local).encode("utf-8")
+        )
+        logger.info(
+            "Synced %(n)s changed artifacts of run %(run)s to %(bucket_name)s/%(prefix)s",
+            {"n": len(changed), "run": run_dir.name, "bucket_name": bucket_name, "prefix": prefix},
+        )
+
+    return s3_uris
+
+
+def collect_remote_garbage(config: dict, grace_seconds: float = 3600, dry_run: bool = False) -> dict:
+    """Delete the blobs under `<prefix>/blobs/` that no remote run manifest references
+    Blobs are listed before the manifests are read and blobs uploaded in the
+    last grace_seconds are kept. A sync that reuses an old blob only uploads
+    the manifest referencing it, so do not collect while a sync is running.
+    Args:
+        config (dict): Configuration of s3 bucket
+        grace_seconds (float, optional): minimum age of a deleted blob. Defaults to 3600.
+        dry_run (bool, optional): report without deleting. Defaults to False.
+    Return:
+        dict: number and bytes of the blobs deleted and the number kept
+    """
+    s_3 = boto3.client("s3")
+    bucket_name = config["bucket_name"]
+    prefix = config["prefix"]
+    blob_prefix = f"{prefix}/blobs/"
+    paginator = s_3.get_paginator("list_objects_v2")
+
+    blobs = {}
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=blob_prefix):
+        for obj in page.get("Contents", []):
+            blobs[obj["Key"]] = obj
+    referenced = set()
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix + "/"):
+        for obj in page.get("Contents", []):
+            if obj["Key"].startswith(blob_prefix) or not obj["Key"].endswith("/" + mf.MANIFEST_NAME):
+                continue
+            remote = _fetch_remote_manifest(s_3, bucket_name, obj["Key"]) or {}
+            if remote.get("layout") == "blobs":
+                referenced.update(entry["sha256"] for entry in remote["artifacts"].values())
+
+    cutoff = time.time() - grace_seconds
+    result = {"deleted": 0, "bytes": 0, "kept": 0}
+    stale = []
+    for key, obj in blobs.items():
+        if key.rsplit("/", 1)[-1] in referenced or obj["LastModified"].timestamp() > cutoff:
+            result["kept"] += 1
+            continue
+        stale.append(key)
+        result["deleted"] += 1
+        result["bytes"] += obj["Size"]
+    if not dry_run:
+        # delete_objects takes at most 1000 keys per call
+        for start in range(0, len(stale), 1000):
+            batch = [{"Key": key} for key in stale[start : start + 1000]]
+            s_3.delete_objects(Bucket=bucket_name, Delete={"Objects": batch, "Quiet": True})
+    logger.info(
+        "%(verb)s %(n)s unreferenced blobs (%(b)s bytes) from %(bucket_name)s/%(prefix)s, kept %(k)s",
+        {
+            "verb": "Would delete" if dry_run else "Deleted",
+            "n": result["deleted"],
+            "b": result["bytes"],
+            "bucket_name": bucket_name,
+            "prefix": blob_prefix,
+            "k": result["kept"],
+        },
+    )
+    return result
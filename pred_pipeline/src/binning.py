@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import yaml
+from src.telemetry import METRICS
+
+logger = logging.getLogger("clouds")
+
+
+@dataclass
+class Binner:
+    """Quantile bin edges of each feature
+
+    A value x of a feature gets the code of the number of edges <= x, after
+    rounding x to float32 as tree models do. Edges are float32 values, so a
+    code is at most len(edges) <= 254 and fits in a uint8.
+
+    Attributes:
+        columns (list): feature names, in order
+        edges (list): sorted float32 edges per feature
+    """
+
+    columns: List[str]
+    edges: List[np.ndarray]
+
+    @classmethod
+    def fit(
+        cls, x: pd.DataFrame, max_bins: int = 255, subsample: Optional[int] = 200_000, seed: int = 0
+    ) -> "Binner":
+        """Place edges at the quantiles of each feature
+        Args:
+            x (pd.DataFrame): feature values
+            max_bins (int, optional): bins per feature, at most 255. Defaults to 255.
+            subsample (int, optional): rows the quantiles are computed on; None uses all
+            seed (int, optional): seed of the subsample. Defaults to 0.
+
+        Returns:
+            Binner: the edges
+        """
+        if not 2 <= max_bins <= 255:
+            logger.error("max_bins must be between 2 and 255, got %s", max_bins)
+            raise NotImplementedError
+        values = x.to_numpy(dtype=np.float32)
+        if subsample is not None and len(values) > subsample:
+            rows = np.random.default_rng(seed).choice(len(values), subsample, replace=False)
+            values = values[np.sort(rows)]
+        edges = []
+        for j in range(values.shape[1]):
+            column = values[:, j][np.isfinite(values[:, j])]
+            distinct = np.unique(column)
+            if len(distinct) <= max_bins:
+                # Every distinct value gets its own bin
+                edges.append(distinct[1:])
+            else:
+                quantiles = np.quantile(column, np.linspace(0, 1, max_bins + 1)[1:-1])
+                edges.append(np.unique(quantiles.astype(np.float32)))
+        return cls(list(x.columns), edges)
+
+    def transform(self, x: pd.DataFrame) -> pd.DataFrame:
+        """Bin codes of the features, as a uint8 frame with the same index and columns"""
+        codes = np.empty((len(x), len(self.columns)), dtype=np.uint8)
+        for j, column in enumerate(self.columns):
+            values = x[column].to_numpy(dtype=np.float32)
+            codes[:, j] = np.searchsorted(self.edges[j], values, side="right")
+        return pd.DataFrame(codes, index=x.index, columns=self.columns)
+
+
+def _cache_key(x: pd.DataFrame, config: dict) -> str:
+    """Hash of the feature values and binning settings; identical training sets share it"""
+    digest = hashlib.sha256()
+    digest.update(yaml.safe_dump({
+        "columns": list(x.columns),
+        "max_bins": config["max_bins"],
+        "subsample": config.get("subsample"),
+    }).encode("utf-8"))
+    digest.update(np.ascontiguousarray(x.index.to_numpy()).tobytes())
+    digest.update(np.ascontiguousarray(x.to_numpy(dtype=np.float32)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def bin_features(x: pd.DataFrame, config: dict) -> Tuple[pd.DataFrame, Binner]:
+    """Bin features once and cache the codes for later fits on the same rows
+    Args:
+        x (pd.DataFrame): training features
+        config (dict): binning settings: max_bins, subsample and cache_dir
+            (null keeps the codes in memory only)
+
+    Returns:
+        codes (pd.DataFrame): uint8 bin codes of x
+        binner (Binner): the edges, to map thresholds back to feature values
+    """
+    start = time.perf_counter()
+    cache_dir = config.get("cache_dir")
+    path = None
+    if cache_dir is not None:
+        path = Path(cache_dir) / _cache_key(x, config)
+        if (path / "codes.npy").exists():
+            with np.load(path / "edges.npz") as stored:
+                binner = Binner(list(x.columns), [stored[f"e{j}"] for j in range(x.shape[1])])
+            codes = pd.DataFrame(np.load(path / "codes.npy"), index=x.index, columns=x.columns)
+            METRICS.inc("binned_cache_hits_total")
+            logger.info(
+                "Bin codes of %(n)s rows loaded from %(p)s",
+                {"n": len(x), "p": path},
+                extra={"seconds": time.perf_counter() - start},
+            )
+            return codes, binner
+    binner = Binner.fit(x, config["max_bins"], config.get("subsample"))
+    codes = binner.transform(x)
+    if path is not None:
+        path.mkdir(parents=True, exist_ok=True)
+        np.savez(path / "edges.npz", **{f"e{j}": edges for j, edges in enumerate(binner.edges)})
+        # Written last: its presence marks a complete entry
+        np.save(path / "codes.npy", codes.to_numpy())
+    logger.info(
+        "%(n)s rows binned into at most %(b)s bins per feature",
+        {"n": len(x), "b": config["max_bins"]},
+        extra={"seconds": time.perf_counter() - start},
+    )
+    return codes, binner
+
+
+def _below(edges: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Edge each code threshold stands for: code <= t holds for values below edges[floor(t)]"""
+    index = np.floor(thresholds).astype(np.int64)
+    padded = np.append(edges, np.float32(np.inf))
+    return padded[np.minimum(index, len(edges))]
+
+
+def unbin(model: object, binner: Binner) -> object:
+    """Rewrite the split thresholds of a tree model fitted on bin codes into feature values
+    The model then scores raw features exactly as it scored their codes, so it
+    is saved, scored, exported and explained like a model fitted on raw values.
+    Args:
+        model (object): fitted model for which supports_binning holds
+        binner (Binner): the edges the codes were computed with
+
+    Returns:
+        object: the model, modified in place
+    """
+    estimators = getattr(model, "estimators_", None)
+    if hasattr(model, "tree_"):
+        trees = [model]
+    elif estimators is not None and all(hasattr(tree, "tree_") for tree in np.ravel(estimators)):
+        trees = list(np.ravel(estimators))
+    else:
+        trees = []
+    for tree in trees:
+        nodes = tree.tree_
+        split = nodes.children_left != -1
+        for j, edges in enumerate(binner.edges):
+            at = split & (nodes.feature == j)
+            # Trees compare float32 values: x < e is x <= the float32 just below e
+            below = _below(edges, nodes.threshold[at])
+            nodes.threshold[at] = np.nextafter(below, np.float32(-np.inf), dtype=np.float32)
+    if trees:
+        return model
+
+    predictors = getattr(model, "_predictors", None)
+    if predictors is None:
+        logger.error("Binned training does not support %s models", type(model).__name__)
+        raise NotImplementedError
+    for iteration in predictors:
+        for predictor in iteration:
+            nodes = predictor.nodes
+            for j, edges in enumerate(binner.edges):
+                at = (nodes["is_leaf"] == 0) & (nodes["feature_idx"] == j)
+                below = _below(edges, nodes["num_threshold"][at])
+                # Float64 values round to a float32 below e up to the midpoint with
+                # the float32 before e
+                before = np.nextafter(below, np.float32(-np.inf), dtype=np.float32)
+                middle = (before.astype(np.float64) + below.astype(np.float64)) / 2
+                nodes["num_threshold"][at] = np.nextafter(middle, -np.inf)
+    return model
+
+
+def supports_binning(model: object) -> bool:
+    """Whether unbin can map the thresholds of a model back to feature values"""
+    from sklearn import ensemble
+    from sklearn.tree import BaseDecisionTree
+
+    return isinstance(
+        model,
+        (
+            BaseDecisionTree,
+            ensemble.RandomForestClassifier,
+            ensemble.RandomForestRegressor,
+            ensemble.ExtraTreesClassifier,
+            ensemble.ExtraTreesRegressor,
+            ensemble.GradientBoostingClassifier,
+            ensemble.GradientBoostingRegressor,
+            ensemble.HistGradientBoostingClassifier,
+            ensemble.HistGradientBoostingRegressor,
+        ),
+    )
+
+
+def fit_binned(model: object, x: pd.DataFrame, y: pd.Series, config: dict) -> object:
+    """Fit a tree model on cached bin codes of the features
+    Sorting and split search work on at most max_bins distinct values per
+    feature instead of every distinct value, and the codes take a quarter of
+    the memory of float32 features.
+    Args:
+        model (object): unfitted tree model, see supports_binning
+        x (pd.DataFrame): training features
+        y (pd.Series): training target
+        config (dict): binning settings, see bin_features
+
+    Returns:
+        object: the fitted model, scoring raw feature values
+    """
+    if not supports_binning(model):
+        logger.error("Binned training does not support %s models", type(model).__name__)
+        raise NotImplementedError
+    codes, binner = bin_features(x, config)
+    model.fit(codes, y)
+    return unbin(model, binner)
@@ -0,0 +1,179 @@
+import logging
+from pathlib import Path
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from clouds_common.calibration import apply_calibrator, logit, predict_calibrated  # noqa: F401
+
+logger = logging.getLogger("clouds")
+
+
+def fit_calibrator(prob: np.ndarray, target: np.ndarray, method: str) -> dict:
+    """Fit a map from model probabilities to calibrated probabilities
+    The calibrator is returned as plain parameters so it can be saved to yaml and
+    applied without sklearn.
+    Args:
+        prob (np.ndarray): positive-class probabilities on held-out rows
+        target (np.ndarray): 0/1 labels of the same rows
+        method (str): `isotonic` (piecewise-linear, monotone) or `platt` (sigmoid)
+
+    Returns:
+        dict: method and its parameters, see apply_calibrator
+    """
+    prob = np.asarray(prob, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    if method == "isotonic":
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(prob, target)
+        return {
+            "method": "isotonic",
+            "x": iso.X_thresholds_.tolist(),
+            "y": iso.y_thresholds_.tolist(),
+        }
+    if method == "platt":
+        platt = LogisticRegression(C=1e6).fit(logit(prob).reshape(-1, 1), target)
+        return {
+            "method": "platt",
+            "a": float(platt.coef_[0, 0]),
+            "b": float(platt.intercept_[0]),
+        }
+    logger.error("Calibration method %s is not supported, use isotonic or platt", method)
+    raise NotImplementedError
+
+
+def threshold_metrics(target: np.ndarray, prob: np.ndarray) -> Dict[str, np.ndarray]:
+    """Confusion counts and metrics at every distinct cutoff in one pass
+    Rows are sorted once by descending probability; the cumulative sum of labels
+    then gives the true positives of predicting positive for every row at or
+    above each cutoff.
+    Args:
+        target (np.ndarray): 0/1 labels
+        prob (np.ndarray): positive-class probabilities
+
+    Returns:
+        dict: cutoff and tp/fp/tn/fn, precision, recall, f1, accuracy and youden
+            (tpr - fpr) arrays, one entry per distinct cutoff in descending order
+    """
+    target = np.asarray(target, dtype=np.int64)
+    prob = np.asarray(prob, dtype=np.float64)
+    order = np.argsort(-prob, kind="mergesort")
+    prob_sorted = prob[order]
+    tp = np.cumsum(target[order])
+    fp = np.arange(1, len(target) + 1) - tp
+
+    # Rows tied on probability are on the same side of any cutoff
+    last = np.r_[np.flatnonzero(np.diff(prob_sorted)), len(prob_sorted) - 1]
+    tp, fp = tp[last], fp[last]
+    pos, neg = tp[-1], fp[-1]
+    fn, tn = pos - tp, neg - fp
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(tp / (tp + fp))
+        recall = np.nan_to_num(tp / pos)
+        fpr = np.nan_to_num(fp / neg)
+        f1 = np.nan_to_num(2 * tp / (2 * tp + fp + fn))
+    return {
+        "threshold": prob_sorted[last],
+        "tp": tp,
+        "fp": fp,
+        "tn": tn,
+        "fn": fn,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "accuracy": (tp + tn) / len(target),
+        "youden": recall - fpr,
+    }
+
+
+def optimize_threshold(target: np.ndarray, prob: np.ndarray, metric: str) -> Tuple[float, float]:
+    """Find the cutoff maximizing a metric
+    Args:
+        target (np.ndarray): 0/1 labels
+        prob (np.ndarray): positive-class probabilities
+        metric (str): one of f1, accuracy, youden, precision, recall
+
+    Returns:
+        threshold (float): rows with probability >= threshold are predicted positive
+        value (float): metric at that threshold
+    """
+    curve = threshold_metrics(target, prob)
+    if metric not in curve or metric in ("threshold", "tp", "fp", "tn", "fn"):
+        logger.error("Threshold metric %s is not supported", metric)
+        raise NotImplementedError
+    best = int(np.argmax(curve[metric]))
+    return float(curve["threshold"][best]), float(curve[metric][best])
+
+
+def calibrate_model(calibration: pd.DataFrame, model: object, config: dict) -> dict:
+    """Fit a calibrator and decision threshold on held-out rows
+    Args:
+        calibration (pd.DataFrame): rows held out of model training
+        model (object): trained model
+        config (dict): configurations for calibration
+
+    Returns:
+        dict: calibrator parameters, threshold, the optimized metric and its value
+    """
+    if calibration.empty:
+        logger.error("No held-out rows to calibrate on; set train_test_split.calibration_size")
+        raise NotImplementedError
+    prob = model.predict_proba(calibration[config["initial_features"]])[:, 1]
+    target = calibration[config["target"]].to_numpy()
+    calibrator = fit_calibrator(prob, target, config["method"])
+    threshold, value = optimize_threshold(
+        target, apply_calibrator(calibrator, prob), config["metric"]
+    )
+    logger.info(
+        "Model calibrated with %(method)s, threshold %(t).4f gives %(metric)s %(v).4f",
+        {"method": config["method"], "t": threshold, "metric": config["metric"], "v": value},
+    )
+    return {
+        "calibrator": calibrator,
+        "threshold": threshold,
+        "metric": config["metric"],
+        "value": value,
+        "classes": np.asarray(model.classes_).tolist(),
+    }
+
+
+def save_calibration(calibration: dict, path: Path) -> None:
+    """save calibrator and threshold next to the model
+    Args:
+        calibration (dict): output of calibrate_model
+        path (Path): path to save calibration yaml
+    Returns:
+        None
+    """
+    try:
+        with open(path, "w") as file:
+            yaml.dump(calibration, file)
+        logger.info("Calibration saved to %s", path)
+    except Exception as e:
+        logger.error(
+            "Calibration failed to save to %(p)s due to: %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
+
+
+def load_calibration(path: Path) -> dict:
+    """load calibrator and threshold written by save_calibration
+    Args:
+        path (Path): path of the calibration yaml
+    Returns:
+        dict: calibrator parameters and threshold
+    """
+    try:
+        with open(path, "r") as file:
+            calibration = yaml.safe_load(file)
+        logger.info("Calibration loaded from %s", path)
+    except Exception as e:
+        logger.error(
+            "Calibration failed to load from %(p)s due to: %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
+    return calibration
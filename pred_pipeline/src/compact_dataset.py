@@ -0,0 +1,190 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("clouds")
+
+
+@dataclass
+class CompactDataset:
+    """Clouds dataset held as one column-major 2-D array plus a column map
+
+    Columns are contiguous in memory (Fortran order), so a single feature is a
+    view and appending engineered features writes into spare columns reserved
+    at creation time instead of reallocating the whole table.
+
+    Attributes:
+        buffer (np.ndarray): (n_rows, capacity) array, only the first len(columns) columns are used
+        columns (dict): column name -> column position in buffer
+        labels (np.ndarray): uint8 class label per row
+        target (str): name of the label column when converted to a DataFrame
+        index (np.ndarray): int64 id of each row in the full dataset, kept through
+            take like a DataFrame index; defaults to the row positions
+    """
+
+    buffer: np.ndarray
+    columns: Dict[str, int]
+    labels: np.ndarray
+    target: str = "class"
+    index: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        if self.index is None:
+            self.index = np.arange(self.buffer.shape[0], dtype=np.int64)
+
+    @property
+    def values(self) -> np.ndarray:
+        """View of the used columns"""
+        return self.buffer[:, : len(self.columns)]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the feature buffer, the labels and the row ids"""
+        return self.buffer.nbytes + self.labels.nbytes + self.index.nbytes
+
+    def __len__(self) -> int:
+        return self.buffer.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a view of a single column"""
+        return self.buffer[:, self.columns[name]]
+
+    def add_column(self, name: str) -> np.ndarray:
+        """Claim the next spare column for a new feature and return a writable view
+        The buffer is only reallocated when no spare column is left.
+        """
+        if name in self.columns:
+            return self.column(name)
+        position = len(self.columns)
+        if position == self.buffer.shape[1]:
+            logger.warning("No spare column left for %s, reallocating compact dataset", name)
+            grown = np.empty(
+                (self.buffer.shape[0], position + 1), dtype=self.buffer.dtype, order="F"
+            )
+            grown[:, :position] = self.buffer
+            self.buffer = grown
+        self.columns[name] = position
+        return self.buffer[:, position]
+
+    def select(self, names: List[str]) -> np.ndarray:
+        """Return the requested columns as a 2-D array
+        A view when the columns are stored next to each other in the requested
+        order, a copy otherwise.
+        """
+        positions = [self.columns[name] for name in names]
+        start = positions[0]
+        if positions == list(range(start, start + len(positions))):
+            return self.buffer[:, start : start + len(positions)]
+        return self.buffer[:, positions]
+
+    def take(self, rows: np.ndarray) -> "CompactDataset":
+        """Return a new dataset holding the given row positions, spare columns included
+        The rows keep their ids, so a sample or the rows passing validation
+        are indexed like the same rows of a DataFrame.
+        """
+        return CompactDataset(
+            buffer=np.asfortranarray(self.buffer[rows]),
+            columns=dict(self.columns),
+            labels=self.labels[rows],
+            target=self.target,
+            index=self.index[rows],
+        )
+
+    def to_frame(self, names: Optional[List[str]] = None, with_target: bool = True) -> pd.DataFrame:
+        """Wrap (a subset of) the columns in a DataFrame indexed by the row ids,
+        without copying contiguous columns
+        """
+        names = list(self.columns) if names is None else names
+        frame = pd.DataFrame(self.select(names), index=self.index, columns=names, copy=False)
+        if with_target:
+            frame[self.target] = self.labels
+        return frame
+
+
+def float32_permits(values: np.ndarray, decimals: Optional[int] = None) -> bool:
+    """Check that float32 keeps the precision the values carry
+    A float32 value is within half its spacing of the float64 value, about
+    6e-8 relative; whether that loses information depends on how many
+    decimals the data has, not on a fixed relative tolerance.
+    Args:
+        values (np.ndarray): float64 values
+        decimals (int, optional): decimals the values are given to, e.g. those of
+            the raw file; each float32 value must round back to the same value.
+            None only checks that the values fit the float32 range.
+
+    Returns:
+        bool: True if float32 keeps the values
+    """
+    if values.ndim == 2:
+        # Column by column keeps the temporaries to the size of one column
+        return all(float32_permits(values[:, j], decimals) for j in range(values.shape[1]))
+    finite = values[np.isfinite(values)]
+    if finite.size and np.abs(finite).max() > np.finfo(np.float32).max:
+        return False
+    if decimals is None:
+        return True
+    error = np.abs(finite.astype(np.float32).astype(np.float64) - finite)
+    return bool(finite.size == 0 or error.max() < 0.5 * 10.0 ** -decimals)
+
+
+def from_arrays(
+    values: np.ndarray,
+    columns: List[str],
+    labels: np.ndarray,
+    target: str = "class",
+    reserve: int = 0,
+    decimals: Optional[int] = None,
+    index: Optional[np.ndarray] = None,
+) -> CompactDataset:
+    """Build a compact dataset from a float64 feature matrix and labels
+    Args:
+        values (np.ndarray): (n_rows, n_columns) feature values
+        columns (list): column names in the order of values
+        labels (np.ndarray): class label per row
+        target (str, optional): name of the label column. Defaults to "class".
+        reserve (int, optional): spare columns to allocate for engineered features. Defaults to 0.
+        decimals (int, optional): decimals float32 must keep, see float32_permits
+        index (np.ndarray, optional): integer id per row. Defaults to the row positions.
+
+    Returns:
+        CompactDataset: float32 buffer when precision permits, float64 otherwise
+    """
+    permits = float32_permits(np.asarray(values, dtype=np.float64), decimals)
+    dtype = np.float32 if permits else np.float64
+    if dtype is np.float64:
+        logger.warning("float32 would lose precision, keeping compact dataset in float64")
+    buffer = np.empty((values.shape[0], len(columns) + reserve), dtype=dtype, order="F")
+    buffer[:, : len(columns)] = values
+    return CompactDataset(
+        buffer=buffer,
+        columns={name: i for i, name in enumerate(columns)},
+        labels=np.asarray(labels, dtype=np.uint8),
+        target=target,
+        index=None if index is None else np.asarray(index, dtype=np.int64),
+    )
+
+
+def from_frame(
+    data: pd.DataFrame,
+    columns: List[str],
+    target: str,
+    reserve: int = 0,
+    decimals: Optional[int] = None,
+) -> CompactDataset:
+    """Build a compact dataset from a DataFrame
+    Args:
+        data (pd.DataFrame): dataset with feature and target columns
+        columns (list): feature columns to keep
+        target (str): name of the label column
+        reserve (int, optional): spare columns to allocate for engineered features. Defaults to 0.
+        decimals (int, optional): decimals float32 must keep, see float32_permits
+
+    Returns:
+        CompactDataset: compact copy of the data, keeping its integer index as row ids
+    """
+    values = data[columns].to_numpy()
+    return from_arrays(
+        values, columns, data[target].to_numpy(), target, reserve, decimals, data.index.to_numpy()
+    )
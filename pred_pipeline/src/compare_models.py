@@ -0,0 +1,164 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import pandas as pd
+import yaml
+from joblib import parallel_backend
+from threadpoolctl import threadpool_limits
+from src.binning import Binner, bin_features, supports_binning, unbin
+from src.evaluate_performance import evaluate_performance
+from src.resources import available_cores
+from src.score_model import score_model
+from src.train_model import save_model
+
+logger = logging.getLogger("clouds")
+
+# Training rows of the current worker process, set once by the pool initializer
+_WORKER_DATA = None
+
+
+def threads_per_model(n_workers: int, threads: Optional[int] = None) -> int:
+    """Threads each model may use so that all workers together fit on the cores
+    Args:
+        n_workers (int): models trained at the same time
+        threads (int, optional): requested threads per model, capped to the fair share
+
+    Returns:
+        int: threads per model, at least 1
+    """
+    share = max(1, available_cores() // max(1, n_workers))
+    return share if threads is None else max(1, min(threads, share))
+
+
+def _init_worker(
+    x_train: pd.DataFrame, y_train: pd.Series, binned: Optional[Tuple[pd.DataFrame, Binner]] = None
+) -> None:
+    """Keep the training rows in the worker so they are sent once per process, not per model"""
+    global _WORKER_DATA
+    _WORKER_DATA = (x_train, y_train, binned)
+
+
+def _fit_candidate(spec: dict, n_threads: int) -> object:
+    """Fit one candidate model with its joblib and BLAS/OpenMP threads bounded
+    Estimators left at n_jobs=None take their job count from the joblib backend.
+    In binned mode tree models are fitted on the shared bin codes.
+    """
+    x_train, y_train, binned = _WORKER_DATA
+    model_class = getattr(import_module(spec["model_lib"]), spec["type"])
+    model = model_class(**spec.get("hyperparam", {}))
+    with threadpool_limits(limits=n_threads), parallel_backend("threading", n_jobs=n_threads):
+        if binned is not None and supports_binning(model):
+            codes, binner = binned
+            model = unbin(model.fit(codes, y_train), binner)
+        else:
+            model.fit(x_train, y_train)
+    return model
+
+
+def train_candidates(train: pd.DataFrame, config: dict) -> Dict[str, object]:
+    """Train every candidate model on the same training rows, several at a time
+    Args:
+        train (pd.DataFrame): training rows with features and target
+        config (dict): configurations for model comparison
+
+    Returns:
+        dict: candidate name -> fitted model
+    """
+    specs = config["candidates"]
+    x_train = train[config["initial_features"]]
+    y_train = train[config["target"]]
+    n_workers = min(config["n_workers"], len(specs))
+    n_threads = threads_per_model(n_workers, config.get("threads_per_model"))
+    binned = None
+    if config.get("mode", "exact") == "binned":
+        # Binned once, or loaded from the cache, for every candidate
+        binned = bin_features(x_train, config["binning"])
+    try:
+        if n_workers > 1:
+            with ProcessPoolExecutor(
+                n_workers, initializer=_init_worker, initargs=(x_train, y_train, binned)
+            ) as pool:
+                models = list(pool.map(_fit_candidate, specs, [n_threads] * len(specs)))
+        else:
+            _init_worker(x_train, y_train, binned)
+            models = [_fit_candidate(spec, n_threads) for spec in specs]
+    except Exception as e:
+        logger.error(
+            "Candidate models could not be trained due to %s. "
+            "Please check the formatting of config.yaml",
+            e,
+        )
+        raise NotImplementedError from e
+    logger.info(
+        "%(n)s candidate models trained with %(w)s workers and %(t)s threads each",
+        {"n": len(specs), "w": n_workers, "t": n_threads},
+    )
+    return {spec["name"]: model for spec, model in zip(specs, models)}
+
+
+def compare_models(
+    models: Dict[str, object], test: pd.DataFrame, config: dict, eval_config: dict
+) -> pd.DataFrame:
+    """Evaluate models on the same test rows and rank them
+    Args:
+        models (dict): model name -> fitted model
+        test (pd.DataFrame): test rows with features and target
+        config (dict): configurations for model comparison
+        eval_config (dict): configurations for evaluate_performance
+
+    Returns:
+        pd.DataFrame: one row per model with its scalar metrics, best first
+    """
+    rows = []
+    for name, model in models.items():
+        scores = score_model(test, model, config)
+        metrics = evaluate_performance(test, scores, eval_config)
+        scalars = {
+            metric: value
+            for metric, value in metrics.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        rows.append({"model": name, "type": type(model).__name__, **scalars})
+    comparison = pd.DataFrame(rows).sort_values(config["rank_by"], ascending=False, kind="stable")
+    comparison.insert(0, "rank", range(1, len(comparison) + 1))
+    logger.info(
+        "Best of %(n)s models by %(metric)s: %(best)s",
+        {"n": len(comparison), "metric": config["rank_by"], "best": comparison["model"].iloc[0]},
+    )
+    return comparison.reset_index(drop=True)
+
+
+def save_candidates(
+    models: Dict[str, object], comparison: pd.DataFrame, config: dict, model_dir: Path, path: Path
+) -> None:
+    """save fitted models, the ranked comparison and a registry of the models
+    The registry lists the models in the model_config format of the webapp,
+    best first, so entries can be copied into its config.
+    Args:
+        models (dict): model name -> fitted model
+        comparison (pd.DataFrame): output of compare_models
+        config (dict): configurations for model comparison
+        model_dir (Path): directory to save the models
+        path (Path): directory to save the comparison and registry
+    Returns:
+        None
+    """
+    for name, model in models.items():
+        save_model(model, model_dir / f"{name}.pkl")
+    registry = {
+        name: [{"name": f"{name}.pkl"}, {"features": list(config["initial_features"])}]
+        for name in comparison["model"]
+    }
+    try:
+        comparison.to_csv(path / "comparison.csv", index=False)
+        with open(path / "registry.yaml", "w") as file:
+            yaml.dump(registry, file, sort_keys=False)
+        logger.info("Model comparison saved to %s", path)
+    except Exception as e:
+        logger.error(
+            "Model comparison failed to save to %(p)s due to: %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
@@ -1,21 +1,54 @@
 import logging
 from pathlib import Path
+from typing import Tuple
 import pandas as pd
 import numpy as np
+from src.compact_dataset import CompactDataset, from_arrays
+from src.raw_index import find_block, load_index, read_block
 
 logger = logging.getLogger("clouds")
 
 
-def create_dataset(path_of_raw: Path, config: dict) -> pd.DataFrame:
-    """Create pandas dataframe from path
+def _read_indexed_clouds(path_of_raw: Path, config: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse both clouds from the blocks of the raw file index
+    The file is scanned once to index its data blocks; later reads of the same
+    file only parse the bytes of the selected blocks.
     Args:
-        Args:
         path_of_raw (Path): the path where raw data is
         config (dict): config file for dataset creation
 
     Returns:
-        pd.Dataframe: clean dataset
+        first_cloud (np.ndarray): float values of the first cloud
+        second_cloud (np.ndarray): float values of the second cloud
+    """
+    columns = config["data"]["columns"]
+    data_prep = config["data_prep"]
+    index = load_index(path_of_raw, data_prep.get("index_dir"), data_prep.get("min_rows", 2))
+    clouds = []
+    for name in ("first_cloud", "second_cloud"):
+        block = find_block(index, data_prep[name]["block"])
+        if block["min_cols"] != len(columns):
+            logger.warning(
+                "The rows of the %(name)s block (%(header)s) have %(n)s values but there are %(c)s columns",
+                {"name": name, "header": block["header"], "n": block["min_cols"], "c": len(columns)},
+            )
+        clouds.append(read_block(path_of_raw, block))
+    return clouds[0], clouds[1]
+
+
+def _read_clouds(path_of_raw: Path, config: dict) -> Tuple[list, list]:
+    """Parse the rows of both clouds from the raw file
+    Args:
+        path_of_raw (Path): the path where raw data is
+        config (dict): config file for dataset creation
+
+    Returns:
+        first_cloud (list or np.ndarray): rows of float values of the first cloud
+        second_cloud (list or np.ndarray): rows of float values of the second cloud
     """
+    if config["data_prep"].get("reader", "offsets") == "index":
+        return _read_indexed_clouds(path_of_raw, config)
+
     # Dataset column names
     columns = config["data"]["columns"]
     with open(path_of_raw, "r") as f:
@@ -46,9 +79,6 @@ def create_dataset(path_of_raw: Path, config: dict) -> pd.DataFrame:
         logger.error(e)
         raise NotImplementedError from e
 
-    first_cloud = pd.DataFrame(first_cloud, columns=columns)
-    first_cloud["class"] = np.zeros(len(first_cloud))
-
     # Select second cloud
     second_cloud_data_left = config["data_prep"]["second_cloud"]["left"]
     second_cloud_data_right = config["data_prep"]["second_cloud"]["right"]
@@ -73,30 +103,93 @@ def create_dataset(path_of_raw: Path, config: dict) -> pd.DataFrame:
     except ValueError as e:
         logger.error(e)
         raise NotImplementedError from e
+
+    return first_cloud, second_cloud
+
+
+def create_dataset(path_of_raw: Path, config: dict) -> pd.DataFrame:
+    """Create pandas dataframe from path
+    Args:
+        Args:
+        path_of_raw (Path): the path where raw data is
+        config (dict): config file for dataset creation
+
+    Returns:
+        pd.Dataframe: clean dataset
+    """
+    columns = config["data"]["columns"]
+    first_cloud, second_cloud = _read_clouds(path_of_raw, config)
+
+    first_cloud = pd.DataFrame(first_cloud, columns=columns)
+    first_cloud["class"] = np.zeros(len(first_cloud))
     second_cloud = pd.DataFrame(second_cloud, columns=columns)
     second_cloud["class"] = np.ones(len(second_cloud))
 
-    # Create final
-    data = pd.concat([first_cloud, second_cloud])
+    # Create final; one continuous index so rows can be looked up by position
+    data = pd.concat([first_cloud, second_cloud], ignore_index=True)
 
     logger.info("Clean dataset created")
 
     return data
 
 
+def create_compact_dataset(path_of_raw: Path, config: dict, reserve: int = 0) -> CompactDataset:
+    """Create compact dataset (float32 features, uint8 labels) from path
+    Skips the intermediate float64 DataFrames and the concatenation of
+    create_dataset.
+    Args:
+        path_of_raw (Path): the path where raw data is
+        config (dict): config file for dataset creation
+        reserve (int, optional): spare columns to allocate for engineered features. Defaults to 0.
+
+    Returns:
+        CompactDataset: clean dataset in one contiguous column-major array
+    """
+    columns = config["data"]["columns"]
+    first_cloud, second_cloud = _read_clouds(path_of_raw, config)
+
+    labels = np.zeros(len(first_cloud) + len(second_cloud), dtype=np.uint8)
+    labels[len(first_cloud):] = 1
+    values = np.vstack([first_cloud, second_cloud])
+    data = from_arrays(values, columns, labels, "class", reserve, config["data"].get("decimals"))
+
+    logger.info("Compact %s dataset created", data.buffer.dtype)
+
+    return data
+
+
 def save_dataset(data: pd.DataFrame, path_of_clean: Path) -> None:
     """Save dataframe to csv in path
     Args:
         Args:
-        data (pd.Dataframe): pandas dataframe to save
+        data (pd.Dataframe or CompactDataset): dataset to save
         path_of_clean (Path): paht to save cleaned dataset
 
     Returns:
         None
     """
+    if isinstance(data, CompactDataset):
+        data = data.to_frame()
     try:
         data.to_csv(path_of_clean)
         logger.info("Saved dataset to %s", path_of_clean)
     except Exception as e:
         logger.error("Failed to save dataset due to: %s", e)
         raise NotImplementedError from e
+
+
+def load_dataset(path_of_clean: Path) -> pd.DataFrame:
+    """Load a dataset previously written by save_dataset
+    Args:
+        path_of_clean (Path): path of the cleaned dataset
+
+    Returns:
+        pd.Dataframe: clean dataset
+    """
+    try:
+        data = pd.read_csv(path_of_clean, index_col=0)
+        logger.info("Loaded dataset from %s", path_of_clean)
+    except Exception as e:
+        logger.error("Failed to load dataset due to: %s", e)
+        raise NotImplementedError from e
+    return data
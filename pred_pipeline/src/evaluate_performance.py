@@ -1,6 +1,7 @@
 from pathlib import Path
 from importlib import import_module
 import logging
+from typing import Optional
 import yaml
 import pandas as pd
 import numpy as np
@@ -46,12 +47,19 @@ def evaluate_performance(
     return metric_dict
 
 
-def save_metrics(metrics: dict, path: Path) -> None:
+def save_metrics(
+    metrics: dict,
+    path: Path,
+    index_path: Optional[Path] = None,
+    run_info: Optional[dict] = None,
+) -> None:
     """Save values of model performance metrics
     Args:
         Args:
         metrics (dict): dictionary of metrics
         path (Path): path to save metrics
+        index_path (Path, optional): sqlite metrics index to record the run in
+        run_info (dict, optional): run_id, config and timings of the run, required with index_path
     Returns:
         None
     """
@@ -62,3 +70,14 @@ def save_metrics(metrics: dict, path: Path) -> None:
     except Exception as e:
         logger.warning("Failed to save metrics yaml file to %s", path)
         raise NotImplementedError from e
+
+    if index_path is not None:
+        from src import metrics_index as mi
+
+        mi.record_run(
+            index_path,
+            run_info["run_id"],
+            run_info["config"],
+            metrics,
+            run_info.get("timings"),
+        )
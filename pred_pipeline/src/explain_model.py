@@ -0,0 +1,158 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from clouds_common.explain import is_explainable, tree_edges
+
+logger = logging.getLogger("clouds")
+
+# Model of the current worker process, set once by the pool initializer
+_WORKER_MODEL = None
+
+
+def tree_path_attributions(model: object, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row feature attributions of a tree or tree ensemble
+    Follows each row's decision path and credits every change in predicted
+    probability to the feature of the split that caused it. Bias plus the
+    attributions of a row add up to the model's positive-class probability.
+    Args:
+        model (object): fitted sklearn decision tree or forest classifier
+        x (np.ndarray): (n_rows, n_features) input rows
+
+    Returns:
+        bias (np.ndarray): (n_rows,) expected probability before any split
+        contributions (np.ndarray): (n_rows, n_features) attribution per feature
+    """
+    if not is_explainable(model):
+        logger.error("Model %s has no tree structure to explain", type(model).__name__)
+        raise NotImplementedError
+    trees = getattr(model, "estimators_", [model])
+
+    x = np.asarray(x, dtype=np.float32)
+    contributions = np.zeros(x.shape, dtype=np.float64)
+    bias = 0.0
+    for tree in trees:
+        tree_bias, edges = tree_edges(tree, x.shape[1])
+        contributions += (tree.tree_.decision_path(x) @ edges).toarray()
+        bias += tree_bias
+    return np.full(x.shape[0], bias / len(trees)), contributions / len(trees)
+
+
+def _init_worker(model: object) -> None:
+    """Keep the model in the worker so it is sent once per process, not per chunk"""
+    global _WORKER_MODEL
+    _WORKER_MODEL = model
+
+
+def _explain_chunk(x: np.ndarray) -> np.ndarray:
+    """Bias and attributions of one chunk, computed in a pool worker"""
+    bias, contributions = tree_path_attributions(_WORKER_MODEL, x)
+    return np.column_stack([bias, contributions])
+
+
+class AttributionCache:
+    """Bounded LRU cache of attributions keyed by the raw bytes of an input row
+
+    Args:
+        maxsize (int): number of rows kept
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Attribution of a row, None if not cached"""
+        if key in self._rows:
+            self._rows.move_to_end(key)
+            self.hits += 1
+            return self._rows[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, value: np.ndarray) -> None:
+        """Store the attribution of a row, evicting the least recently used"""
+        self._rows[key] = value
+        self._rows.move_to_end(key)
+        while len(self._rows) > self.maxsize:
+            self._rows.popitem(last=False)
+
+
+def explain_model(
+    test: pd.DataFrame,
+    model: object,
+    config: dict,
+    cache: Optional[AttributionCache] = None,
+) -> pd.DataFrame:
+    """Explain model predictions with per-row feature attributions
+    Identical rows are explained once; rows already in the cache are not
+    recomputed. The remaining rows are split in chunks and explained in a
+    process pool when more than one worker is configured.
+    Args:
+        test (pd.DataFrame): rows to explain
+        model (object): fitted tree-based model
+        config (dict): configurations for explanations
+        cache (AttributionCache, optional): attributions of earlier calls
+    Returns:
+        pd.DataFrame: bias and one attribution column per feature, indexed like test
+    """
+    features: List[str] = config["initial_features"]
+    x = np.ascontiguousarray(test[features].to_numpy(dtype=np.float32))
+    unique, inverse = np.unique(x, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    result = np.empty((unique.shape[0], len(features) + 1))
+
+    keys = [row.tobytes() for row in unique]
+    missing = []
+    for i, key in enumerate(keys):
+        cached = cache.get(key) if cache is not None else None
+        if cached is None:
+            missing.append(i)
+        else:
+            result[i] = cached
+
+    if missing:
+        todo = unique[missing]
+        chunk_size = config["chunk_size"]
+        chunks = [todo[start:start + chunk_size] for start in range(0, len(todo), chunk_size)]
+        n_workers = min(config["n_workers"], len(chunks))
+        if n_workers > 1:
+            with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(model,)) as pool:
+                computed = np.vstack(list(pool.map(_explain_chunk, chunks)))
+        else:
+            _init_worker(model)
+            computed = np.vstack([_explain_chunk(chunk) for chunk in chunks])
+        result[missing] = computed
+        if cache is not None:
+            for i, row in zip(missing, computed):
+                cache.put(keys[i], row)
+
+    logger.info(
+        "Explanations created for %(rows)s rows, %(unique)s unique, %(computed)s computed",
+        {"rows": len(x), "unique": len(unique), "computed": len(missing)},
+    )
+    return pd.DataFrame(result[inverse], index=test.index, columns=["bias"] + features)
+
+
+def save_explanations(explanations: pd.DataFrame, path: Path) -> None:
+    """save feature attributions of the model
+    Args:
+        explanations (pd.DataFrame): bias and attributions per row
+        path (Path): path to save explanations
+    Returns:
+        None
+    """
+    try:
+        explanations.to_csv(path)
+        logger.info("Model explanations saved to %s", path)
+    except Exception as e:
+        logger.error(
+            "Model explanations failed to save to %(p)s due to %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
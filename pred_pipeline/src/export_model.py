@@ -0,0 +1,108 @@
+import logging
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import yaml
+
+logger = logging.getLogger("clouds")
+
+
+def export_model(model: object, config: dict) -> object:
+    """Convert a fitted sklearn model to an ONNX graph
+    Args:
+        model (object): fitted sklearn classifier
+        config (dict): configurations for model export
+
+    Returns:
+        onnx.ModelProto: graph taking a float32 (n_rows, n_features) input named
+            `input` and returning `label` and `probabilities`
+    """
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    n_features = len(config["initial_features"])
+    try:
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=[("input", FloatTensorType([None, n_features]))],
+            # Plain probability matrix instead of a list of {class: probability} maps
+            options={id(model): {"zipmap": False}},
+            target_opset=config.get("target_opset"),
+        )
+        logger.info("Model exported to ONNX")
+    except Exception as e:
+        logger.error("Model could not be exported to ONNX due to %s", e)
+        raise NotImplementedError from e
+    return onnx_model
+
+
+def feature_spec(model: object, config: dict) -> dict:
+    """Describe the inputs and outputs of the exported graph
+    Args:
+        model (object): fitted sklearn classifier
+        config (dict): configurations for model export
+
+    Returns:
+        dict: ordered feature names, input dtype, output names and class labels
+    """
+    return {
+        "features": list(config["initial_features"]),
+        "input": {"name": "input", "dtype": "float32"},
+        "outputs": {"label": "label", "probabilities": "probabilities"},
+        "classes": np.asarray(model.classes_).tolist(),
+    }
+
+
+def save_export(onnx_model: object, spec: dict, model_path: Path, spec_path: Path) -> None:
+    """save exported graph and its feature spec
+    Args:
+        onnx_model (onnx.ModelProto): exported graph
+        spec (dict): feature spec of the graph
+        model_path (Path): path to save the graph
+        spec_path (Path): path to save the feature spec
+    Returns:
+        None
+    """
+    try:
+        with open(model_path, "wb") as file:
+            file.write(onnx_model.SerializeToString())
+        with open(spec_path, "w") as file:
+            yaml.dump(spec, file)
+        logger.info("ONNX model saved to %s", model_path)
+    except Exception as e:
+        logger.error(
+            "ONNX model failed to save to %(p)s due to: %(err)s",
+            {"p": model_path, "err": e},
+        )
+        raise NotImplementedError from e
+
+
+def check_parity(model: object, model_path: Path, data: pd.DataFrame, config: dict) -> float:
+    """Compare ONNX runtime predictions with the sklearn model
+    Args:
+        model (object): fitted sklearn classifier
+        model_path (Path): path of the exported graph
+        data (pd.DataFrame): rows to predict
+        config (dict): configurations for model export, with parity_atol
+
+    Returns:
+        float: largest absolute difference between the predicted probabilities
+    """
+    import onnxruntime as ort
+
+    features = data[config["initial_features"]]
+    session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+    labels, probabilities = session.run(
+        ["label", "probabilities"], {"input": features.to_numpy(dtype=np.float32)}
+    )
+
+    max_diff = float(np.abs(probabilities - model.predict_proba(features)).max())
+    label_mismatch = int((labels != model.predict(features)).sum())
+    if max_diff > config["parity_atol"] or label_mismatch:
+        logger.error(
+            "ONNX model differs from sklearn: max probability difference %(diff)s, %(n)s labels",
+            {"diff": max_diff, "n": label_mismatch},
+        )
+        raise NotImplementedError
+    logger.info("ONNX model matches sklearn, max probability difference %s", max_diff)
+    return max_diff
@@ -0,0 +1,222 @@
+import datetime
+import hashlib
+import logging
+import shutil
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+import pandas as pd
+import yaml
+from clouds_common.feature_store import DATA_FILE, KEYS_FILE, TABLE_FILE, key_positions, read_rows
+from src.compact_dataset import CompactDataset
+
+logger = logging.getLogger("clouds")
+
+
+def spec_version(config: dict) -> str:
+    """Version of a feature table: hash of the spec that produces its columns
+    Args:
+        config (dict): generate_features configuration
+
+    Returns:
+        str: 16 hex digits, changing whenever the source columns, target or
+            any feature_eng operation change
+    """
+    spec = {key: config[key] for key in ("feature_col", "target_col", "feature_eng")}
+    return hashlib.sha256(yaml.safe_dump(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def data_digest(data: Union[pd.DataFrame, CompactDataset], validation: Optional[dict] = None) -> str:
+    """Digest of the rows (keys and values) features are computed from
+    Args:
+        data (pd.DataFrame or CompactDataset): the input rows
+        validation (dict, optional): schema and action the stored features were
+            validated with; rows it rejects are not stored, so it is part of the digest
+
+    Returns:
+        str: 16 hex digits
+    """
+    digest = hashlib.sha256()
+    if validation is not None:
+        digest.update(yaml.safe_dump(validation, sort_keys=True).encode())
+    if isinstance(data, CompactDataset):
+        digest.update(np.ascontiguousarray(data.values).tobytes())
+        digest.update(data.labels.tobytes())
+    else:
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class FeatureStore:
+    """Local store of engineered feature tables
+
+    Each version of a table is a directory <root>/<table>/<version> holding the
+    features in Parquet sorted by primary key, the sorted keys as a .npy
+    index and a yaml description (spec, source digest, column statistics).
+    Point and range lookups search the key index (memory-mapped) and read only
+    the row groups holding the matching rows.
+
+    Args:
+        root (Path): directory of the store
+        row_group_size (int, optional): rows per Parquet row group, the unit
+            read by lookups. Defaults to 8192.
+    """
+
+    def __init__(self, root: Path, row_group_size: int = 8192):
+        self.root = Path(root)
+        self.row_group_size = row_group_size
+
+    def path(self, table: str, version: str) -> Path:
+        """Directory of one version of a table"""
+        return self.root / table / version
+
+    def describe(self, table: str, version: str) -> Optional[dict]:
+        """Description of a table version, None if it was never written"""
+        path = self.path(table, version) / TABLE_FILE
+        if not path.exists():
+            return None
+        with open(path, "r") as file:
+            return yaml.safe_load(file)
+
+    def has(self, table: str, version: str, source: Optional[str] = None) -> bool:
+        """Whether a table version exists, computed from source when given"""
+        description = self.describe(table, version)
+        if description is None:
+            return False
+        return source is None or description["source"] == source
+
+    def write(
+        self,
+        table: str,
+        version: str,
+        features: pd.DataFrame,
+        spec: dict,
+        source: str,
+        key: str = "row_id",
+    ) -> Path:
+        """Write a feature table version, replacing an earlier write of it
+        Args:
+            table (str): table name
+            version (str): output of spec_version
+            features (pd.DataFrame): features indexed by a unique integer primary key
+            spec (dict): the generate_features configuration, kept for reference
+            source (str): output of data_digest for the input rows
+            key (str, optional): name of the key column. Defaults to "row_id".
+
+        Returns:
+            Path: directory of the table version
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not features.index.is_unique:
+            logger.error("Feature table %s needs a unique primary key", table)
+            raise NotImplementedError
+        frame = features.sort_index(kind="stable")
+        keys = frame.index.to_numpy().astype(np.int64)
+        path = self.path(table, version)
+        staging = path.with_name(path.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        try:
+            arrow_table = pa.Table.from_pandas(
+                frame.rename_axis(key).reset_index(), preserve_index=False
+            )
+            pq.write_table(arrow_table, staging / DATA_FILE, row_group_size=self.row_group_size)
+            np.save(staging / KEYS_FILE, keys)
+            numeric = frame.select_dtypes("number")
+            description = {
+                "table": table,
+                "version": version,
+                "key": key,
+                "rows": int(len(frame)),
+                "row_group_size": self.row_group_size,
+                "columns": list(frame.columns),
+                "source": source,
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "stats": {
+                    column: {
+                        "min": float(numeric[column].min()),
+                        "max": float(numeric[column].max()),
+                        "mean": float(numeric[column].mean()),
+                    }
+                    for column in numeric.columns
+                },
+                "spec": spec,
+            }
+            with open(staging / TABLE_FILE, "w") as file:
+                yaml.safe_dump(description, file, sort_keys=False)
+            # Swap the finished version in so readers never see a partial write
+            shutil.rmtree(path, ignore_errors=True)
+            staging.rename(path)
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            logger.error(
+                "Feature table %(t)s failed to save to %(p)s due to: %(err)s",
+                {"t": table, "p": path, "err": e},
+            )
+            raise NotImplementedError from e
+        logger.info(
+            "Feature table %(t)s version %(v)s of %(n)s rows saved to %(p)s",
+            {"t": table, "v": version, "n": len(frame), "p": path},
+        )
+        return path
+
+    def read(self, table: str, version: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read a whole table version, indexed by its key"""
+        import pyarrow.parquet as pq
+
+        description = self._describe_or_raise(table, version)
+        key = description["key"]
+        columns = None if columns is None else [key] + list(columns)
+        frame = pq.read_table(self.path(table, version) / DATA_FILE, columns=columns).to_pandas()
+        return frame.set_index(key)
+
+    def lookup(
+        self, table: str, version: str, keys, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Rows of the given primary keys, reading only the row groups holding them
+        Args:
+            table (str): table name
+            version (str): table version
+            keys (array-like): primary keys to fetch
+            columns (list, optional): columns to read, all by default
+
+        Returns:
+            pd.DataFrame: found rows in the order of keys, indexed by key;
+                unknown keys are left out
+        """
+        positions, found = key_positions(self._keys(table, version), keys)
+        if not found.all():
+            logger.warning("%s keys not found in feature table %s", int((~found).sum()), table)
+        return self._rows(table, version, positions, columns)
+
+    def range(
+        self, table: str, version: str, low: int, high: int, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Rows with low <= key <= high, indexed by key"""
+        index = self._keys(table, version)
+        start = np.searchsorted(index, low, side="left")
+        stop = np.searchsorted(index, high, side="right")
+        return self._rows(table, version, np.arange(start, stop), columns)
+
+    def _describe_or_raise(self, table: str, version: str) -> dict:
+        description = self.describe(table, version)
+        if description is None:
+            logger.error("Feature table %(t)s has no version %(v)s", {"t": table, "v": version})
+            raise NotImplementedError
+        return description
+
+    def _keys(self, table: str, version: str) -> np.ndarray:
+        self._describe_or_raise(table, version)
+        return np.load(self.path(table, version) / KEYS_FILE, mmap_mode="r")
+
+    def _rows(
+        self, table: str, version: str, positions: np.ndarray, columns: Optional[List[str]]
+    ) -> pd.DataFrame:
+        """Rows at sorted-table positions, reading only their row groups"""
+        import pyarrow.parquet as pq
+
+        description = self._describe_or_raise(table, version)
+        parquet = pq.ParquetFile(self.path(table, version) / DATA_FILE)
+        return read_rows(parquet, description["key"], description["row_group_size"], positions, columns)
@@ -0,0 +1,239 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+import yaml
+
+logger = logging.getLogger("clouds")
+
+STATS_NAME = "stage_stats.yaml"
+REPORT_NAME = "gate_report.yaml"
+
+
+def record_stage(path: Path, stage: str, seconds: float, peak_bytes: Optional[int]) -> None:
+    """Add the duration and peak memory of a stage to the stage statistics of a run
+    Args:
+        path (Path): statistics file, created if missing; other stages are kept
+        stage (str): stage name
+        seconds (float): wall time of the stage
+        peak_bytes (int, optional): peak resident memory of the pipeline process during the stage
+
+    Returns:
+        None
+    """
+    path = Path(path)
+    stats = {}
+    if path.exists():
+        with open(path, "r") as file:
+            stats = yaml.safe_load(file) or {}
+    entry = {"seconds": round(float(seconds), 4)}
+    if peak_bytes is not None:
+        entry["peak_rss_mib"] = round(peak_bytes / 2**20, 1)
+    stats.setdefault("stages", {})[stage] = entry
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as file:
+        yaml.safe_dump(stats, file)
+
+
+def _telemetry_seconds(path: Path) -> Dict[str, float]:
+    """Stage durations from the telemetry snapshot of a run written before stage statistics"""
+    if not path.exists():
+        return {}
+    with open(path, "r") as file:
+        snapshot = json.load(file)
+    series = snapshot.get("histograms", {}).get("pipeline_stage_seconds", [])
+    return {entry["labels"]["stage"]: entry["sum"] for entry in series}
+
+
+def record_paths(config: dict) -> List[str]:
+    """Files, relative to a run directory, that load_run and find_baseline read
+    A run snapshotted in "manifest" mode keeps them, so it can be a baseline.
+    """
+    paths = [Path(config["evaluate_performance"]["metric_dir"]) / "metrics.yaml"]
+    if "gate" in config:
+        paths.append(Path(config["gate"]["gate_dir"]) / STATS_NAME)
+        paths.append(Path(config["gate"]["gate_dir"]) / REPORT_NAME)
+    if "telemetry" in config:
+        paths.append(Path(config["telemetry"]["metrics_file"]))
+    return [path.as_posix() for path in paths]
+
+
+def load_run(run_dir: Path, config: dict) -> dict:
+    """Read what a run stored about its quality and cost; nothing is recomputed
+    Args:
+        run_dir (Path): run directory
+        config (dict): full pipeline configuration, for the artifact locations
+
+    Returns:
+        dict: scalar "metrics" from evaluate_performance, stage "seconds" and
+            stage "peak_rss_mib"; a run missing an artifact has an empty section
+    """
+    run_dir = Path(run_dir)
+    metrics_path = run_dir / Path(config["evaluate_performance"]["metric_dir"]) / "metrics.yaml"
+    metrics = {}
+    if metrics_path.exists():
+        with open(metrics_path, "r") as file:
+            metrics = yaml.safe_load(file) or {}
+    run = {
+        "metrics": {
+            name: float(value)
+            for name, value in metrics.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        },
+        "seconds": {},
+        "peak_rss_mib": {},
+    }
+    stats_path = run_dir / Path(config["gate"]["gate_dir"]) / STATS_NAME
+    if stats_path.exists():
+        with open(stats_path, "r") as file:
+            stages = (yaml.safe_load(file) or {}).get("stages", {})
+        for stage, entry in stages.items():
+            run["seconds"][stage] = entry["seconds"]
+            if "peak_rss_mib" in entry:
+                run["peak_rss_mib"][stage] = entry["peak_rss_mib"]
+    elif "telemetry" in config:
+        run["seconds"] = _telemetry_seconds(run_dir / Path(config["telemetry"]["metrics_file"]))
+    return run
+
+
+def _failed_gate(run_dir: Path, config: dict) -> bool:
+    """Whether the gate report of a run records a regression; runs without a report did not fail"""
+    path = run_dir / Path(config["gate"]["gate_dir"]) / REPORT_NAME
+    if not path.exists():
+        return False
+    with open(path, "r") as file:
+        return (yaml.safe_load(file) or {}).get("passed") is False
+
+
+def find_baseline(baseline: Optional[str], run_dir: Path, runs_dir: Path, config: dict) -> Optional[Path]:
+    """Locate the baseline run directory
+    Args:
+        baseline (str, optional): run id under runs_dir, a run directory, or
+            "previous" for the latest earlier run with stored metrics whose
+            gate report, if any, passed, so a regressed run never becomes the
+            reference the next run is held to
+        run_dir (Path): the current run directory
+        runs_dir (Path): directory holding one subdirectory per run
+        config (dict): full pipeline configuration
+
+    Returns:
+        Path or None: the baseline run, None if there is none to compare with
+    """
+    if baseline is None:
+        return None
+    if baseline != "previous":
+        path = Path(baseline) if Path(baseline).is_dir() else Path(runs_dir) / str(baseline)
+        if not path.is_dir():
+            logger.error("Baseline run %s not found", baseline)
+            raise NotImplementedError
+        return path
+    metrics = Path(config["evaluate_performance"]["metric_dir"]) / "metrics.yaml"
+    run_dir = Path(run_dir).resolve()
+
+    def order(path: Path) -> tuple:
+        # Run ids are timestamps; compare them as numbers when they are
+        return (0, int(path.name), "") if path.name.isdigit() else (1, 0, path.name)
+
+    if not Path(runs_dir).is_dir():
+        return None
+    earlier = [
+        path
+        for path in Path(runs_dir).iterdir()
+        if path.is_dir()
+        and (path / metrics).exists()
+        and path.resolve() != run_dir
+        and order(path) < order(run_dir)
+        and not _failed_gate(path, config)
+    ]
+    return max(earlier, key=order) if earlier else None
+
+
+def _check(current: float, baseline: float, limit: float, worse_if_above: bool) -> dict:
+    passed = current <= limit if worse_if_above else current >= limit
+    return {"baseline": baseline, "current": current, "limit": limit, "passed": bool(passed)}
+
+
+def compare_runs(current: dict, baseline: dict, gate_config: dict) -> dict:
+    """Check a run against its baseline with the configured tolerances
+    Args:
+        current (dict): output of load_run for the run checked
+        baseline (dict): output of load_run for the baseline
+        gate_config (dict): gate settings; "metrics" maps a metric to
+            max_drop (higher is better) or max_rise (lower is better), and
+            "seconds" and "peak_rss_mib" allow an increase of the larger of
+            relative * baseline and absolute per stage
+
+    Returns:
+        dict: checks per section, labels of the failed checks and those
+            without a baseline value
+    """
+    checks = {"metrics": {}, "seconds": {}, "peak_rss_mib": {}}
+    missing = []
+    for name, spec in (gate_config.get("metrics") or {}).items():
+        if name not in current["metrics"] or name not in baseline["metrics"]:
+            missing.append(f"metrics.{name}")
+            continue
+        before, after = baseline["metrics"][name], current["metrics"][name]
+        if "max_rise" in spec:
+            checks["metrics"][name] = _check(after, before, before + spec["max_rise"], True)
+        else:
+            checks["metrics"][name] = _check(after, before, before - spec.get("max_drop", 0.0), False)
+
+    ignored = set(gate_config.get("ignore_stages") or [])
+    for section in ("seconds", "peak_rss_mib"):
+        tolerance = gate_config.get(section)
+        if not tolerance:
+            continue
+        for stage, after in current[section].items():
+            if stage in ignored:
+                continue
+            if stage not in baseline[section]:
+                missing.append(f"{section}.{stage}")
+                continue
+            before = baseline[section][stage]
+            slack = max(tolerance.get("relative", 0.0) * before, tolerance.get("absolute", 0.0))
+            checks[section][stage] = _check(after, before, round(before + slack, 4), True)
+
+    regressions = [
+        f"{section}.{name}"
+        for section, results in checks.items()
+        for name, result in results.items()
+        if not result["passed"]
+    ]
+    return {"checks": checks, "regressions": regressions, "missing": missing}
+
+
+def run_gate(run_dir: Path, baseline_dir: Optional[Path], config: dict) -> dict:
+    """Compare a run with its baseline and write the gate report
+    Args:
+        run_dir (Path): run directory
+        baseline_dir (Path, optional): baseline run directory; None passes the gate
+        config (dict): full pipeline configuration
+
+    Returns:
+        dict: the report written to <gate_dir>/gate_report.yaml
+    """
+    gate_config = config["gate"]
+    report = {"run": Path(run_dir).name, "baseline": None, "passed": True}
+    if baseline_dir is None:
+        logger.warning("No baseline run to compare run %s with; gate passed", Path(run_dir).name)
+    else:
+        # Tolerances and artifact locations of the current configuration apply to both runs
+        result = compare_runs(load_run(run_dir, config), load_run(baseline_dir, config), gate_config)
+        report.update(baseline=Path(baseline_dir).name, passed=not result["regressions"], **result)
+        if result["regressions"]:
+            logger.error(
+                "Run %(run)s regressed against %(base)s: %(r)s",
+                {"run": report["run"], "base": report["baseline"], "r": ", ".join(result["regressions"])},
+                extra={"regressions": result["regressions"]},
+            )
+        else:
+            logger.info(
+                "Run %(run)s passed the gate against %(base)s",
+                {"run": report["run"], "base": report["baseline"]},
+            )
+    path = Path(run_dir) / Path(gate_config["gate_dir"]) / REPORT_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as file:
+        yaml.safe_dump(report, file, sort_keys=False)
+    return report
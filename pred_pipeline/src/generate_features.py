@@ -1,6 +1,8 @@
 import logging
+from typing import Optional
 import pandas as pd
 import numpy as np
+from src.compact_dataset import CompactDataset
 
 logger = logging.getLogger("clouds")
 
@@ -39,15 +41,83 @@ def recursive_operation(operation: dict, features: pd.DataFrame) -> pd.Series:
         raise NotImplementedError
 
 
+ARRAY_OPERATIONS = {
+    "multiply": np.multiply,
+    "subtract": np.subtract,
+    "divide": np.divide,
+    "add": np.add,
+}
+
+
+def array_operation(
+    operation: dict, data: CompactDataset, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Create features on the columns of a compact dataset
+    Same operations as recursive_operation, computed with numpy on column views
+    and written into `out` when given.
+    Args:
+        operation (dict): dictionary of operations to complete
+        data (CompactDataset): compact dataset holding the source columns
+        out (np.ndarray, optional): array to write the result into
+
+    Returns:
+        np.ndarray: complete operation values
+    """
+    if isinstance(operation, str):
+        return data.column(operation)
+    curr_op = operation["operation"]
+    source1 = array_operation(operation["source1"], data)
+    if curr_op == "apply":
+        function = getattr(np, operation["function"])
+        if isinstance(function, np.ufunc):
+            return function(source1, out=out)
+        result = function(source1)
+    elif curr_op in ARRAY_OPERATIONS:
+        source2 = array_operation(operation["source2"], data)
+        return ARRAY_OPERATIONS[curr_op](source1, source2, out=out)
+    else:
+        logger.error("Invalid operation %s supplied.", curr_op)
+        raise NotImplementedError
+    if out is None:
+        return result
+    out[...] = result
+    return out
+
+
+def _generate_features_compact(data: CompactDataset, config: dict) -> CompactDataset:
+    """Create engineered features in the spare columns of a compact dataset"""
+    missing = [col for col in config["feature_col"] if col not in data.columns]
+    if missing:
+        raise KeyError(f"Columns {missing} not in compact dataset")
+
+    try:
+        for operation in config["feature_eng"]:
+            target = operation["target"]
+            array_operation(operation, data, out=data.add_column(target))
+            logger.info("Feature %s created.", target)
+    except Exception as e:
+        data.columns.pop(target, None)
+        logger.error(
+            "Feature %(t)s could not be created due to %(err)s Please check the formatting of config.yaml",
+            {"t": target, "err": e},
+        )
+        raise e
+
+    return data
+
+
 def generate_features(data: pd.DataFrame, config: dict) -> pd.DataFrame:
     """Create features
     Args:
-        data (pd.Dataframe): original, clean, unmodified dataset
+        data (pd.Dataframe or CompactDataset): original, clean, unmodified dataset.
+            A CompactDataset is extended in place, without copying its columns.
         config (dict): feature engineering configs
 
     Returns:
-        pd.Dataframe: dataframe with additional engineered features
+        pd.Dataframe or CompactDataset: dataset with additional engineered features
     """
+    if isinstance(data, CompactDataset):
+        return _generate_features_compact(data, config)
 
     columns = config["feature_col"]
     response = config["target_col"]
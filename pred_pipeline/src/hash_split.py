@@ -0,0 +1,103 @@
+import hashlib
+import logging
+from typing import List, Optional, Union
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("clouds")
+
+TRAIN, TEST, CALIBRATION = 0, 1, 2
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def splitmix64(values: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: a fast, well mixed 64-bit hash of each value
+    Args:
+        values (np.ndarray): integers, viewed as uint64
+
+    Returns:
+        np.ndarray: uint64 hashes, same shape as values
+    """
+    z = np.asarray(values).astype(np.uint64, copy=True) + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def row_keys(data: pd.DataFrame, key: Union[str, List[str]] = "index", decimals: int = 6) -> np.ndarray:
+    """Stable 64-bit key per row
+    Args:
+        data (pd.DataFrame): the rows
+        key (str or list): "index" for the integer row index, or columns whose
+            values identify a row (identical rows then share a key and a split)
+        decimals (int, optional): decimals kept of key column values. Values are
+            taken at float32 precision first, so the float32 and float64 copies
+            of a row get the same key whatever their magnitude. Defaults to 6.
+
+    Returns:
+        np.ndarray: uint64 key per row
+    """
+    if isinstance(key, str):
+        if key != "index":
+            logger.error("Split key %s is neither 'index' nor a list of columns", key)
+            raise NotImplementedError
+        return splitmix64(data.index.to_numpy().astype(np.int64).view(np.uint64))
+    keys = np.zeros(len(data), dtype=np.uint64)
+    for column in key:
+        # A float32 value is the float32 cast of its float64 copy, so cast before rounding
+        values = data[column].to_numpy(dtype=np.float32).astype(np.float64)
+        values = np.round(values, decimals) + 0.0
+        keys = splitmix64(keys ^ values.view(np.uint64))
+    return keys
+
+
+def _class_salt(labels: np.ndarray) -> np.ndarray:
+    """Salt per row derived from its class value, stable whatever other classes exist"""
+    labels = np.asarray(labels)
+    if np.issubdtype(labels.dtype, np.number) or labels.dtype == bool:
+        return splitmix64((labels.astype(np.float64) + 0.0).view(np.uint64))
+    classes, codes = np.unique(labels.astype(str), return_inverse=True)
+    salts = np.array(
+        [int.from_bytes(hashlib.sha256(c.encode()).digest()[:8], "little") for c in classes],
+        dtype=np.uint64,
+    )
+    return salts[codes.reshape(-1)]
+
+
+def assign_split(
+    keys: np.ndarray,
+    test_size: float,
+    calibration_size: Optional[float] = None,
+    seed: int = 0,
+    labels: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Assign rows to train, test or calibration from their keys alone
+    Each row maps to a uniform number in [0, 1) by hashing its key with the
+    seed; rows below test_size go to test and rows of the remainder below
+    calibration_size to calibration. The assignment of a row never depends on
+    other rows, so it is the same whether computed at once, per chunk or on
+    another worker, and rows keep their side as data is added. With labels the
+    hash is salted per class, so every class is split independently in the
+    requested proportions.
+    Args:
+        keys (np.ndarray): uint64 key per row, see row_keys
+        test_size (float): share of rows for test
+        calibration_size (float, optional): share of the remaining rows for calibration
+        seed (int, optional): changes the split. Defaults to 0.
+        labels (np.ndarray, optional): class per row to stratify by
+
+    Returns:
+        np.ndarray: uint8 TRAIN, TEST or CALIBRATION per row
+    """
+    mixed = splitmix64(np.asarray(keys, dtype=np.uint64) ^ splitmix64(np.array([seed]))[0])
+    if labels is not None:
+        mixed = splitmix64(mixed ^ _class_salt(labels))
+    # Top 53 bits as a double in [0, 1)
+    unit = (mixed >> np.uint64(11)).astype(np.float64) * 2.0**-53
+    split = np.full(len(unit), TRAIN, dtype=np.uint8)
+    split[unit < test_size] = TEST
+    if calibration_size:
+        cutoff = test_size + (1 - test_size) * calibration_size
+        split[(unit >= test_size) & (unit < cutoff)] = CALIBRATION
+    return split
@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+import yaml
+
+logger = logging.getLogger("clouds")
+
+MANIFEST_NAME = "manifest.yaml"
+
+
+def artifact_stages(config: dict) -> Dict[str, str]:
+    """Map artifact locations inside a run directory to the stage producing them
+    Args:
+        config (dict): full pipeline configuration
+
+    Returns:
+        dict: relative path (file or directory) -> stage name
+    """
+    run_config = config["run_config"]
+    stages = {
+        "config.yaml": "pipeline",
+        run_config["data_dir"]["raw"]: "acquire_data",
+        run_config["data_dir"]["processed"]: "create_dataset",
+        run_config["figure_dir"]: "analysis",
+        config["train_model"]["data_dir"]: "train_model",
+        config["train_model"]["model_dir"]: "train_model",
+        config["score_model"]["score_dir"]: "score_model",
+        config["evaluate_performance"]["metric_dir"]: "evaluate_performance",
+    }
+    data_prep = config.get("create_dataset", {}).get("data_prep", {})
+    if data_prep.get("reader") == "index" and data_prep.get("index_dir") is None:
+        raw_index = Path(run_config["data_dir"]["raw"]) / "clouds.data.index.yaml"
+        stages[raw_index.as_posix()] = "create_dataset"
+    if "validation" in config:
+        quarantine_dir = Path(config["validation"]["quarantine_dir"])
+        stages[(quarantine_dir / "raw.csv").as_posix()] = "create_dataset"
+        stages[(quarantine_dir / "features.csv").as_posix()] = "generate_features"
+    if "stream_score" in config:
+        stages[config["stream_score"]["stream_dir"]] = "stream_score"
+    if "telemetry" in config:
+        metrics_file = Path(config["telemetry"]["metrics_file"])
+        stages[metrics_file.as_posix()] = "pipeline"
+        stages[metrics_file.with_suffix(".prom").as_posix()] = "pipeline"
+    if "gate" in config:
+        gate_dir = Path(config["gate"]["gate_dir"])
+        stages[(gate_dir / "stage_stats.yaml").as_posix()] = "pipeline"
+        stages[(gate_dir / "gate_report.yaml").as_posix()] = "gate"
+    if "sample_data" in config:
+        stages[config["sample_data"]["sample_dir"]] = "sample_data"
+    if "compare_models" in config:
+        compare_config = config["compare_models"]
+        stages[compare_config["compare_dir"]] = "compare_models"
+        candidates = Path(config["train_model"]["model_dir"]) / compare_config["model_dir"]
+        stages[candidates.as_posix()] = "compare_models"
+    if "calibrate_model" in config:
+        model_dir = Path(config["train_model"]["model_dir"])
+        calibration = model_dir / config["calibrate_model"]["calibration_file"]
+        stages[calibration.as_posix()] = "calibrate_model"
+    if "export_model" in config:
+        model_dir = Path(config["train_model"]["model_dir"])
+        for key in ("export_file", "spec_file"):
+            stages[(model_dir / config["export_model"][key]).as_posix()] = "export_model"
+    if "explain_model" in config:
+        stages[config["explain_model"]["explanation_dir"]] = "explain_model"
+    if "monitor_drift" in config:
+        drift_config = config["monitor_drift"]
+        stages[drift_config["report_dir"]] = "monitor_drift"
+        sketch = Path(config["train_model"]["model_dir"]) / drift_config["sketch_file"]
+        stages[sketch.as_posix()] = "monitor_drift"
+    return {Path(path).as_posix(): stage for path, stage in stages.items()}
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Compute the sha256 digest of a file without loading it into memory
+    Args:
+        path (Path): file to hash
+        chunk_size (int, optional): bytes read per iteration. Defaults to 1 MiB.
+
+    Returns:
+        str: hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stage_of(rel_path: str, stages: Dict[str, str]) -> str:
+    """Find the stage owning a path using the longest matching prefix"""
+    matches = [
+        prefix
+        for prefix in stages
+        if rel_path == prefix or rel_path.startswith(prefix + "/")
+    ]
+    if not matches:
+        return "unknown"
+    return stages[max(matches, key=len)]
+
+
+def build_manifest(run_dir: Path, stages: Dict[str, str]) -> dict:
+    """List every artifact of a run with its size, hash and producing stage
+    Args:
+        run_dir (Path): directory of a single pipeline run
+        stages (dict): relative path -> stage name, see artifact_stages
+
+    Returns:
+        dict: manifest with the run id and one entry per artifact
+    """
+    run_dir = Path(run_dir)
+    artifacts = {}
+    for root, _, files in os.walk(run_dir):
+        for file in sorted(files):
+            local_path = Path(root) / file
+            rel_path = local_path.relative_to(run_dir).as_posix()
+            if rel_path == MANIFEST_NAME:
+                continue
+            artifacts[rel_path] = {
+                "size": local_path.stat().st_size,
+                "sha256": hash_file(local_path),
+                "stage": _stage_of(rel_path, stages),
+            }
+    logger.info("Manifest built for %s with %s artifacts", run_dir, len(artifacts))
+    return {"run": run_dir.name, "artifacts": artifacts}
+
+
+def save_manifest(manifest: dict, path: Path) -> None:
+    """Save manifest to yaml
+    Args:
+        manifest (dict): manifest created by build_manifest
+        path (Path): path to save manifest
+    Returns:
+        None
+    """
+    try:
+        with open(path, "w") as file:
+            yaml.dump(manifest, file)
+            logger.info("Manifest saved to %s", path)
+    except Exception as e:
+        logger.error("Failed to save manifest to %s", path)
+        raise NotImplementedError from e
+
+
+def load_manifest(path: Path) -> Optional[dict]:
+    """Load a manifest if it exists
+    Args:
+        path (Path): path of the manifest yaml
+
+    Returns:
+        dict or None: manifest contents, None if there is no manifest
+    """
+    if not Path(path).exists():
+        return None
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
+
+
+def diff_manifests(local: dict, remote: Optional[dict]) -> List[str]:
+    """Find the artifacts of a local manifest that are missing or changed remotely
+    Args:
+        local (dict): manifest of the local run
+        remote (dict or None): manifest of the remote copy, None if never synced
+
+    Returns:
+        list: relative paths that need to be transferred
+    """
+    remote_artifacts = (remote or {}).get("artifacts", {})
+    return [
+        rel_path
+        for rel_path, entry in local["artifacts"].items()
+        if remote_artifacts.get(rel_path, {}).get("sha256") != entry["sha256"]
+    ]
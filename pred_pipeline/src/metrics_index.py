@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+import yaml
+
+logger = logging.getLogger("clouds")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    config_hash TEXT NOT NULL,
+    hyperparams TEXT NOT NULL,
+    metrics TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS metrics_by_name ON metrics (name, value);
+CREATE TABLE IF NOT EXISTS stage_timings (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (run_id, stage)
+);
+"""
+
+
+def config_hash(config: dict) -> str:
+    """Stable hash of a configuration, independent of key order
+    Args:
+        config (dict): pipeline configuration
+
+    Returns:
+        str: sha256 hex digest of the canonical yaml dump
+    """
+    return hashlib.sha256(yaml.dump(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def connect(index_path: Path):
+    """Open the metrics index, creating its tables if needed, and commit on exit"""
+    Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(index_path))
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def record_timings(index_path: Path, run_id: str, timings: dict) -> None:
+    """Insert or replace the stage durations of a run
+    Args:
+        index_path (Path): path of the sqlite index
+        run_id (str): id of the run, the name of its artifacts directory
+        timings (dict): stage name -> seconds
+    Returns:
+        None
+    """
+    with connect(index_path) as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO stage_timings VALUES (?, ?, ?)",
+            [(run_id, stage, float(seconds)) for stage, seconds in timings.items()],
+        )
+
+
+def record_run(
+    index_path: Path,
+    run_id: str,
+    config: dict,
+    metrics: dict,
+    timings: Optional[dict] = None,
+) -> None:
+    """Insert or replace a run in the metrics index
+    Scalar metrics are stored one row each so they can be ranked through the
+    index; non-scalar metrics (confusion matrix, reports) are only kept in the
+    json copy on the run row.
+    Args:
+        index_path (Path): path of the sqlite index
+        run_id (str): id of the run, the name of its artifacts directory
+        config (dict): full pipeline configuration of the run
+        metrics (dict): metric name -> value, as produced by evaluate_performance
+        timings (dict, optional): stage name -> seconds
+    Returns:
+        None
+    """
+    hyperparams = config.get("train_model", {}).get("model_config", {}).get("hyperparam", {})
+    scalars = [
+        (run_id, name, float(value))
+        for name, value in metrics.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+    try:
+        with connect(index_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    time.time(),
+                    config_hash(config),
+                    json.dumps(hyperparams, sort_keys=True),
+                    json.dumps(metrics, sort_keys=True),
+                ),
+            )
+            conn.execute("DELETE FROM metrics WHERE run_id = ?", (run_id,))
+            conn.executemany("INSERT INTO metrics VALUES (?, ?, ?)", scalars)
+    except sqlite3.Error as e:
+        logger.error("Failed to record run %(run)s in %(p)s", {"run": run_id, "p": index_path})
+        raise NotImplementedError from e
+    if timings:
+        record_timings(index_path, run_id, timings)
+    logger.info("Run %(run)s recorded in metrics index %(p)s", {"run": run_id, "p": index_path})
+
+
+def best_runs(index_path: Path, metric: str, limit: int = 5, ascending: bool = False) -> List[dict]:
+    """Rank runs by a scalar metric
+    Args:
+        index_path (Path): path of the sqlite index
+        metric (str): name of the metric to rank by
+        limit (int, optional): number of runs to return. Defaults to 5.
+        ascending (bool, optional): rank lowest first, for losses. Defaults to False.
+
+    Returns:
+        list: one dict per run with run id, metric value, config hash and hyperparameters
+    """
+    order = "ASC" if ascending else "DESC"
+    with connect(index_path) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT m.run_id, m.value, r.config_hash, r.hyperparams
+            FROM metrics m JOIN runs r ON r.run_id = m.run_id
+            WHERE m.name = ?
+            ORDER BY m.value {order}
+            LIMIT ?
+            """,
+            (metric, limit),
+        ).fetchall()
+    return [
+        {"run_id": run_id, metric: value, "config_hash": chash, "hyperparams": json.loads(hp)}
+        for run_id, value, chash, hp in rows
+    ]
+
+
+def metric_trend(index_path: Path, metric: str, last: Optional[int] = None) -> List[tuple]:
+    """Values of a scalar metric or stage duration over runs, oldest first
+    Args:
+        index_path (Path): path of the sqlite index
+        metric (str): metric name, or `stage:<name>` for a stage duration
+        last (int, optional): only return the most recent runs
+
+    Returns:
+        list: (run_id, value) tuples ordered by run id
+    """
+    if metric.startswith("stage:"):
+        query = "SELECT run_id, seconds FROM stage_timings WHERE stage = ?"
+        key = metric[len("stage:"):]
+    else:
+        query = "SELECT run_id, value FROM metrics WHERE name = ?"
+        key = metric
+    query += " ORDER BY run_id DESC"
+    params = (key,)
+    if last is not None:
+        query += " LIMIT ?"
+        params = (key, last)
+    with connect(index_path) as conn:
+        rows = conn.execute(query, params).fetchall()
+    return rows[::-1]
+
+
+def index_runs(index_path: Path, runs_dir: Path, metrics_file: str) -> int:
+    """Backfill the index from runs written before it existed
+    Args:
+        index_path (Path): path of the sqlite index
+        runs_dir (Path): directory holding one subdirectory per run
+        metrics_file (str): metrics yaml path relative to a run directory
+
+    Returns:
+        int: number of runs indexed
+    """
+    count = 0
+    for run_dir in sorted(Path(runs_dir).iterdir()):
+        metrics_path = run_dir / metrics_file
+        config_path = run_dir / "config.yaml"
+        if not (metrics_path.exists() and config_path.exists()):
+            continue
+        with open(metrics_path, "r") as file:
+            metrics = yaml.safe_load(file)
+        with open(config_path, "r") as file:
+            config = yaml.safe_load(file)
+        record_run(index_path, run_dir.name, config, metrics)
+        count += 1
+    return count
@@ -0,0 +1,239 @@
+import logging
+from pathlib import Path
+from typing import List
+import numpy as np
+import pandas as pd
+import yaml
+from clouds_common.drift import histogram, psi_ks
+
+logger = logging.getLogger("clouds")
+
+
+def _moments(values: np.ndarray) -> dict:
+    """Count, mean, sum of squared deviations, min and max of finite values"""
+    count = int(values.size)
+    if count == 0:
+        return {"count": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None}
+    mean = float(values.mean())
+    return {
+        "count": count,
+        "mean": mean,
+        "m2": float(((values - mean) ** 2).sum()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+
+
+def _merge_moments(a: dict, b: dict) -> dict:
+    """Combine two sets of moments (Chan et al. parallel variance)"""
+    if a["count"] == 0:
+        return dict(b)
+    if b["count"] == 0:
+        return dict(a)
+    count = a["count"] + b["count"]
+    delta = b["mean"] - a["mean"]
+    return {
+        "count": count,
+        "mean": a["mean"] + delta * b["count"] / count,
+        "m2": a["m2"] + b["m2"] + delta**2 * a["count"] * b["count"] / count,
+        "min": min(a["min"], b["min"]),
+        "max": max(a["max"], b["max"]),
+    }
+
+
+def build_sketch(values: np.ndarray, bins: int = 20) -> dict:
+    """Summarize one feature in a mergeable sketch
+    Bin edges are the training quantiles, so each bin holds about the same share
+    of the reference data; the outer bins are open ended so later batches outside
+    the training range are still counted.
+    Args:
+        values (np.ndarray): reference values of the feature
+        bins (int, optional): number of quantile bins. Defaults to 20.
+
+    Returns:
+        dict: inner bin edges, bin counts, moments and count of non-finite values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    edges = np.array([])
+    if finite.size:
+        edges = np.unique(np.quantile(finite, np.linspace(0, 1, bins + 1)[1:-1]))
+    return {
+        "edges": edges.tolist(),
+        "counts": histogram(finite, edges).tolist(),
+        "moments": _moments(finite),
+        "non_finite": int(values.size - finite.size),
+    }
+
+
+def update_sketch(sketch: dict, values: np.ndarray) -> dict:
+    """Sketch a new batch on the bins of an existing sketch
+    Args:
+        sketch (dict): sketch providing the bin edges
+        values (np.ndarray): values of the new batch
+
+    Returns:
+        dict: sketch of the batch alone, mergeable with `sketch`
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    return {
+        "edges": list(sketch["edges"]),
+        "counts": histogram(finite, np.asarray(sketch["edges"])).tolist(),
+        "moments": _moments(finite),
+        "non_finite": int(values.size - finite.size),
+    }
+
+
+def merge_sketches(a: dict, b: dict) -> dict:
+    """Merge two sketches built on the same bins
+    Args:
+        a (dict): first sketch
+        b (dict): second sketch
+
+    Returns:
+        dict: sketch of the union of both inputs
+    """
+    if a["edges"] != b["edges"]:
+        raise ValueError("Sketches with different bin edges cannot be merged")
+    return {
+        "edges": list(a["edges"]),
+        "counts": (np.asarray(a["counts"]) + np.asarray(b["counts"])).tolist(),
+        "moments": _merge_moments(a["moments"], b["moments"]),
+        "non_finite": a["non_finite"] + b["non_finite"],
+    }
+
+
+def quantile(sketch: dict, q: float) -> float:
+    """Approximate quantile of the sketched values
+    Interpolates linearly inside the bin holding the quantile; the open tails are
+    bounded by the observed min and max.
+    Args:
+        sketch (dict): sketch of a feature
+        q (float): quantile in [0, 1]
+
+    Returns:
+        float: estimated value at quantile q
+    """
+    counts = np.asarray(sketch["counts"], dtype=np.float64)
+    moments = sketch["moments"]
+    bounds = np.concatenate([[moments["min"]], sketch["edges"], [moments["max"]]])
+    cumulative = np.concatenate([[0.0], np.cumsum(counts)]) / counts.sum()
+    position = int(np.clip(np.searchsorted(cumulative, q, side="left"), 1, counts.size))
+    low, high = cumulative[position - 1], cumulative[position]
+    lower = max(bounds[position - 1], moments["min"])
+    upper = min(bounds[position], moments["max"])
+    if high == low:
+        return float(lower)
+    return float(lower + (upper - lower) * (q - low) / (high - low))
+
+
+def compare_sketches(reference: dict, current: dict) -> dict:
+    """Drift statistics of a batch sketch against the reference sketch
+    Args:
+        reference (dict): sketch of the training data
+        current (dict): sketch of the new batch on the same bins
+
+    Returns:
+        dict: population stability index, KS statistic over the bin edges,
+            mean shift in reference standard deviations and share of non-finite values
+    """
+    psi, ks = psi_ks(reference["counts"], current["counts"])
+
+    ref_moments = reference["moments"]
+    std = np.sqrt(ref_moments["m2"] / max(ref_moments["count"] - 1, 1))
+    mean_shift = (current["moments"]["mean"] - ref_moments["mean"]) / std if std > 0 else 0.0
+    total = current["moments"]["count"] + current["non_finite"]
+    return {
+        "psi": psi,
+        "ks": ks,
+        "mean_shift": float(mean_shift),
+        "non_finite_share": current["non_finite"] / total if total else 0.0,
+    }
+
+
+def build_feature_sketches(data: pd.DataFrame, columns: List[str], bins: int = 20) -> dict:
+    """Sketch every monitored feature of the training data
+    Args:
+        data (pd.DataFrame): training rows with raw and engineered features
+        columns (list): features to monitor
+        bins (int, optional): number of quantile bins per feature. Defaults to 20.
+
+    Returns:
+        dict: feature name -> sketch
+    """
+    sketches = {col: build_sketch(data[col].to_numpy(), bins) for col in columns}
+    logger.info("Reference sketches built for %s features", len(sketches))
+    return sketches
+
+
+def check_drift(reference: dict, batch: pd.DataFrame, config: dict) -> dict:
+    """Compare a batch against the reference sketches in a single pass per feature
+    Args:
+        reference (dict): feature name -> training sketch
+        batch (pd.DataFrame): new observations
+        config (dict): monitor_drift configuration with psi_threshold and ks_threshold
+
+    Returns:
+        dict: feature name -> drift statistics and drift flag
+    """
+    report = {}
+    for col, sketch in reference.items():
+        if col not in batch:
+            continue
+        stats = compare_sketches(sketch, update_sketch(sketch, batch[col].to_numpy()))
+        stats["drift"] = bool(
+            stats["psi"] > config["psi_threshold"] or stats["ks"] > config["ks_threshold"]
+        )
+        report[col] = stats
+    drifted = [col for col, stats in report.items() if stats["drift"]]
+    if drifted:
+        logger.warning("Drift detected in features %s", drifted)
+    else:
+        logger.info("No drift detected in %s features", len(report))
+    return report
+
+
+def monitored_features(config: dict) -> List[str]:
+    """Raw feature columns and engineered feature targets from generate_features config"""
+    return list(config["feature_col"]) + [op["target"] for op in config["feature_eng"]]
+
+
+def save_sketches(sketches: dict, path: Path) -> None:
+    """Save reference sketches next to the model
+    Args:
+        sketches (dict): feature name -> sketch
+        path (Path): path to save sketches
+    Returns:
+        None
+    """
+    try:
+        with open(path, "w") as file:
+            yaml.dump(sketches, file)
+            logger.info("Reference sketches saved to %s", path)
+    except Exception as e:
+        logger.error("Failed to save reference sketches to %s", path)
+        raise NotImplementedError from e
+
+
+def load_sketches(path: Path) -> dict:
+    """Load reference sketches saved by save_sketches"""
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
+
+
+def save_report(report: dict, path: Path) -> None:
+    """Save drift report
+    Args:
+        report (dict): feature name -> drift statistics
+        path (Path): path to save report
+    Returns:
+        None
+    """
+    try:
+        with open(path, "w") as file:
+            yaml.dump(report, file)
+            logger.info("Drift report saved to %s", path)
+    except Exception as e:
+        logger.error("Failed to save drift report to %s", path)
+        raise NotImplementedError from e
@@ -0,0 +1,212 @@
+import hashlib
+import io
+import logging
+import mmap
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+import yaml
+
+logger = logging.getLogger("clouds")
+
+INDEX_VERSION = 1
+# Bytes hashed at each end of the file to fingerprint it without reading it whole
+_FINGERPRINT_BYTES = 1 << 16
+
+
+def fingerprint(path: Path) -> str:
+    """Cheap content fingerprint of a file: its size and a hash of its first and last 64 KiB
+    Args:
+        path (Path): the file
+
+    Returns:
+        str: fingerprint, equal for copies of the same file
+    """
+    size = Path(path).stat().st_size
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as file:
+        digest.update(file.read(_FINGERPRINT_BYTES))
+        if size > _FINGERPRINT_BYTES:
+            file.seek(max(_FINGERPRINT_BYTES, size - _FINGERPRINT_BYTES))
+            digest.update(file.read())
+    return digest.hexdigest()[:32]
+
+
+def _numeric_width(line: bytes) -> int:
+    """Number of values on a whitespace-separated line of numbers, 0 for any other line"""
+    tokens = line.split()
+    try:
+        [float(token) for token in tokens]
+    except ValueError:
+        return 0
+    return len(tokens)
+
+
+def _header(line: bytes) -> str:
+    """Text of a comment line without its comment characters"""
+    return line.decode(errors="replace").strip().strip(";#").strip()
+
+
+def scan_blocks(path: Path, min_rows: int = 2) -> List[dict]:
+    """Find the blocks of numeric rows in a raw text file in one pass
+    A block is a run of consecutive lines holding only numbers; blank lines,
+    comment banners and any other text end it. The closest text line before a
+    block is kept as its header.
+    Args:
+        path (Path): the raw file
+        min_rows (int, optional): shorter runs of numeric lines (e.g. a year in
+            a mail header) are not blocks. Defaults to 2.
+
+    Returns:
+        list of dict: per block its header, byte range [start, end), first
+            line number, row count and values per row (min and max)
+    """
+    blocks, current = [], None
+    header, line_no, offset = "", 0, 0
+    with open(path, "rb") as file:
+        for line in file:
+            width = _numeric_width(line) if line.strip() else 0
+            if width:
+                if current is None:
+                    current = {
+                        "header": header,
+                        "start": offset,
+                        "end": offset,
+                        "line": line_no,
+                        "rows": 0,
+                        "min_cols": width,
+                        "max_cols": width,
+                    }
+                current["rows"] += 1
+                current["end"] = offset + len(line)
+                current["min_cols"] = min(current["min_cols"], width)
+                current["max_cols"] = max(current["max_cols"], width)
+            else:
+                if current is not None and current["rows"] >= min_rows:
+                    blocks.append(current)
+                current = None
+                if _header(line):
+                    header = _header(line)
+            line_no += 1
+            offset += len(line)
+    if current is not None and current["rows"] >= min_rows:
+        blocks.append(current)
+    return blocks
+
+
+def index_path(path: Path, index_dir: Optional[Path] = None, key: Optional[str] = None) -> Path:
+    """Where the index of a raw file is kept
+    Args:
+        path (Path): the raw file
+        index_dir (Path, optional): shared directory of indexes, keyed by
+            fingerprint so copies of a file in other runs reuse one index.
+            Defaults to a sidecar next to the file.
+        key (str, optional): fingerprint of the file when already computed
+
+    Returns:
+        Path: path of the index yaml
+    """
+    path = Path(path)
+    if index_dir is None:
+        return path.with_name(path.name + ".index.yaml")
+    return Path(index_dir) / f"{key or fingerprint(path)}.index.yaml"
+
+
+def build_index(path: Path, index_dir: Optional[Path] = None, min_rows: int = 2) -> dict:
+    """Scan a raw file and save its block index
+    Args:
+        path (Path): the raw file
+        index_dir (Path, optional): see index_path
+        min_rows (int, optional): see scan_blocks
+
+    Returns:
+        dict: the index with the fingerprint and size of the file and its blocks
+    """
+    key = fingerprint(path)
+    index = {
+        "version": INDEX_VERSION,
+        "fingerprint": key,
+        "size": Path(path).stat().st_size,
+        "min_rows": min_rows,
+        "blocks": scan_blocks(path, min_rows),
+    }
+    target = index_path(path, index_dir, key)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "w") as file:
+            yaml.safe_dump(index, file, sort_keys=False)
+    except OSError as e:
+        # A read-only raw directory only costs a rescan next time
+        logger.warning("Raw file index could not be saved to %s: %s", target, e)
+    logger.info("Indexed %(n)s data blocks of %(p)s", {"n": len(index["blocks"]), "p": path})
+    return index
+
+
+def load_index(path: Path, index_dir: Optional[Path] = None, min_rows: int = 2) -> dict:
+    """Block index of a raw file, scanning the file only when no valid index is saved
+    Args:
+        path (Path): the raw file
+        index_dir (Path, optional): see index_path
+        min_rows (int, optional): see scan_blocks
+
+    Returns:
+        dict: the index, see build_index
+    """
+    key = fingerprint(path)
+    target = index_path(path, index_dir, key)
+    if target.exists():
+        with open(target, "r") as file:
+            index = yaml.safe_load(file) or {}
+        if (
+            index.get("version") == INDEX_VERSION
+            and index.get("fingerprint") == key
+            and index.get("min_rows") == min_rows
+        ):
+            logger.debug("Reusing raw file index %s", target)
+            return index
+        logger.info("Raw file index %s is stale; rescanning", target)
+    return build_index(path, index_dir, min_rows)
+
+
+def read_block(path: Path, block: dict) -> np.ndarray:
+    """Parse one indexed block, reading only its bytes through a memory map
+    Args:
+        path (Path): the raw file
+        block (dict): an entry of the index blocks
+
+    Returns:
+        np.ndarray: (rows, values per row) float64 array
+    """
+    if block["min_cols"] != block["max_cols"]:
+        logger.error(
+            "Block at line %(line)s has between %(lo)s and %(hi)s values per row",
+            {"line": block["line"], "lo": block["min_cols"], "hi": block["max_cols"]},
+        )
+        raise NotImplementedError
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        data = view[block["start"] : block["end"]]
+    return np.loadtxt(io.BytesIO(data), ndmin=2)
+
+
+def find_block(index: dict, selector) -> dict:
+    """Pick a block of an index by position or by header
+    Args:
+        index (dict): output of load_index
+        selector (int or str): block position, or text its header contains
+
+    Returns:
+        dict: the block
+    """
+    blocks = index["blocks"]
+    if isinstance(selector, int):
+        if -len(blocks) <= selector < len(blocks):
+            return blocks[selector]
+    else:
+        matches = [block for block in blocks if str(selector) in block["header"]]
+        if len(matches) == 1:
+            return matches[0]
+    logger.error(
+        "Block %(sel)s not found among %(n)s blocks: %(headers)s",
+        {"sel": selector, "n": len(blocks), "headers": [block["header"] for block in blocks]},
+    )
+    raise NotImplementedError
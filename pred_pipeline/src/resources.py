@@ -0,0 +1,227 @@
+import logging
+import math
+import os
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+logger = logging.getLogger("clouds")
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# Settings of a profile not given in config.yaml
+DEFAULT_PROFILE = {
+    "n_jobs": None,
+    "threads": None,
+    "chunk_size": 100000,
+    "memory_budget": None,
+    "memory_fraction": 0.8,
+}
+
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return Path(path).read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """CPU quota of the container in cores, from cgroup v2 or v1
+    Args:
+        root (Path, optional): mount point of the cgroup filesystem
+
+    Returns:
+        float or None: cores allowed by the quota, None without a quota
+    """
+    v2 = _read(Path(root) / "cpu.max")
+    if v2 is not None:
+        quota, _, period = v2.partition(" ")
+        if quota != "max":
+            return int(quota) / int(period or 100000)
+        return None
+    quota = _read(Path(root) / "cpu" / "cpu.cfs_quota_us")
+    period = _read(Path(root) / "cpu" / "cpu.cfs_period_us")
+    if quota is not None and period is not None and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_memory_limit(root: Path = CGROUP_ROOT) -> Optional[int]:
+    """Memory limit of the container in bytes, from cgroup v2 or v1
+    Args:
+        root (Path, optional): mount point of the cgroup filesystem
+
+    Returns:
+        int or None: the limit, None when unlimited
+    """
+    value = _read(Path(root) / "memory.max")
+    if value is None:
+        value = _read(Path(root) / "memory" / "memory.limit_in_bytes")
+    if value is None or value == "max":
+        return None
+    limit = int(value)
+    # cgroup v1 reports "unlimited" as a page-rounded maximum int64
+    return None if limit >= 1 << 60 else limit
+
+
+def available_cores(root: Path = CGROUP_ROOT) -> int:
+    """Cores this process may use: CPU affinity capped by the cgroup quota"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    quota = cgroup_cpu_limit(root)
+    if quota is not None:
+        cores = min(cores, max(1, math.ceil(quota)))
+    return cores
+
+
+def available_memory(root: Path = CGROUP_ROOT) -> int:
+    """Bytes of memory this process may use: physical memory capped by the cgroup limit"""
+    physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    limit = cgroup_memory_limit(root)
+    return physical if limit is None else min(physical, limit)
+
+
+def reset_peak_rss() -> bool:
+    """Restart the peak RSS of this process from its current RSS (Linux)
+    Returns:
+        bool: whether the peak was reset; otherwise peak_rss keeps the peak since start
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident memory of this process in bytes since start or the last reset_peak_rss"""
+    status = _read(Path("/proc/self/status"))
+    for line in (status or "").splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in KiB on Linux and bytes on macOS; it cannot be reset
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def parse_bytes(size: Union[int, str, None]) -> Optional[int]:
+    """Bytes of a size such as 512MiB, 4GB or 1048576"""
+    if size is None or isinstance(size, int):
+        return size
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)i?B?\s*", str(size), re.IGNORECASE)
+    if match is None:
+        logger.error("Memory budget %s is not a size such as 512MiB or 4GiB", size)
+        raise NotImplementedError
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def stage_profile(config: dict, stage: str, root: Path = CGROUP_ROOT) -> Optional[dict]:
+    """Resolve the execution settings of a stage from the active profile
+    Settings left null are derived from the detected cores and memory. Worker
+    count times threads per worker never exceeds the cores, and the memory
+    budget never exceeds the memory limit.
+    Args:
+        config (dict): full pipeline configuration
+        stage (str): stage name, looked up in the profile's stages overrides
+        root (Path, optional): mount point of the cgroup filesystem
+
+    Returns:
+        dict or None: n_jobs, threads, chunk_size, memory_budget (bytes) plus the
+            detected cores and memory; None without an execution section
+    """
+    execution = config.get("execution")
+    if not execution:
+        return None
+    name = execution.get("profile", "auto")
+    if name not in execution["profiles"]:
+        logger.error(
+            "Execution profile %(name)s is not one of %(names)s",
+            {"name": name, "names": list(execution["profiles"])},
+        )
+        raise NotImplementedError
+    settings = dict(execution["profiles"][name])
+    overrides = settings.pop("stages", None) or {}
+    settings = {**DEFAULT_PROFILE, **settings, **(overrides.get(stage) or {})}
+
+    cores = available_cores(root)
+    memory = available_memory(root)
+    n_jobs = max(1, min(settings["n_jobs"] or cores, cores))
+    threads = max(1, min(settings["threads"] or cores // n_jobs, cores // n_jobs))
+    ceiling = int(memory * settings["memory_fraction"])
+    budget = parse_bytes(settings["memory_budget"])
+    return {
+        "profile": name,
+        "n_jobs": n_jobs,
+        "threads": threads,
+        "chunk_size": settings["chunk_size"],
+        "memory_budget": ceiling if budget is None else min(budget, ceiling),
+        "cores": cores,
+        "memory": memory,
+    }
+
+
+def chunk_rows(profile: Optional[dict], row_bytes: int) -> Optional[int]:
+    """Rows per chunk so that one chunk fits the chunk size and the memory budget
+    Args:
+        profile (dict or None): output of stage_profile
+        row_bytes (int): bytes a row takes while it is processed
+
+    Returns:
+        int or None: rows per chunk, None to process everything at once
+    """
+    if profile is None:
+        return None
+    rows = profile["memory_budget"] // max(1, row_bytes)
+    if profile["chunk_size"]:
+        rows = min(rows, profile["chunk_size"])
+    return max(1, rows)
+
+
+def check_budget(nbytes: int, profile: Optional[dict], what: str) -> None:
+    """Warn when data held in memory at once exceeds the memory budget"""
+    if profile is not None and nbytes > profile["memory_budget"]:
+        logger.warning(
+            "%(what)s takes %(mb).0f MiB, above the %(budget).0f MiB budget of profile %(p)s",
+            {
+                "what": what,
+                "mb": nbytes / 2**20,
+                "budget": profile["memory_budget"] / 2**20,
+                "p": profile["profile"],
+            },
+        )
+
+
+@contextmanager
+def execution_context(profile: Optional[dict]) -> Iterator[None]:
+    """Bound BLAS/OpenMP threads and the default joblib job count to a profile
+    Estimators left at n_jobs=None take their job count from the joblib backend.
+    Args:
+        profile (dict or None): output of stage_profile; None leaves the defaults
+    """
+    with ExitStack() as stack:
+        if profile is not None:
+            from joblib import parallel_backend
+            from threadpoolctl import threadpool_limits
+
+            stack.enter_context(threadpool_limits(limits=profile["threads"]))
+            stack.enter_context(parallel_backend("threading", n_jobs=profile["n_jobs"]))
+        yield
+
+
+def cap_workers(stage_config: dict, profile: Optional[dict]) -> dict:
+    """Copy of a stage config with its own n_workers capped to the jobs of the profile"""
+    if profile is None or "n_workers" not in stage_config:
+        return stage_config
+    return {**stage_config, "n_workers": min(stage_config["n_workers"], profile["n_jobs"])}
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+import yaml
+from src.compact_dataset import CompactDataset
+
+logger = logging.getLogger("clouds")
+
+
+def sample_size(n_rows: int, size: Optional[Union[int, float]]) -> int:
+    """Number of rows to sample
+    Args:
+        n_rows (int): rows available
+        size (int, float or None): row count, fraction of the rows when a float
+            below 1, or None for all rows
+
+    Returns:
+        int: rows to sample, at most n_rows
+    """
+    if size is None:
+        return n_rows
+    if isinstance(size, float) and size < 1:
+        return int(round(n_rows * size))
+    return min(int(size), n_rows)
+
+
+def sample_order(n_rows: int, seed: int, labels: Optional[np.ndarray] = None) -> np.ndarray:
+    """Order in which rows enter the sample; a sample of k rows is the first k
+    Every row gets a random priority from the seed. Without labels rows are
+    ordered by priority. With labels each row is placed at its relative rank
+    within its class, so every prefix of the order holds each class in
+    proportion to the full data, to within one row. All sample sizes are
+    prefixes of one order, so a larger sample contains the smaller ones.
+    Args:
+        n_rows (int): rows in the dataset
+        seed (int): random seed
+        labels (np.ndarray, optional): class label per row to stratify by
+
+    Returns:
+        np.ndarray: row positions in sampling order
+    """
+    priority = np.random.default_rng(seed).random(n_rows)
+    if labels is None:
+        return np.argsort(priority, kind="stable")
+    _, codes, counts = np.unique(np.asarray(labels), return_inverse=True, return_counts=True)
+    codes = codes.reshape(-1)
+    # Rank of each row within its class by priority
+    by_class = np.lexsort((priority, codes))
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    rank = np.empty(n_rows, dtype=np.int64)
+    rank[by_class] = np.arange(n_rows) - starts
+    return np.lexsort((priority, (rank + 0.5) / counts[codes]))
+
+
+def reservoir_sample(
+    chunks: Iterable[pd.DataFrame], size: int, seed: int
+) -> Tuple[pd.DataFrame, int]:
+    """Uniform sample of a stream of row chunks without holding the stream in memory
+    Algorithm R: row i of the stream (0-based) replaces a random slot of the
+    reservoir with probability size / (i + 1). Each chunk is handled with one
+    vectorized draw, so memory stays at the reservoir plus one chunk.
+    Args:
+        chunks (iterable of pd.DataFrame): the stream, e.g. pd.read_csv(..., chunksize=n)
+        size (int): rows to keep
+        seed (int): random seed
+
+    Returns:
+        sample (pd.DataFrame): sampled rows in stream order, with their original index
+        seen (int): rows in the stream
+    """
+    rng = np.random.default_rng(seed)
+    reservoir, stream_pos = None, np.empty(0, dtype=np.int64)
+    seen = 0
+    for chunk in chunks:
+        positions = np.arange(seen, seen + len(chunk))
+        fill = min(max(size - seen, 0), len(chunk))
+        if reservoir is None:
+            reservoir = chunk.iloc[:fill]
+        else:
+            reservoir = pd.concat([reservoir, chunk.iloc[:fill]])
+        stream_pos = np.r_[stream_pos, positions[:fill]]
+
+        slots = rng.integers(0, positions[fill:] + 1)
+        hits = np.flatnonzero(slots < size)
+        if hits.size:
+            # A slot drawn twice in one chunk ends up holding the later row
+            hits = hits[::-1]
+            _, first = np.unique(slots[hits], return_index=True)
+            hits = hits[first]
+            kept = np.ones(size, dtype=bool)
+            kept[slots[hits]] = False
+            slot_order = np.r_[np.flatnonzero(kept), slots[hits]]
+            reservoir = pd.concat([reservoir.iloc[kept], chunk.iloc[fill + hits]])
+            stream_pos = np.r_[stream_pos[kept], positions[fill + hits]]
+            # Keep the reservoir in slot order so slot j always refers to row j
+            by_slot = np.argsort(slot_order, kind="stable")
+            reservoir, stream_pos = reservoir.iloc[by_slot], stream_pos[by_slot]
+        seen += len(chunk)
+    if reservoir is None:
+        return pd.DataFrame(), 0
+    logger.info("Reservoir sample of %(k)s rows drawn from %(n)s", {"k": len(reservoir), "n": seen})
+    return reservoir.iloc[np.argsort(stream_pos, kind="stable")], seen
+
+
+def sample_data(
+    data: Union[pd.DataFrame, CompactDataset], config: dict
+) -> Tuple[Union[pd.DataFrame, CompactDataset], np.ndarray]:
+    """Draw a reproducible random or stratified sample of the dataset
+    Args:
+        data (pd.DataFrame or CompactDataset): full dataset
+        config (dict): configurations for sampling
+
+    Returns:
+        sample (pd.DataFrame or CompactDataset): sampled rows in their original order
+        rows (np.ndarray): positions of the sampled rows in data
+    """
+    compact = isinstance(data, CompactDataset)
+    labels = None
+    if config["method"] == "stratified":
+        labels = data.labels if compact else data[config["strat_col"]].to_numpy()
+    elif config["method"] != "random":
+        logger.error("Sampling method %s is not supported in memory", config["method"])
+        raise NotImplementedError
+    size = sample_size(len(data), config["size"])
+    rows = np.sort(sample_order(len(data), config["seed"], labels)[:size])
+    sample = data.take(rows) if compact else data.iloc[rows]
+    logger.info(
+        "%(method)s sample of %(k)s rows drawn from %(n)s",
+        {"method": config["method"].capitalize(), "k": size, "n": len(data)},
+    )
+    return sample, rows
+
+
+def sample_record(index: np.ndarray, labels: np.ndarray, n_rows: int, config: dict) -> dict:
+    """Describe a sample so downstream artifacts can be traced to it
+    Args:
+        index (np.ndarray): dataset index of the sampled rows
+        labels (np.ndarray): class label of the sampled rows
+        n_rows (int): rows in the full dataset
+        config (dict): configurations for sampling
+
+    Returns:
+        dict: sample id (hash of the sampled index), settings, row and class counts
+    """
+    index = np.sort(np.asarray(index, dtype=np.int64))
+    classes, counts = np.unique(np.asarray(labels), return_counts=True)
+    full = config["size"] is None or config["method"] == "none"
+    return {
+        "sample_id": "full" if full else hashlib.sha256(index.tobytes()).hexdigest()[:16],
+        "method": config["method"],
+        "seed": config["seed"],
+        "size": config["size"],
+        "rows": int(len(index)),
+        "population": int(n_rows),
+        "class_counts": {str(c): int(k) for c, k in zip(classes.tolist(), counts)},
+        "used_by": [],
+    }
+
+
+def save_sample_record(record: dict, path: Path) -> None:
+    """save the sample record
+    Args:
+        record (dict): output of sample_record
+        path (Path): path to save the record yaml
+    Returns:
+        None
+    """
+    try:
+        with open(path, "w") as file:
+            yaml.dump(record, file)
+        logger.info("Sample record saved to %s", path)
+    except Exception as e:
+        logger.error(
+            "Sample record failed to save to %(p)s due to: %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
+
+
+def load_sample_record(path: Path) -> Optional[dict]:
+    """load a sample record written by save_sample_record
+    Args:
+        path (Path): path of the record yaml
+    Returns:
+        dict or None: the record, None if the run was not sampled
+    """
+    if not Path(path).exists():
+        return None
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
@@ -1,18 +1,29 @@
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 import logging
+import numpy as np
 import pandas as pd
+from src.calibrate_model import predict_calibrated
 
 logger = logging.getLogger("clouds")
 
 
-def score_model(test: pd.DataFrame, model: object, config: dict) -> Tuple[list, list]:
+def score_model(
+    test: pd.DataFrame,
+    model: object,
+    config: dict,
+    calibration: Optional[dict] = None,
+    chunk_size: Optional[int] = None,
+) -> Tuple[list, list]:
     """score saved model
     Args:
         Args:
         test (pd.DataFrame): test dataset
         model (object): model to score
         config (dict): configurations for scoring the model
+        calibration (dict, optional): calibrator and threshold from calibrate_model;
+            without it classes come from the model's own 0.5 cutoff
+        chunk_size (int, optional): rows predicted at a time, all at once if None
     Returns:
         ypred_proba_test (list): predicted probabilities of positve class
         ypred_bin_test (list): predicted classes
@@ -20,8 +31,16 @@ def score_model(test: pd.DataFrame, model: object, config: dict) -> Tuple[list,
     initial_features = config["initial_features"]
     x_test = test[initial_features]
 
-    ypred_proba_test = model.predict_proba(x_test)[:, 1]
-    ypred_bin_test = model.predict(x_test)
+    if chunk_size is None or len(x_test) <= chunk_size:
+        chunks = [x_test]
+    else:
+        chunks = [x_test.iloc[i : i + chunk_size] for i in range(0, len(x_test), chunk_size)]
+
+    ypred_proba_test = np.concatenate([model.predict_proba(chunk)[:, 1] for chunk in chunks])
+    if calibration is not None:
+        ypred_proba_test, ypred_bin_test = predict_calibrated(calibration, ypred_proba_test)
+    else:
+        ypred_bin_test = np.concatenate([model.predict(chunk) for chunk in chunks])
     logger.info("Model predictions (probability and class) created")
 
     return (ypred_proba_test, ypred_bin_test)
@@ -48,3 +67,23 @@ def save_scores(scores: tuple, path: Path) -> None:
             {"p": path, "err": e},
         )
         raise NotImplementedError from e
+
+
+def load_scores(path: Path) -> Tuple[list, list]:
+    """load output of the model written by save_scores
+    Args:
+        path (Path): path of saved model outputs
+    Returns:
+        ypred_proba_test (list): predicted probabilities of positve class
+        ypred_bin_test (list): predicted classes
+    """
+    try:
+        out = pd.read_csv(path, index_col=0)
+        logger.info("Model predictions loaded from %s", path)
+    except Exception as e:
+        logger.error(
+            "Model predictions failed to load from %(p)s due to %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
+    return (out["Probability"].values, out["Class"].values)
@@ -0,0 +1,282 @@
+import logging
+import os
+import shutil
+import stat
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set
+from src import manifest as mf
+
+logger = logging.getLogger("clouds")
+
+MODES = ("hardlink", "manifest")
+
+
+class BlobStore:
+    """Files stored once by the sha256 of their contents
+
+    A blob is kept at <root>/<first two hex digits>/<sha256> and never changes
+    after it is written, so any number of runs can share it. Blobs are made
+    read-only; a run file linked to a blob must be replaced, not rewritten in
+    place, see checkout_run.
+    Args:
+        root (Path): directory of the blobs, created on first write
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def __iter__(self) -> Iterator[str]:
+        """Hashes of every stored blob"""
+        if not self.root.is_dir():
+            return iter(())
+        return (
+            path.name
+            for path in self.root.glob("*/*")
+            if path.is_file() and not path.name.endswith(".part")
+        )
+
+    def add(self, path: Path, sha256: str) -> bool:
+        """Store a file under its hash unless a blob with that hash exists
+        The blob is a hardlink to the file when both are on the same file system,
+        so adding takes no copy and no extra space; otherwise the file is copied.
+        Args:
+            path (Path): file to store
+            sha256 (str): hash of its contents, from the run manifest
+
+        Returns:
+            bool: whether a new blob was written
+        """
+        blob = self.path(sha256)
+        if blob.exists():
+            return False
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so a blob is always complete
+        partial = blob.with_name(f".{blob.name}.{uuid.uuid4().hex}.part")
+        try:
+            try:
+                os.link(path, partial)
+            except OSError:
+                shutil.copyfile(path, partial)
+            os.chmod(partial, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(partial, blob)
+        finally:
+            partial.unlink(missing_ok=True)
+        return True
+
+    def link(self, sha256: str, path: Path) -> bool:
+        """Replace a file with a hardlink to its blob
+        Args:
+            sha256 (str): hash of the blob
+            path (Path): file to replace; its contents must hash to sha256
+
+        Returns:
+            bool: False when the file system cannot link them and the file is kept
+        """
+        blob = self.path(sha256)
+        if path.exists() and os.path.samefile(path, blob):
+            return True
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        try:
+            os.link(blob, partial)
+            os.replace(partial, path)
+        except OSError:
+            return False
+        finally:
+            partial.unlink(missing_ok=True)
+        return True
+
+    def copy(self, sha256: str, path: Path) -> None:
+        """Write a private, writable copy of a blob to path"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        try:
+            shutil.copyfile(self.path(sha256), partial)
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+
+
+def snapshot_run(
+    run_dir: Path, blobs: BlobStore, mode: str = "hardlink", keep: Iterable[str] = ()
+) -> dict:
+    """Store every artifact of a run in the blob store and deduplicate the run directory
+    The manifest of the run gives the hash of each artifact; artifacts written
+    after it, or listed with another size, are hashed again and the manifest
+    is updated. With mode "hardlink" each artifact becomes a hardlink to its
+    blob: the run directory still holds every file, but identical files of all
+    runs share one copy on disk. With mode "manifest" the artifacts are removed
+    and the manifest is their only reference; checkout_run restores them.
+    Args:
+        run_dir (Path): run directory holding manifest.yaml
+        blobs (BlobStore): blob store
+        mode (str, optional): "hardlink" or "manifest". Defaults to "hardlink".
+        keep (Iterable, optional): artifacts, relative to run_dir, that later runs
+            read in place (see gate.record_paths); mode "manifest" links them
+            to their blob instead of removing them
+
+    Returns:
+        dict: artifact count, their total bytes and the bytes of new blobs
+    """
+    if mode not in MODES:
+        logger.error("Snapshot mode must be one of %s, got %s", ", ".join(MODES), mode)
+        raise NotImplementedError
+    run_dir = Path(run_dir)
+    manifest_path = run_dir / mf.MANIFEST_NAME
+    manifest = mf.load_manifest(manifest_path)
+    if manifest is None:
+        logger.error("Run %s has no manifest to snapshot", run_dir)
+        raise NotImplementedError
+    start = time.perf_counter()
+    written = manifest_path.stat().st_mtime_ns
+    stale = False
+    keep = {Path(rel_path).as_posix() for rel_path in keep}
+    stats = {"artifacts": 0, "bytes": 0, "new_bytes": 0}
+    for rel_path, entry in manifest["artifacts"].items():
+        path = run_dir / rel_path
+        if not path.is_file():
+            # Already reduced to its manifest by an earlier snapshot
+            continue
+        status = path.stat()
+        if status.st_size != entry["size"] or status.st_mtime_ns > written:
+            entry.update(size=status.st_size, sha256=mf.hash_file(path))
+            stale = True
+        if blobs.add(path, entry["sha256"]):
+            stats["new_bytes"] += entry["size"]
+        if mode == "hardlink" or rel_path in keep:
+            blobs.link(entry["sha256"], path)
+        else:
+            path.unlink()
+        stats["artifacts"] += 1
+        stats["bytes"] += entry["size"]
+    if stale:
+        mf.save_manifest(manifest, manifest_path)
+    if mode == "manifest":
+        for root, _, _ in sorted(os.walk(run_dir), reverse=True):
+            if Path(root) != run_dir and not any(Path(root).iterdir()):
+                Path(root).rmdir()
+    logger.info(
+        "Run %(run)s snapshotted: %(n)s artifacts, %(b)s bytes, %(new)s bytes of new blobs",
+        {"run": run_dir.name, "n": stats["artifacts"], "b": stats["bytes"], "new": stats["new_bytes"]},
+        extra={"seconds": time.perf_counter() - start, **stats},
+    )
+    return stats
+
+
+def checkout_run(run_dir: Path, blobs: BlobStore) -> int:
+    """Make the artifacts of a snapshotted run writable files again
+    Stages write their outputs in place, which would change the blob and every
+    run sharing it, so artifacts linked to a blob get a private copy and those
+    removed by a "manifest" snapshot are restored. The next snapshot
+    deduplicates them again.
+    Args:
+        run_dir (Path): run directory holding manifest.yaml
+        blobs (BlobStore): blob store
+
+    Returns:
+        int: number of artifacts copied from the blob store
+    """
+    run_dir = Path(run_dir)
+    manifest = mf.load_manifest(run_dir / mf.MANIFEST_NAME)
+    if manifest is None:
+        return 0
+    copied = 0
+    for rel_path, entry in manifest["artifacts"].items():
+        path = run_dir / rel_path
+        if path.is_file() and path.stat().st_nlink == 1:
+            continue
+        if not blobs.path(entry["sha256"]).exists():
+            if not path.is_file():
+                # It may still be fetched from the run store
+                logger.warning("Blob of %s is missing from %s", rel_path, blobs.root)
+            continue
+        blobs.copy(entry["sha256"], path)
+        copied += 1
+    logger.info("%(n)s artifacts of run %(run)s checked out", {"n": copied, "run": run_dir.name})
+    return copied
+
+
+def referenced_blobs(runs_dir: Path) -> Set[str]:
+    """Hashes referenced by the manifest of any run under runs_dir"""
+    referenced = set()
+    for manifest_path in Path(runs_dir).glob(f"*/{mf.MANIFEST_NAME}"):
+        manifest = mf.load_manifest(manifest_path) or {}
+        referenced.update(entry["sha256"] for entry in manifest.get("artifacts", {}).values())
+    return referenced
+
+
+def collect_garbage(
+    blobs: BlobStore, runs_dir: Path, grace_seconds: float = 3600, dry_run: bool = False
+) -> dict:
+    """Delete the blobs no run manifest references
+    Blobs are listed before the manifests are read, and blobs linked or
+    written in the last grace_seconds are kept, so a run being snapshotted
+    while collection runs keeps its blobs. Runs of a "hardlink" snapshot keep
+    their files when a blob is deleted; only the shared copy goes.
+    Args:
+        blobs (BlobStore): blob store
+        runs_dir (Path): directory holding one subdirectory per run
+        grace_seconds (float, optional): minimum age of a deleted blob. Defaults to 3600.
+        dry_run (bool, optional): report without deleting. Defaults to False.
+
+    Returns:
+        dict: number and bytes of the blobs deleted and the number kept
+    """
+    candidates = list(blobs)
+    referenced = referenced_blobs(runs_dir)
+    cutoff = time.time() - grace_seconds
+    result = {"deleted": 0, "bytes": 0, "kept": 0}
+    for sha256 in candidates:
+        path = blobs.path(sha256)
+        try:
+            status = path.stat()
+        except FileNotFoundError:
+            continue
+        # Linking a blob into a run updates its ctime, so recent reuse counts as new
+        if sha256 in referenced or status.st_ctime > cutoff:
+            result["kept"] += 1
+            continue
+        if not dry_run:
+            path.unlink(missing_ok=True)
+        result["deleted"] += 1
+        result["bytes"] += status.st_size
+    logger.info(
+        "%(verb)s %(n)s unreferenced blobs (%(b)s bytes), kept %(k)s",
+        {
+            "verb": "Would delete" if dry_run else "Deleted",
+            "n": result["deleted"],
+            "b": result["bytes"],
+            "k": result["kept"],
+        },
+    )
+    return result
+
+
+def usage(blobs: BlobStore, runs_dir: Path) -> Dict[str, int]:
+    """Bytes the runs reference against the bytes the blob store holds
+    Args:
+        blobs (BlobStore): blob store
+        runs_dir (Path): directory holding one subdirectory per run
+
+    Returns:
+        dict: runs, referenced (sum of artifact sizes over every run),
+            stored (sum of blob sizes) and blobs (count)
+    """
+    runs, referenced = 0, 0
+    for manifest_path in Path(runs_dir).glob(f"*/{mf.MANIFEST_NAME}"):
+        manifest = mf.load_manifest(manifest_path) or {}
+        runs += 1
+        referenced += sum(entry["size"] for entry in manifest.get("artifacts", {}).values())
+    sizes = [blobs.path(sha256).stat().st_size for sha256 in blobs]
+    return {"runs": runs, "referenced": referenced, "stored": sum(sizes), "blobs": len(sizes)}
+
+
+def open_blob_store(config: dict) -> Optional[BlobStore]:
+    """Blob store of the snapshot section of the configuration, None without one"""
+    if config.get("snapshot") is None:
+        return None
+    return BlobStore(config["snapshot"]["blob_dir"])
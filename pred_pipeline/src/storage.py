@@ -0,0 +1,41 @@
+from pathlib import Path
+from clouds_common import storage as common
+from clouds_common.storage import (  # noqa: F401
+    CachedStorage,
+    LocalStorage,
+    MemoryStorage,
+    S3Storage,
+    Stamp,
+    Storage,
+    snapshot,
+)
+from src.telemetry import METRICS
+
+
+def open_storage(uri: str, **options) -> Storage:
+    """Open the store of a URI, counting S3 transfers in the pipeline metrics
+    Args:
+        uri (str): "s3://bucket/prefix", "memory://" or a local directory
+            (optionally "file://" prefixed)
+        **options: S3Storage settings, e.g. max_pool_connections
+
+    Returns:
+        Storage: the store
+    """
+    return common.open_storage(uri, metrics=METRICS, **options)
+
+
+def open_run_store(storage_config: dict, artifacts: Path) -> CachedStorage:
+    """Store of one run under the configured URI, cached in the run directory
+    Args:
+        storage_config (dict): storage section of the configuration
+        artifacts (Path): run directory, whose name keys the run in the store
+
+    Returns:
+        CachedStorage: the run's store
+    """
+    uri = f"{str(storage_config['uri']).rstrip('/')}/{Path(artifacts).name}"
+    options = {}
+    if uri.startswith("s3://"):
+        options["max_pool_connections"] = storage_config.get("max_pool_connections", 16)
+    return CachedStorage(open_storage(uri, **options), artifacts, storage_config.get("workers", 8), METRICS)
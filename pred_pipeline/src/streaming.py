@@ -0,0 +1,261 @@
+import asyncio
+import io
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("clouds")
+
+# Marks the end of the stream in a queue
+_END = object()
+
+
+@dataclass
+class Step:
+    """One step of a streaming chain
+
+    Attributes:
+        name (str): step name used in the statistics
+        function (Callable): maps one chunk to the next step's chunk; None drops it
+        kind (str): "io" or "cpu", the executor the function runs in
+    """
+
+    name: str
+    function: Callable[[Any], Any]
+    kind: str = "cpu"
+
+
+def read_chunks(source: str, chunk_bytes: int) -> Iterator[bytes]:
+    """Read a CSV file or URL in line-aligned chunks
+    Args:
+        source (str): local path, http(s) URL or s3:// URI of a CSV file with a header line
+        chunk_bytes (int): bytes read per chunk, rounded to the next line end
+
+    Yields:
+        bytes: the header line followed by the complete lines of the chunk
+    """
+    if str(source).startswith(("http://", "https://")):
+        import requests
+
+        response = requests.get(source, stream=True, timeout=10)
+        response.raise_for_status()
+        blocks, close = response.iter_content(chunk_size=chunk_bytes), response.close
+    elif str(source).startswith("s3://"):
+        from src.storage import open_storage
+
+        location, _, key = str(source).rpartition("/")
+        body = open_storage(location).open_read(key)
+        blocks, close = iter(lambda: body.read(chunk_bytes), b""), body.close
+    else:
+        file = open(source, "rb")
+        blocks, close = iter(lambda: file.read(chunk_bytes), b""), file.close
+    header, rest = None, b""
+    try:
+        for block in blocks:
+            rest += block
+            if header is None:
+                end = rest.find(b"\n")
+                if end < 0:
+                    continue
+                header, rest = rest[: end + 1], rest[end + 1 :]
+            end = rest.rfind(b"\n")
+            if end >= 0:
+                yield header + rest[: end + 1]
+                rest = rest[end + 1 :]
+        if rest.strip():
+            # Last line without a line end
+            yield (header or b"") + rest
+    finally:
+        close()
+
+
+def parse_chunk(data: bytes, index_col: Optional[int] = 0) -> pd.DataFrame:
+    """Parse a chunk yielded by read_chunks"""
+    return pd.read_csv(io.BytesIO(data), index_col=index_col)
+
+
+class CsvSink:
+    """Append chunks to one CSV file, writing the header with the first chunk
+
+    Args:
+        path (Path): output file, replaced
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "w", newline="")
+        self.rows = 0
+
+    def __call__(self, chunk: pd.DataFrame) -> None:
+        chunk.to_csv(self.file, header=self.rows == 0)
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def _produce(
+    source: Iterator[Any], outbox: asyncio.Queue, executor: Executor, stats: dict
+) -> None:
+    """Pull chunks from a blocking iterator in an executor into the first queue"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = time.perf_counter()
+        chunk = await loop.run_in_executor(executor, next, source, _END)
+        stats["busy"] += time.perf_counter() - start
+        if chunk is _END:
+            break
+        stats["chunks"] += 1
+        await outbox.put(chunk)
+    await outbox.put(_END)
+
+
+async def _work(
+    step: Step, inbox: asyncio.Queue, outbox: asyncio.Queue, executor: Executor, stats: dict
+) -> None:
+    """Apply a step to every chunk of its inbox, one chunk at a time, in order"""
+    loop = asyncio.get_running_loop()
+    while True:
+        stats["peak_queue"] = max(stats["peak_queue"], inbox.qsize())
+        chunk = await inbox.get()
+        if chunk is _END:
+            break
+        start = time.perf_counter()
+        result = await loop.run_in_executor(executor, step.function, chunk)
+        stats["busy"] += time.perf_counter() - start
+        stats["chunks"] += 1
+        if result is not None:
+            # Waits while the next step is depth chunks behind: backpressure
+            await outbox.put(result)
+    await outbox.put(_END)
+
+
+async def run_chain(
+    source: Iterator[Any], steps: List[Step], depth: int = 2, cpu_workers: int = 1
+) -> Dict[str, dict]:
+    """Stream chunks from a source through steps connected by bounded queues
+    Each step runs as its own task, so while one chunk is scored the next is
+    parsed and the previous one written. A queue holds at most depth chunks,
+    and a step waits when its output queue is full, so at most about
+    (len(steps) + 1) * (depth + 1) chunks are in memory at once whatever the
+    size of the source. Blocking steps run in executors: the source and each
+    "io" step in an I/O thread of its own, "cpu" steps in a pool of
+    cpu_workers threads (numpy, pandas and sklearn release the GIL in their
+    kernels).
+    Args:
+        source (Iterator): blocking iterator of chunks, e.g. read_chunks
+        steps (list): Step per stage, in order; the output of the last is dropped
+        depth (int, optional): chunks each queue holds. Defaults to 2.
+        cpu_workers (int, optional): threads of the cpu executor. Defaults to 1.
+
+    Returns:
+        dict: step name -> chunks, busy seconds and peak queue length
+    """
+    queues = [asyncio.Queue(maxsize=depth) for _ in range(len(steps) + 1)]
+    names = ["source"] + [step.name for step in steps]
+    stats = {name: {"chunks": 0, "busy": 0.0, "peak_queue": 0} for name in names}
+    io_steps = sum(step.kind == "io" for step in steps)
+    io_executor = ThreadPoolExecutor(max_workers=1 + io_steps, thread_name_prefix="stream-io")
+    cpu_executor = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="stream-cpu")
+    executors = {"io": io_executor, "cpu": cpu_executor}
+    tasks = [asyncio.ensure_future(_produce(source, queues[0], io_executor, stats["source"]))]
+    for i, step in enumerate(steps):
+        tasks.append(
+            asyncio.ensure_future(
+                _work(step, queues[i], queues[i + 1], executors[step.kind], stats[step.name])
+            )
+        )
+
+    async def drain() -> None:
+        while await queues[-1].get() is not _END:
+            pass
+
+    tasks.append(asyncio.ensure_future(drain()))
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # A failed step stops the chain; the others may be waiting on full queues
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        io_executor.shutdown(wait=True)
+        cpu_executor.shutdown(wait=True)
+        if hasattr(source, "close"):
+            source.close()
+    return stats
+
+
+def stream_score(
+    source: str,
+    output: Path,
+    model: object,
+    config: dict,
+    calibration: Optional[dict] = None,
+) -> Dict[str, dict]:
+    """Score a CSV archive chunk by chunk: read, parse, featurize, score and write overlap
+    Args:
+        source (str): local path, URL or s3:// URI of a CSV with the raw columns, e.g. clouds.csv
+        output (Path): CSV written with the Probability and Class of every row
+        model (object): trained model
+        config (dict): full pipeline configuration; stream_score settings plus
+            generate_features and score_model for the features and the model inputs
+        calibration (dict, optional): calibrator and threshold from calibrate_model
+
+    Returns:
+        dict: statistics of each step, see run_chain
+    """
+    import src.generate_features as gf
+    import src.score_model as sm
+
+    stream_config = config["stream_score"]
+    features_config = config["generate_features"]
+
+    def featurize(chunk: pd.DataFrame) -> pd.DataFrame:
+        if features_config["target_col"] not in chunk:
+            # Archives to score have no labels yet
+            chunk = chunk.assign(**{features_config["target_col"]: np.nan})
+        return gf.generate_features(chunk, features_config)
+
+    def score(chunk: pd.DataFrame) -> pd.DataFrame:
+        probability, label = sm.score_model(chunk, model, config["score_model"], calibration)
+        return pd.DataFrame({"Probability": probability, "Class": label}, index=chunk.index)
+
+    sink = CsvSink(output)
+    steps = [
+        Step("parse", lambda data: parse_chunk(data, stream_config["index_col"])),
+        Step("featurize", featurize),
+        Step("score", score),
+        Step("write", sink, kind="io"),
+    ]
+    start = time.perf_counter()
+    try:
+        stats = asyncio.run(
+            run_chain(
+                read_chunks(source, stream_config["chunk_bytes"]),
+                steps,
+                stream_config["queue_depth"],
+                stream_config["cpu_workers"],
+            )
+        )
+    except Exception as e:
+        logger.error(
+            "Streaming scores of %(s)s failed due to %(err)s", {"s": source, "err": e}
+        )
+        raise NotImplementedError from e
+    finally:
+        sink.close()
+    seconds = time.perf_counter() - start
+    logger.info(
+        "%(rows)s rows of %(s)s scored in %(sec).2fs and saved to %(p)s",
+        {"rows": sink.rows, "s": source, "sec": seconds, "p": output},
+        extra={"stream": {name: dict(values) for name, values in stats.items()}, "seconds": seconds},
+    )
+    return stats
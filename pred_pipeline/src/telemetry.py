@@ -0,0 +1,10 @@
+from clouds_common.telemetry import (  # noqa: F401
+    DEFAULT_BUCKETS,
+    JsonFormatter,
+    MetricsRegistry,
+    start_queue_logging,
+    stop_queue_logging,
+)
+
+# Process-wide registry used by the pipeline stages
+METRICS = MetricsRegistry()
@@ -2,17 +2,21 @@ from importlib import import_module
 from pathlib import Path
 import os
 import pickle
-from typing import Tuple
+from typing import Optional, Tuple
 import logging
 import pandas as pd
 import sklearn
+from src import binning
+from src.compact_dataset import CompactDataset
+from src.hash_split import CALIBRATION, TEST, TRAIN, assign_split, row_keys
+from src.telemetry import METRICS
 
 logger = logging.getLogger("clouds")
 
 
 def train_model(
     data: pd.DataFrame, config: dict
-) -> Tuple[object, pd.DataFrame, pd.DataFrame]:
+) -> Tuple[object, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """train model
     Args:
         Args:
@@ -20,25 +24,75 @@ def train_model(
         config (dict): config file for model training
 
     Returns:
-        None
+        model (object): trained model
+        train (pd.DataFrame): rows the model was fitted on
+        test (pd.DataFrame): rows held out for evaluation
+        calibration (pd.DataFrame): training rows held out of the fit for
+            calibration, empty unless train_test_split.calibration_size is set
     """
 
-    features = data[config["initial_features"]]
-    target = data[config["target"]]
+    if isinstance(data, CompactDataset):
+        # Float32 columns go to the estimator as is; tree models would otherwise
+        # convert float64 input to float32 internally
+        features = data.to_frame(config["initial_features"], with_target=False)
+        target = pd.Series(data.labels, index=features.index, name=config["target"])
+    else:
+        features = data[config["initial_features"]]
+        target = data[config["target"]]
     model_config = config["model_config"]
 
     # Import needed modules
     model_lib = import_module(model_config["model_lib"])
 
-    x_train, x_test, y_train, y_test = sklearn.model_selection.train_test_split(
-        features, target, test_size=config["train_test_split"]["test_size"]
-    )
+    split_config = config["train_test_split"]
+    calibration_size = split_config.get("calibration_size")
+    stratify = split_config.get("stratify", False)
+    if split_config.get("method", "random") == "hash":
+        key = split_config.get("key", "index")
+        # Compact frames carry the row ids as index, so a sampled or quarantined
+        # compact dataset splits its rows as the same rows of a DataFrame
+        if isinstance(data, CompactDataset) and key != "index":
+            key_data = data.to_frame(key, with_target=False)
+        else:
+            key_data = features if isinstance(data, CompactDataset) else data
+        split = assign_split(
+            row_keys(key_data, key, split_config.get("key_decimals", 6)),
+            split_config["test_size"],
+            calibration_size,
+            split_config.get("seed", 0),
+            target.to_numpy() if stratify else None,
+        )
+        x_train, y_train = features[split == TRAIN], target[split == TRAIN]
+        x_test, y_test = features[split == TEST], target[split == TEST]
+        x_cal, y_cal = features[split == CALIBRATION], target[split == CALIBRATION]
+    else:
+        random_state = split_config.get("random_state")
+        x_train, x_test, y_train, y_test = sklearn.model_selection.train_test_split(
+            features,
+            target,
+            test_size=split_config["test_size"],
+            random_state=random_state,
+            stratify=target if stratify else None,
+        )
+        if calibration_size:
+            x_train, x_cal, y_train, y_cal = sklearn.model_selection.train_test_split(
+                x_train,
+                y_train,
+                test_size=calibration_size,
+                random_state=random_state,
+                stratify=y_train if stratify else None,
+            )
+        else:
+            x_cal, y_cal = x_train.iloc[:0], y_train.iloc[:0]
 
     # Create model instance with hyperparameters
     try:
         model_class = getattr(model_lib, model_config["type"])
         model = model_class(**model_config["hyperparam"])
-        model.fit(x_train, y_train)
+        if config.get("mode", "exact") == "binned":
+            model = binning.fit_binned(model, x_train, y_train, config["binning"])
+        else:
+            model.fit(x_train, y_train)
         logger.info("Model successfully trained")
     except Exception as e:
         logger.error(
@@ -53,18 +107,27 @@ def train_model(
 
     test = x_test
     test[config["target"]] = y_test
+
+    calibration = x_cal.copy()
+    calibration[config["target"]] = y_cal
     logger.info("Train and test sets created")
 
-    return model, pd.DataFrame(train), pd.DataFrame(test)
+    return model, pd.DataFrame(train), pd.DataFrame(test), calibration
 
 
-def save_data(train: pd.DataFrame, test: pd.DataFrame, path: Path) -> None:
+def save_data(
+    train: pd.DataFrame,
+    test: pd.DataFrame,
+    path: Path,
+    calibration: Optional[pd.DataFrame] = None,
+) -> None:
     """save train and test data to directory
     Args:
         Args:
         train (pd.DataFrame): train dataset
         test (pd.DataFrame): test dataset
         path (Path): path to save datasets
+        calibration (pd.DataFrame, optional): held-out calibration rows, saved if not empty
     Returns:
         None
     """
@@ -91,6 +154,17 @@ def save_data(train: pd.DataFrame, test: pd.DataFrame, path: Path) -> None:
         )
         raise NotImplementedError from e
 
+    if calibration is not None and not calibration.empty:
+        try:
+            calibration.to_csv(os.path.join(path, "calibration.csv"))
+            logger.info("Calibration data set successfully saved to %s", path)
+        except Exception as e:
+            logger.error(
+                "Calibration data set failed to saved to %(p)s due to: %(err)s",
+                {"p": path, "err": e},
+            )
+            raise NotImplementedError from e
+
 
 def save_model(model: object, path: Path) -> None:
     """save trained model
@@ -111,3 +185,66 @@ def save_model(model: object, path: Path) -> None:
             {"p": path, "err": e},
         )
         raise NotImplementedError from e
+
+
+def load_data(path: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """load train and test data written by save_data
+    Args:
+        path (Path): directory holding train.csv and test.csv
+    Returns:
+        train (pd.DataFrame): train dataset
+        test (pd.DataFrame): test dataset
+    """
+    try:
+        train = pd.read_csv(os.path.join(path, "train.csv"), index_col=0)
+        test = pd.read_csv(os.path.join(path, "test.csv"), index_col=0)
+        logger.info("Train and test data sets loaded from %s", path)
+    except Exception as e:
+        logger.error(
+            "Train and test data sets failed to load from %(p)s due to: %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
+    return train, test
+
+
+def load_calibration_data(path: Path) -> pd.DataFrame:
+    """load held-out calibration rows written by save_data
+    Args:
+        path (Path): directory holding calibration.csv
+    Returns:
+        calibration (pd.DataFrame): calibration rows, empty if none were held out
+    """
+    calibration_path = os.path.join(path, "calibration.csv")
+    if not os.path.exists(calibration_path):
+        return pd.DataFrame()
+    try:
+        calibration = pd.read_csv(calibration_path, index_col=0)
+        logger.info("Calibration data set loaded from %s", path)
+    except Exception as e:
+        logger.error(
+            "Calibration data set failed to load from %(p)s due to: %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
+    return calibration
+
+
+def load_model(path: Path) -> object:
+    """load trained model written by save_model
+    Args:
+        path (Path): path of the model binary
+    Returns:
+        model (object): trained model
+    """
+    try:
+        with METRICS.timer("model_load_seconds"), open(path, "rb") as file:
+            model = pickle.load(file)
+            logger.info("Model binary successfully loaded from %s", path)
+    except Exception as e:
+        logger.error(
+            "Model binary failed to load from %(p)s due to: %(err)s",
+            {"p": path, "err": e},
+        )
+        raise NotImplementedError from e
+    return model
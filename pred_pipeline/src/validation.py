@@ -0,0 +1,110 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+from clouds_common import validation as common
+from clouds_common.validation import Rule, ValidationResult, compile_schema  # noqa: F401
+from src.compact_dataset import CompactDataset
+
+logger = logging.getLogger("clouds")
+
+
+def _column(data: Union[pd.DataFrame, CompactDataset], column: str) -> np.ndarray:
+    """Values of a column as float64, a view when already float64"""
+    if isinstance(data, CompactDataset):
+        if column == data.target:
+            return data.labels.astype(np.float64)
+        return np.asarray(data.column(column), dtype=np.float64)
+    return common.column_values(data, column)
+
+
+def validate(data: Union[pd.DataFrame, CompactDataset], rules: List[Rule]) -> ValidationResult:
+    """Check rows against compiled rules in one pass over the columns
+    Args:
+        data (pd.DataFrame or CompactDataset): the rows, a whole dataset or one chunk
+        rules (list): output of compile_schema
+
+    Returns:
+        ValidationResult: bad row mask and violation counts per rule
+    """
+    columns = {rule.column for rule in rules}
+    present = data.columns if isinstance(data, pd.DataFrame) else [*data.columns, data.target]
+    missing = sorted(columns - set(present))
+    if missing:
+        raise KeyError(f"Columns {missing} required by the schema are missing")
+    return common.validate(data, rules, _column)
+
+
+def report(result: ValidationResult, name: str) -> None:
+    """Log the violation counts of a validation"""
+    violations = {label: count for label, count in result.counts.items() if count}
+    if violations:
+        logger.warning(
+            "%(n)s of %(total)s %(name)s rows violate the schema: %(v)s",
+            {"n": result.n_bad, "total": len(result.bad), "name": name, "v": violations},
+        )
+    else:
+        logger.info("All %(total)s %(name)s rows pass the schema", {"total": len(result.bad), "name": name})
+
+
+def quarantine(
+    data: Union[pd.DataFrame, CompactDataset], result: ValidationResult, path: Path
+) -> Union[pd.DataFrame, CompactDataset]:
+    """Write the bad rows with the rules they violate to a CSV and drop them
+    Args:
+        data (pd.DataFrame or CompactDataset): the validated rows
+        result (ValidationResult): output of validate for data
+        path (Path): quarantine file, overwritten; removed when all rows pass
+
+    Returns:
+        pd.DataFrame or CompactDataset: the rows passing the schema
+    """
+    path = Path(path)
+    if not result.n_bad:
+        # A file left by an earlier run would no longer describe these rows
+        path.unlink(missing_ok=True)
+        return data
+    rows = np.flatnonzero(result.bad)
+    if isinstance(data, CompactDataset):
+        bad_rows = data.take(rows).to_frame()
+    else:
+        bad_rows = data.iloc[rows].copy()
+    bad_rows["violations"] = result.reasons()[rows]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    bad_rows.to_csv(path)
+    logger.warning("%(n)s rows quarantined to %(p)s", {"n": len(rows), "p": path})
+    good = np.flatnonzero(~result.bad)
+    return data.take(good) if isinstance(data, CompactDataset) else data.iloc[good]
+
+
+def apply_schema(
+    data: Union[pd.DataFrame, CompactDataset],
+    schema: Dict[str, Optional[dict]],
+    action: str,
+    name: str,
+    quarantine_path: Optional[Path] = None,
+) -> Union[pd.DataFrame, CompactDataset]:
+    """Validate rows and handle violations as configured
+    Args:
+        data (pd.DataFrame or CompactDataset): the rows
+        schema (dict): column specs, see compile_schema
+        action (str): "warn" keeps bad rows, "quarantine" moves them to
+            quarantine_path, "fail" stops the run when any row is bad
+        name (str): name of the rows in logs, e.g. "raw"
+        quarantine_path (Path, optional): quarantine file for action "quarantine"
+
+    Returns:
+        pd.DataFrame or CompactDataset: the rows kept
+    """
+    result = validate(data, compile_schema(schema))
+    report(result, name)
+    if action == "quarantine":
+        return quarantine(data, result, quarantine_path)
+    if action == "warn" or not result.n_bad:
+        return data
+    if action == "fail":
+        logger.error("%(n)s %(name)s rows violate the schema", {"n": result.n_bad, "name": name})
+        raise NotImplementedError
+    logger.error("Invalid validation action %s supplied.", action)
+    raise NotImplementedError
@@ -0,0 +1,43 @@
+import argparse
+import logging.config
+from pathlib import Path
+import yaml
+import src.aws_utils as aws
+import src.manifest as mf
+import src.snapshot as snap
+
+logging.config.fileConfig("config/logging/local.conf", disable_existing_loggers=True)
+logger = logging.getLogger("clouds")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sync pipeline run artifacts to S3, transferring only missing or changed files"
+    )
+    parser.add_argument(
+        "--config", default="config/config.yaml", help="Path to configuration file"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store identical files once across runs, keyed by content hash",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        try:
+            config = yaml.load(f, Loader=yaml.FullLoader)
+        except yaml.error.YAMLError as e:
+            logger.error("Error while loading configuration from %s", args.config)
+            raise NotImplementedError from e
+        else:
+            logger.info("Configuration file loaded from %s", args.config)
+
+    aws_config = dict(config["aws"])
+    if args.dedup:
+        aws_config["dedup"] = True
+
+    all_artifacts = Path(config["run_config"]["output"]["runs"])
+    uris = aws.sync_artifacts(
+        all_artifacts, aws_config, mf.artifact_stages(config), snap.open_blob_store(config)
+    )
+    logger.info("Sync complete, %s objects transferred", len(uris))
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from src.binning import Binner, bin_features, fit_binned, unbin
+from src.compare_models import train_candidates
+from src.telemetry import METRICS
+
+FEATURES = ["a", "b", "c"]
+
+
+def cache_hits():
+    series = METRICS.snapshot()["counters"].get("binned_cache_hits_total", [])
+    return sum(entry["value"] for entry in series)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(600, 3)), columns=FEATURES)
+    x["c"] = rng.integers(0, 4, size=600).astype(float)  # few distinct values
+    y = ((x["a"] + x["b"] * x["c"]) > 0.5).astype(int)
+    return x, y
+
+
+# Happy
+@pytest.mark.parametrize(
+    "model",
+    [
+        RandomForestClassifier(n_estimators=10, random_state=0),
+        ExtraTreesClassifier(n_estimators=10, random_state=0),
+        HistGradientBoostingClassifier(max_iter=20, early_stopping=False, random_state=0),
+    ],
+)
+def test_unbinned_model_scores_values_as_codes(data, model):
+    x, y = data
+    binner = Binner.fit(x, max_bins=16)
+    codes = binner.transform(x)
+    # Rows at the edges themselves are where an off-by-one would show
+    edges = pd.DataFrame({column: np.resize(e, 600) for column, e in zip(FEATURES, binner.edges)})
+    model.fit(codes, y)
+    expected = model.predict_proba(codes), model.predict_proba(binner.transform(edges))
+
+    unbin(model, binner)
+
+    np.testing.assert_array_equal(model.predict_proba(x), expected[0])
+    np.testing.assert_array_equal(model.predict_proba(edges), expected[1])
+
+
+def test_codes_are_cached(data, tmp_path):
+    x, _ = data
+    config = {"max_bins": 32, "subsample": None, "cache_dir": str(tmp_path)}
+    hits = cache_hits()
+
+    codes, binner = bin_features(x, config)
+    cached, cached_binner = bin_features(x, config)
+
+    assert (codes.dtypes == np.uint8).all()
+    assert codes["c"].nunique() == 4 and codes.max().max() < 32
+    assert cache_hits() == hits + 1
+    pd.testing.assert_frame_equal(cached, codes)
+    assert all(np.array_equal(a, b) for a, b in zip(cached_binner.edges, binner.edges))
+    assert len(list(tmp_path.iterdir())) == 1
+    bin_features(x.iloc[:500], config)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_candidates_share_codes(data, tmp_path):
+    x, y = data
+    train = x.assign(target=y)
+    config = {
+        "initial_features": FEATURES,
+        "target": "target",
+        "n_workers": 1,
+        "mode": "binned",
+        "binning": {"max_bins": 64, "subsample": None, "cache_dir": str(tmp_path)},
+        "candidates": [
+            {"name": "forest", "model_lib": "sklearn.ensemble", "type": "RandomForestClassifier",
+             "hyperparam": {"n_estimators": 5, "random_state": 0}},
+            {"name": "linear", "model_lib": "sklearn.linear_model", "type": "LogisticRegression"},
+        ],
+    }
+
+    models = train_candidates(train, config)
+
+    assert models["forest"].score(x, y) > 0.95
+    # Non-tree candidates are fitted on the feature values
+    np.testing.assert_allclose(models["linear"].coef_, LogisticRegression().fit(x, y).coef_)
+
+
+# Unhappy
+def test_unsupported_model(data):
+    x, y = data
+    with pytest.raises(NotImplementedError):
+        fit_binned(LogisticRegression(), x, y, {"max_bins": 16, "cache_dir": None})
+
+
+def test_max_bins_out_of_range(data):
+    x, _ = data
+    with pytest.raises(NotImplementedError):
+        Binner.fit(x, max_bins=256)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from src.calibrate_model import (
+    apply_calibrator,
+    calibrate_model,
+    fit_calibrator,
+    load_calibration,
+    optimize_threshold,
+    save_calibration,
+    threshold_metrics,
+)
+from src.score_model import score_model
+
+FEATURES = ["a", "b", "c"]
+
+
+@pytest.fixture
+def scored():
+    rng = np.random.default_rng(0)
+    prob = rng.uniform(size=500).round(2)
+    target = (rng.uniform(size=500) < prob**2).astype(int)
+    return target, prob
+
+
+# Happy
+def test_threshold_metrics_match_per_threshold_computation(scored):
+    target, prob = scored
+
+    curve = threshold_metrics(target, prob)
+
+    for i in (0, 10, len(curve["threshold"]) // 2, len(curve["threshold"]) - 1):
+        pred = (prob >= curve["threshold"][i]).astype(int)
+        assert curve["f1"][i] == pytest.approx(f1_score(target, pred))
+        assert curve["accuracy"][i] == pytest.approx(accuracy_score(target, pred))
+    assert len(curve["threshold"]) == len(np.unique(prob))
+
+
+def test_optimize_threshold_finds_best_cutoff(scored):
+    target, prob = scored
+
+    threshold, value = optimize_threshold(target, prob, "accuracy")
+
+    best = max(accuracy_score(target, prob >= t) for t in np.unique(prob))
+    assert value == pytest.approx(best)
+    assert accuracy_score(target, prob >= threshold) == pytest.approx(best)
+
+
+@pytest.mark.parametrize("method", ["isotonic", "platt"])
+def test_calibrator_reduces_brier_score(scored, method):
+    target, prob = scored
+
+    calibrator = fit_calibrator(prob, target, method)
+    calibrated = apply_calibrator(calibrator, prob)
+
+    assert ((calibrated - target) ** 2).mean() < ((prob - target) ** 2).mean()
+    assert np.all(np.diff(calibrated[np.argsort(prob)]) >= -1e-12)
+
+
+def test_calibration_round_trip_and_scoring(tmp_path):
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(rng.normal(size=(600, 3)), columns=FEATURES)
+    data["class"] = (data["a"] + rng.normal(size=600) > 0.5).astype(int)
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0)
+    model.fit(data[FEATURES].iloc[:400], data["class"].iloc[:400])
+    config = {"initial_features": FEATURES, "target": "class", "method": "isotonic", "metric": "f1"}
+
+    calibration = calibrate_model(data.iloc[400:], model, config)
+    save_calibration(calibration, tmp_path / "calibration.yaml")
+    loaded = load_calibration(tmp_path / "calibration.yaml")
+    prob, classes = score_model(data.iloc[400:], model, {"initial_features": FEATURES}, loaded)
+
+    assert loaded == calibration
+    np.testing.assert_array_equal(classes, (prob >= calibration["threshold"]).astype(int))
+
+
+# Unhappy
+def test_unknown_calibration_method(scored):
+    target, prob = scored
+    with pytest.raises(NotImplementedError):
+        fit_calibrator(prob, target, "beta")
+
+
+def test_unknown_threshold_metric(scored):
+    target, prob = scored
+    with pytest.raises(NotImplementedError):
+        optimize_threshold(target, prob, "tp")
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.compact_dataset import from_arrays, from_frame, float32_permits
+from src.generate_features import generate_features
+
+CONFIG = {
+    "feature_col": ["A", "B"],
+    "target_col": "class",
+    "feature_eng": [
+        {"target": "D", "operation": "multiply", "source1": "A", "source2": "B"},
+        {"target": "E", "operation": "apply", "source1": "A", "function": "log"},
+        {
+            "target": "F",
+            "operation": "divide",
+            "source1": {"operation": "subtract", "source1": "B", "source2": "A"},
+            "source2": "B",
+        },
+    ],
+}
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"A": [1.0, 2.0, 3.0], "B": [4.0, 5.0, 6.0], "class": [0.0, 1.0, 1.0]})
+
+
+# Happy
+def test_compact_dtypes_and_layout(frame):
+    data = from_frame(frame, ["A", "B"], "class", reserve=3)
+
+    assert data.buffer.dtype == np.float32
+    assert data.labels.dtype == np.uint8
+    assert data.buffer.flags["F_CONTIGUOUS"]
+    assert data.values.shape == (3, 2)
+    assert np.shares_memory(data.column("B"), data.buffer)
+
+
+def test_select_contiguous_is_view(frame):
+    data = from_frame(frame, ["A", "B"], "class")
+
+    assert np.shares_memory(data.select(["A", "B"]), data.buffer)
+    assert not np.shares_memory(data.select(["B", "A"]), data.buffer)
+
+
+def test_generate_features_compact_in_place(frame):
+    data = from_frame(frame, ["A", "B"], "class", reserve=3)
+    buffer = data.buffer
+
+    result = generate_features(data, CONFIG)
+
+    assert result.buffer is buffer
+    expected = generate_features(frame, CONFIG)
+    for col in ["D", "E", "F"]:
+        np.testing.assert_allclose(result.column(col), expected[col], rtol=1e-6)
+
+
+def test_generate_features_compact_grows_without_reserve(frame):
+    data = from_frame(frame, ["A", "B"], "class")
+
+    result = generate_features(data, CONFIG)
+
+    assert list(result.columns) == ["A", "B", "D", "E", "F"]
+
+
+def test_to_frame_roundtrip(frame):
+    data = from_frame(frame, ["A", "B"], "class")
+
+    out = data.to_frame()
+
+    assert list(out.columns) == ["A", "B", "class"]
+    np.testing.assert_array_equal(out["class"], [0, 1, 1])
+
+
+def test_float32_keeps_the_raw_decimals():
+    # Raw clouds values reach ~3200 with 4 decimals
+    values = np.array([[3183.1234, 0.0216], [1016.4583, 4.013]])
+
+    assert float32_permits(values, decimals=3)
+    assert not float32_permits(values[:, :1], decimals=4)
+    assert float32_permits(values[1:], decimals=4)
+    assert from_arrays(values, ["A", "B"], np.zeros(2), decimals=4).buffer.dtype == np.float64
+    assert from_arrays(values, ["A", "B"], np.zeros(2), decimals=3).buffer.dtype == np.float32
+
+
+def test_float64_kept_when_out_of_range():
+    values = np.array([[1e300], [2.0]])
+
+    assert not float32_permits(values)
+    assert from_arrays(values, ["A"], np.zeros(2)).buffer.dtype == np.float64
+
+
+# Unhappy
+def test_compact_invalid_operation(frame):
+    data = from_frame(frame, ["A", "B"], "class", reserve=1)
+    config = dict(CONFIG, feature_eng=[{"target": "D", "operation": "bad", "source1": "A"}])
+
+    with pytest.raises(NotImplementedError):
+        generate_features(data, config)
+    assert "D" not in data.columns
+
+
+def test_compact_missing_feature_col(frame):
+    data = from_frame(frame, ["A"], "class")
+
+    with pytest.raises(KeyError):
+        generate_features(data, CONFIG)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from src.compare_models import compare_models, save_candidates, threads_per_model, train_candidates
+from src.resources import available_cores
+
+FEATURES = ["a", "b"]
+EVAL_CONFIG = {
+    "target": "class",
+    "metrics_lib": "sklearn.metrics",
+    "metrics": ["roc_auc_score", "accuracy_score", "confusion_matrix"],
+}
+CONFIG = {
+    "initial_features": FEATURES,
+    "target": "class",
+    "n_workers": 2,
+    "threads_per_model": None,
+    "rank_by": "roc_auc_score",
+    "candidates": [
+        {
+            "name": "forest",
+            "model_lib": "sklearn.ensemble",
+            "type": "RandomForestClassifier",
+            "hyperparam": {"n_estimators": 20, "max_depth": 4, "random_state": 0},
+        },
+        {
+            "name": "stump",
+            "model_lib": "sklearn.tree",
+            "type": "DecisionTreeClassifier",
+            "hyperparam": {"max_depth": 1, "random_state": 0},
+        },
+    ],
+}
+
+
+@pytest.fixture
+def split():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(size=(400, 2)), columns=FEATURES)
+    data["class"] = ((data["a"] * data["b"]) > 0).astype(int)
+    return data.iloc[:300], data.iloc[300:]
+
+
+# Happy
+def test_threads_per_model_fit_on_the_cores():
+    cores = available_cores()
+    assert threads_per_model(1) == cores
+    assert threads_per_model(cores * 2) == 1
+    assert threads_per_model(1, threads=1) == 1
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_candidates_are_trained_and_ranked(split, n_workers):
+    train, test = split
+
+    models = train_candidates(train, dict(CONFIG, n_workers=n_workers))
+    comparison = compare_models(models, test, CONFIG, EVAL_CONFIG)
+
+    assert list(models) == ["forest", "stump"]
+    assert list(comparison["model"]) == ["forest", "stump"]
+    assert list(comparison["rank"]) == [1, 2]
+    assert "confusion_matrix" not in comparison.columns
+    assert comparison["roc_auc_score"].is_monotonic_decreasing
+
+
+def test_save_candidates_writes_models_and_registry(split, tmp_path):
+    train, test = split
+    models = train_candidates(train, dict(CONFIG, n_workers=1))
+    comparison = compare_models(models, test, CONFIG, EVAL_CONFIG)
+
+    save_candidates(models, comparison, CONFIG, tmp_path, tmp_path)
+
+    assert (tmp_path / "forest.pkl").exists() and (tmp_path / "stump.pkl").exists()
+    with open(tmp_path / "registry.yaml") as file:
+        registry = yaml.safe_load(file)
+    assert list(registry) == ["forest", "stump"]
+    assert registry["forest"] == [{"name": "forest.pkl"}, {"features": FEATURES}]
+
+
+# Unhappy
+def test_unknown_model_type(split):
+    train, _ = split
+    spec = {"name": "x", "model_lib": "sklearn.tree", "type": "Nope"}
+    config = dict(CONFIG, n_workers=1, candidates=[spec])
+    with pytest.raises(NotImplementedError):
+        train_candidates(train, config)
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from src.explain_model import AttributionCache, explain_model, is_explainable, tree_path_attributions
+
+FEATURES = ["a", "b", "c"]
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(400, 3)), columns=FEATURES)
+    y = (x["a"] - x["b"] > 0).astype(int)
+    return x, y
+
+
+# Happy
+def test_single_tree_attributions_add_up(data):
+    x, y = data
+    model = DecisionTreeClassifier(max_depth=5, random_state=0).fit(x, y)
+
+    bias, contributions = tree_path_attributions(model, x.to_numpy())
+
+    np.testing.assert_allclose(
+        bias + contributions.sum(axis=1), model.predict_proba(x)[:, 1], atol=1e-12
+    )
+
+
+def test_explain_model_matches_forest_probability(data):
+    x, y = data
+    model = RandomForestClassifier(n_estimators=5, max_depth=5, random_state=0).fit(x, y)
+    config = {"initial_features": FEATURES, "chunk_size": 100, "n_workers": 1}
+
+    explanations = explain_model(x, model, config)
+
+    assert list(explanations.columns) == ["bias"] + FEATURES
+    assert explanations.index.equals(x.index)
+    np.testing.assert_allclose(
+        explanations.sum(axis=1), model.predict_proba(x)[:, 1], atol=1e-12
+    )
+
+
+def test_parallel_matches_serial(data):
+    x, y = data
+    model = RandomForestClassifier(n_estimators=5, max_depth=5, random_state=0).fit(x, y)
+    config = {"initial_features": FEATURES, "chunk_size": 50, "n_workers": 1}
+    serial = explain_model(x, model, config)
+
+    parallel = explain_model(x, model, dict(config, n_workers=2))
+
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_repeated_rows_served_from_cache(data):
+    x, y = data
+    model = RandomForestClassifier(n_estimators=5, max_depth=5, random_state=0).fit(x, y)
+    config = {"initial_features": FEATURES, "chunk_size": 100, "n_workers": 1}
+    cache = AttributionCache(maxsize=1000)
+    first = explain_model(x.iloc[:10], model, config, cache)
+
+    second = explain_model(pd.concat([x.iloc[:10], x.iloc[:10]]), model, config, cache)
+
+    assert cache.hits == 10
+    np.testing.assert_allclose(second.iloc[10:].to_numpy(), first.to_numpy())
+
+
+def test_cache_evicts_least_recently_used():
+    cache = AttributionCache(maxsize=2)
+    cache.put(b"a", np.zeros(1))
+    cache.put(b"b", np.zeros(1))
+    cache.get(b"a")
+    cache.put(b"c", np.zeros(1))
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None
+
+
+# Unhappy
+def test_non_tree_model(data):
+    x, y = data
+    model = LogisticRegression().fit(x, y)
+
+    with pytest.raises(NotImplementedError):
+        tree_path_attributions(model, x.to_numpy())
+
+
+@pytest.mark.parametrize(
+    "model", [GradientBoostingClassifier(n_estimators=5), HistGradientBoostingClassifier(max_iter=5)]
+)
+def test_boosted_models_are_not_explained(data, model):
+    x, y = data
+    model.fit(x, y)
+
+    assert not is_explainable(model)
+    with pytest.raises(NotImplementedError):
+        tree_path_attributions(model, x.to_numpy())
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from sklearn.ensemble import RandomForestClassifier
+from src.export_model import check_parity, export_model, feature_spec, save_export
+
+pytest.importorskip("skl2onnx")
+pytest.importorskip("onnxruntime")
+
+FEATURES = ["a", "b", "c"]
+
+
+@pytest.fixture
+def fitted():
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(400, 3)), columns=FEATURES)
+    y = (x["a"] - x["b"] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(x, y)
+    config = {"initial_features": FEATURES, "target_opset": None, "parity_atol": 1e-5}
+    return x, model, config
+
+
+# Happy
+def test_exported_model_matches_sklearn(fitted, tmp_path):
+    x, model, config = fitted
+    save_export(
+        export_model(model, config),
+        feature_spec(model, config),
+        tmp_path / "model.onnx",
+        tmp_path / "spec.yaml",
+    )
+
+    max_diff = check_parity(model, tmp_path / "model.onnx", x, config)
+
+    assert max_diff <= config["parity_atol"]
+    with open(tmp_path / "spec.yaml") as file:
+        spec = yaml.safe_load(file)
+    assert spec["features"] == FEATURES
+    assert spec["classes"] == [0, 1]
+
+
+# Unhappy
+def test_parity_mismatch_raises(fitted, tmp_path):
+    x, model, config = fitted
+    save_export(
+        export_model(model, config),
+        feature_spec(model, config),
+        tmp_path / "model.onnx",
+        tmp_path / "spec.yaml",
+    )
+    other = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=1).fit(
+        x, (x["c"] > 0).astype(int)
+    )
+
+    with pytest.raises(NotImplementedError):
+        check_parity(other, tmp_path / "model.onnx", x, config)
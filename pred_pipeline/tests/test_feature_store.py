@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.feature_store import FeatureStore, data_digest, spec_version
+
+SPEC = {
+    "feature_col": ["a", "b"],
+    "target_col": "class",
+    "feature_eng": [{"operation": "multiply", "source1": "a", "source2": "b", "target": "a_x_b"}],
+}
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(1000, 2)), columns=["a", "b"], index=rng.permutation(5000)[:1000])
+    frame["class"] = (frame["a"] > 0).astype(float)
+    frame["a_x_b"] = frame["a"] * frame["b"]
+    return frame
+
+
+@pytest.fixture
+def store(tmp_path, features):
+    store = FeatureStore(tmp_path, row_group_size=64)
+    store.write("clouds", spec_version(SPEC), features, SPEC, data_digest(features))
+    return store
+
+
+# Happy
+def test_version_follows_the_spec():
+    changed = dict(SPEC, feature_eng=[dict(SPEC["feature_eng"][0], operation="divide")])
+    assert spec_version(SPEC) == spec_version(dict(reversed(list(SPEC.items()))))
+    assert spec_version(SPEC) != spec_version(changed)
+
+
+def test_read_round_trips(store, features):
+    version = spec_version(SPEC)
+    assert store.has("clouds", version, data_digest(features))
+    assert not store.has("clouds", version, data_digest(features.iloc[:10]))
+    pd.testing.assert_frame_equal(
+        store.read("clouds", version).rename_axis(None), features.sort_index(), check_freq=False
+    )
+    assert store.describe("clouds", version)["stats"]["a"]["max"] == features["a"].max()
+
+
+def test_point_lookup_reads_only_needed_groups(store, features, monkeypatch):
+    import pyarrow.parquet as pq
+
+    read_groups = []
+    original = pq.ParquetFile.read_row_groups
+    monkeypatch.setattr(
+        pq.ParquetFile,
+        "read_row_groups",
+        lambda self, groups, **kw: read_groups.append(groups) or original(self, groups, **kw),
+    )
+    keys = features.index[[5, 500, 17]].to_numpy()
+
+    rows = store.lookup("clouds", spec_version(SPEC), np.r_[keys, -1], columns=["a_x_b"])
+
+    assert list(rows.index) == list(keys)
+    np.testing.assert_array_equal(rows["a_x_b"], features.loc[keys, "a_x_b"])
+    assert len(read_groups[0]) <= 3
+
+
+def test_range_lookup(store, features):
+    rows = store.range("clouds", spec_version(SPEC), 1000, 2000)
+    expected = features[(features.index >= 1000) & (features.index <= 2000)].sort_index()
+
+    np.testing.assert_array_equal(rows.index, expected.index)
+    assert len(store.range("clouds", spec_version(SPEC), 6000, 7000)) == 0
+
+
+def test_source_follows_the_validation(features):
+    schema = {"features": {"a_x_b": {"max": 1}}, "action": "quarantine"}
+
+    assert data_digest(features, schema) != data_digest(features)
+    assert data_digest(features, schema) != data_digest(features, dict(schema, action="warn"))
+
+
+# Unhappy
+def test_missing_version_raises(store):
+    with pytest.raises(NotImplementedError):
+        store.lookup("clouds", "0" * 16, [1])
+
+
+def test_duplicate_keys_raise(tmp_path, features):
+    with pytest.raises(NotImplementedError):
+        FeatureStore(tmp_path).write("clouds", "v", pd.concat([features, features]), SPEC, "x")
@@ -0,0 +1,142 @@
+import json
+import pytest
+import yaml
+from src.gate import compare_runs, find_baseline, load_run, record_paths, record_stage, run_gate
+from src.manifest import MANIFEST_NAME, build_manifest, save_manifest
+from src.snapshot import BlobStore, snapshot_run
+from tests.test_manifest import STAGES
+
+CONFIG = {
+    "evaluate_performance": {"metric_dir": "performance"},
+    "telemetry": {"metrics_file": "telemetry/metrics.json"},
+    "gate": {
+        "baseline": "previous",
+        "gate_dir": "gate",
+        "metrics": {"roc_auc_score": {"max_drop": 0.01}, "log_loss": {"max_rise": 0.05}},
+        "seconds": {"relative": 0.5, "absolute": 1.0},
+        "peak_rss_mib": {"relative": 0.25, "absolute": 10},
+        "ignore_stages": ["upload"],
+    },
+}
+
+
+def make_run(runs, name, metrics, stages):
+    run = runs / name
+    (run / "performance").mkdir(parents=True)
+    (run / "performance" / "metrics.yaml").write_text(yaml.safe_dump(metrics))
+    for stage, (seconds, peak_mib) in stages.items():
+        record_stage(run / "gate" / "stage_stats.yaml", stage, seconds, peak_mib * 2**20)
+    return run
+
+
+@pytest.fixture
+def runs(tmp_path):
+    make_run(
+        tmp_path,
+        "99",
+        {"roc_auc_score": 0.95, "log_loss": 0.2, "confusion_matrix": [[1, 0], [0, 1]]},
+        {"train_model": (10.0, 400), "score_model": (1.0, 100), "upload": (5.0, 50)},
+    )
+    return tmp_path
+
+
+# Happy
+def test_stage_stats_are_merged(runs):
+    record_stage(runs / "99" / "gate" / "stage_stats.yaml", "score_model", 1.5, None)
+
+    run = load_run(runs / "99", CONFIG)
+    assert run["metrics"] == {"roc_auc_score": 0.95, "log_loss": 0.2}
+    assert run["seconds"] == {"train_model": 10.0, "score_model": 1.5, "upload": 5.0}
+    assert run["peak_rss_mib"] == {"train_model": 400.0, "upload": 50.0}
+
+
+def test_within_tolerance_passes(runs):
+    make_run(
+        runs,
+        "100",
+        {"roc_auc_score": 0.945, "log_loss": 0.24},
+        # score_model grows by the absolute allowance, upload is ignored
+        {"train_model": (14.0, 450), "score_model": (2.0, 110), "upload": (50.0, 50)},
+    )
+
+    report = run_gate(runs / "100", find_baseline("previous", runs / "100", runs, CONFIG), CONFIG)
+
+    assert report["baseline"] == "99" and report["passed"]
+    assert report["checks"]["seconds"]["train_model"] == {
+        "baseline": 10.0, "current": 14.0, "limit": 15.0, "passed": True
+    }
+    assert "upload" not in report["checks"]["seconds"]
+    assert yaml.safe_load((runs / "100" / "gate" / "gate_report.yaml").read_text()) == report
+
+
+def test_regressions_are_reported(runs):
+    make_run(
+        runs,
+        "100",
+        {"roc_auc_score": 0.93, "log_loss": 0.3},
+        {"train_model": (16.0, 520), "score_model": (1.0, 100), "stream_score": (3.0, 90)},
+    )
+
+    result = compare_runs(load_run(runs / "100", CONFIG), load_run(runs / "99", CONFIG), CONFIG["gate"])
+
+    assert result["regressions"] == [
+        "metrics.roc_auc_score",
+        "metrics.log_loss",
+        "seconds.train_model",
+        "peak_rss_mib.train_model",
+    ]
+    assert result["missing"] == ["seconds.stream_score", "peak_rss_mib.stream_score"]
+
+
+def test_baseline_selection(runs):
+    make_run(runs, "100", {"roc_auc_score": 0.9}, {})
+    (runs / "150").mkdir()  # no metrics: never a baseline
+    make_run(runs, "200", {"roc_auc_score": 0.9}, {})
+
+    assert find_baseline("previous", runs / "200", runs, CONFIG).name == "100"
+    assert find_baseline("previous", runs / "100", runs, CONFIG).name == "99"
+    assert find_baseline("previous", runs / "99", runs, CONFIG) is None
+    assert find_baseline("99", runs / "200", runs, CONFIG).name == "99"
+    assert find_baseline(None, runs / "200", runs, CONFIG) is None
+
+
+def test_failed_runs_are_skipped_as_previous(runs):
+    make_run(runs, "100", {"roc_auc_score": 0.8, "log_loss": 0.2}, {})
+    assert not run_gate(runs / "100", find_baseline("previous", runs / "100", runs, CONFIG), CONFIG)["passed"]
+    make_run(runs, "200", {"roc_auc_score": 0.95, "log_loss": 0.2}, {})
+
+    assert find_baseline("previous", runs / "200", runs, CONFIG).name == "99"
+    assert find_baseline("100", runs / "200", runs, CONFIG).name == "100"
+
+
+def test_manifest_snapshot_stays_a_baseline(runs):
+    (runs / "99" / "model.pkl").write_bytes(b"model")
+    save_manifest(build_manifest(runs / "99", STAGES), runs / "99" / MANIFEST_NAME)
+    before = load_run(runs / "99", CONFIG)
+    snapshot_run(runs / "99", BlobStore(runs / "blobs"), "manifest", record_paths(CONFIG))
+    make_run(runs, "100", {"roc_auc_score": 0.9}, {})
+
+    assert not (runs / "99" / "model.pkl").exists()
+    assert find_baseline("previous", runs / "100", runs, CONFIG).name == "99"
+    assert load_run(runs / "99", CONFIG) == before
+
+
+def test_timings_from_telemetry_of_older_runs(tmp_path):
+    (tmp_path / "telemetry").mkdir()
+    snapshot = {"histograms": {"pipeline_stage_seconds": [{"labels": {"stage": "train_model"}, "sum": 3.5}]}}
+    (tmp_path / "telemetry" / "metrics.json").write_text(json.dumps(snapshot))
+
+    run = load_run(tmp_path, CONFIG)
+    assert run == {"metrics": {}, "seconds": {"train_model": 3.5}, "peak_rss_mib": {}}
+
+
+# Unhappy
+def test_no_baseline_passes(runs):
+    report = run_gate(runs / "99", None, CONFIG)
+
+    assert report == {"run": "99", "baseline": None, "passed": True}
+
+
+def test_unknown_baseline(runs):
+    with pytest.raises(NotImplementedError):
+        find_baseline("12345", runs / "99", runs, CONFIG)
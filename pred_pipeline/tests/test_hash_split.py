@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.compact_dataset import from_frame
+from src.hash_split import CALIBRATION, TEST, TRAIN, assign_split, row_keys, splitmix64
+from src.sample_data import sample_data
+from src.train_model import train_model
+
+CONFIG = {
+    "initial_features": ["a", "b"],
+    "target": "class",
+    "train_test_split": {
+        "method": "hash",
+        "key": "index",
+        "seed": 42,
+        "stratify": True,
+        "test_size": 0.4,
+        "calibration_size": 0.25,
+    },
+    "model_config": {
+        "type": "LogisticRegression",
+        "model_lib": "sklearn.linear_model",
+        "hyperparam": {},
+    },
+}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(5000, 2)), columns=["a", "b"])
+    frame["class"] = (rng.uniform(size=5000) < 0.2).astype(float)
+    return frame
+
+
+# Happy
+def test_splitmix64_reference_values():
+    # First outputs of the SplitMix64 generator seeded with 0
+    state = np.arange(3, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    np.testing.assert_array_equal(
+        splitmix64(state),
+        np.array([0xE220A8397B1DCDAF, 0x6E789E6AA1B965F4, 0x06C45D188009454F], dtype=np.uint64),
+    )
+
+
+def test_split_shares_per_class(data):
+    labels = data["class"].to_numpy()
+    split = assign_split(row_keys(data), 0.4, 0.25, seed=1, labels=labels)
+
+    for label in (0.0, 1.0):
+        in_class = split[labels == label]
+        assert abs(np.mean(in_class == TEST) - 0.4) < 0.05
+        assert abs(np.mean(in_class == CALIBRATION) - 0.15) < 0.05
+
+
+def test_split_is_the_same_in_chunks_and_as_data_grows(data):
+    whole = assign_split(row_keys(data), 0.4, seed=3)
+    chunked = np.concatenate(
+        [assign_split(row_keys(data.iloc[i : i + 700]), 0.4, seed=3) for i in range(0, 5000, 700)]
+    )
+    grown = pd.concat([data, data.iloc[:100].set_axis(range(5000, 5100))])
+
+    np.testing.assert_array_equal(whole, chunked)
+    np.testing.assert_array_equal(assign_split(row_keys(grown), 0.4, seed=3)[:5000], whole)
+    assert not np.array_equal(assign_split(row_keys(data), 0.4, seed=4), whole)
+
+
+def test_column_key_matches_float32_copy(data):
+    # Raw values reach ~3200 and carry 4 decimals
+    data[["a", "b"]] = (data[["a", "b"]] * 800 + 1600).round(4)
+    keys = row_keys(data, ["a", "b"])
+    compact = from_frame(data, ["a", "b"], "class")
+
+    assert compact.buffer.dtype == np.float32
+    np.testing.assert_array_equal(row_keys(compact.to_frame(with_target=False), ["a", "b"]), keys)
+    assert len(np.unique(keys)) == len(data)
+
+
+def test_train_model_hash_split_is_reproducible(data):
+    _, train, test, calibration = train_model(data, CONFIG)
+    _, train_again, _, _ = train_model(data, CONFIG)
+
+    assert train.index.equals(train_again.index)
+    assert len(train) + len(test) + len(calibration) == len(data)
+    assert not train.index.isin(test.index).any()
+
+
+def test_compact_split_matches_frame_split_after_sampling(data):
+    sampling = {"method": "stratified", "strat_col": "class", "size": 0.3, "seed": 1}
+    frame_sample, _ = sample_data(data, sampling)
+    compact_sample, _ = sample_data(from_frame(data, ["a", "b"], "class"), sampling)
+
+    _, train, test, calibration = train_model(frame_sample, CONFIG)
+    _, compact_train, compact_test, compact_calibration = train_model(compact_sample, CONFIG)
+
+    assert compact_train.index.equals(train.index)
+    assert compact_test.index.equals(test.index)
+    assert compact_calibration.index.equals(calibration.index)
+    assert (compact_test["class"].to_numpy() == test["class"].to_numpy()).all()
+
+
+def test_random_split_with_random_state(data):
+    config = dict(CONFIG, train_test_split=dict(CONFIG["train_test_split"], method="random", random_state=0))
+    _, train, test, _ = train_model(data, config)
+    _, train_again, _, _ = train_model(data, config)
+
+    assert train.index.equals(train_again.index)
+    assert abs(test["class"].mean() - data["class"].mean()) < 0.01
+
+
+# Unhappy
+def test_unknown_key_raises(data):
+    with pytest.raises(NotImplementedError):
+        row_keys(data, "row_id")
@@ -0,0 +1,116 @@
+import io
+from unittest.mock import patch
+import pytest
+from botocore.exceptions import ClientError
+from src.manifest import artifact_stages, build_manifest, diff_manifests, save_manifest, MANIFEST_NAME
+from src.aws_utils import sync_artifacts
+
+STAGES = {"data/raw": "acquire_data", "performance": "evaluate_performance"}
+
+
+class FakeS3:
+    """Minimal in-memory stand-in for the boto3 S3 client"""
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = []
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def put_object(self, Bucket, Key, Body):
+        data = Body if isinstance(Body, bytes) else Body.read()
+        self.objects[Key] = data
+        self.puts.append(Key)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def get_paginator(self, name):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = [k for k in fake.objects if k.startswith(Prefix)]
+                return [{"Contents": [{"Key": k} for k in keys]}]
+
+        return Paginator()
+
+
+@pytest.fixture
+def runs(tmp_path):
+    for run in ("100", "200"):
+        (tmp_path / run / "data" / "raw").mkdir(parents=True)
+        (tmp_path / run / "performance").mkdir()
+        (tmp_path / run / "data" / "raw" / "clouds.data").write_text("same raw bytes")
+        (tmp_path / run / "performance" / "metrics.yaml").write_text(f"run: {run}")
+    return tmp_path
+
+
+# Happy
+def test_build_manifest(runs):
+    manifest = build_manifest(runs / "100", STAGES)
+
+    assert manifest["run"] == "100"
+    entry = manifest["artifacts"]["data/raw/clouds.data"]
+    assert entry["size"] == len("same raw bytes")
+    assert entry["stage"] == "acquire_data"
+    assert manifest["artifacts"]["performance/metrics.yaml"]["stage"] == "evaluate_performance"
+
+
+def test_build_manifest_skips_itself(runs):
+    save_manifest(build_manifest(runs / "100", STAGES), runs / "100" / MANIFEST_NAME)
+
+    assert MANIFEST_NAME not in build_manifest(runs / "100", STAGES)["artifacts"]
+
+
+def test_telemetry_files_are_manifested():
+    config = {
+        "run_config": {"data_dir": {"raw": "data/raw", "processed": "data"}, "figure_dir": "figures"},
+        "train_model": {"data_dir": "data_for_model", "model_dir": "model_artifacts"},
+        "score_model": {"score_dir": "scores"},
+        "evaluate_performance": {"metric_dir": "performance"},
+        "telemetry": {"metrics_file": "telemetry/metrics.json"},
+    }
+
+    stages = artifact_stages(config)
+
+    assert stages["telemetry/metrics.json"] == "pipeline"
+    assert stages["telemetry/metrics.prom"] == "pipeline"
+
+
+def test_diff_manifests():
+    local = {"artifacts": {"a": {"sha256": "1"}, "b": {"sha256": "2"}, "c": {"sha256": "3"}}}
+    remote = {"artifacts": {"a": {"sha256": "1"}, "b": {"sha256": "old"}}}
+
+    assert diff_manifests(local, remote) == ["b", "c"]
+    assert diff_manifests(local, None) == ["a", "b", "c"]
+
+
+def test_sync_only_transfers_changes(runs):
+    s3 = FakeS3()
+    config = {"bucket_name": "bucket", "prefix": "artifacts"}
+    with patch("boto3.client", return_value=s3):
+        first = sync_artifacts(runs, config, STAGES)
+        second = sync_artifacts(runs, config, STAGES)
+        (runs / "200" / "performance" / "metrics.yaml").write_text("changed")
+        (runs / "200" / MANIFEST_NAME).unlink()
+        third = sync_artifacts(runs, config, STAGES)
+
+    assert len(first) == 4
+    assert second == []
+    assert third == ["s3://bucket/artifacts/200/performance/metrics.yaml"]
+
+
+def test_sync_dedup_uploads_identical_blobs_once(runs):
+    s3 = FakeS3()
+    config = {"bucket_name": "bucket", "prefix": "artifacts", "dedup": True}
+    with patch("boto3.client", return_value=s3):
+        uris = sync_artifacts(runs, config, STAGES)
+
+    # Two runs share the raw file, so three distinct blobs are stored
+    assert len(uris) == 3
+    assert all(uri.startswith("s3://bucket/artifacts/blobs/") for uri in uris)
+    assert "artifacts/100/manifest.yaml" in s3.objects
@@ -0,0 +1,55 @@
+import yaml
+from src.metrics_index import best_runs, config_hash, index_runs, metric_trend, record_run
+
+CONFIG = {"train_model": {"model_config": {"hyperparam": {"n_estimators": 10}}}}
+
+
+# Happy
+def test_best_runs_ranked_by_metric(tmp_path):
+    index = tmp_path / "index.sqlite"
+    record_run(index, "100", CONFIG, {"accuracy_score": 0.8})
+    record_run(index, "200", CONFIG, {"accuracy_score": 0.9})
+    record_run(index, "300", CONFIG, {"accuracy_score": 0.7})
+
+    best = best_runs(index, "accuracy_score", limit=2)
+
+    assert [row["run_id"] for row in best] == ["200", "100"]
+    assert best[0]["hyperparams"] == {"n_estimators": 10}
+    assert best[0]["config_hash"] == config_hash(CONFIG)
+
+
+def test_non_scalar_metrics_not_ranked(tmp_path):
+    index = tmp_path / "index.sqlite"
+    record_run(index, "100", CONFIG, {"confusion_matrix": [[1, 0], [0, 1]], "report": "text"})
+
+    assert best_runs(index, "confusion_matrix") == []
+
+
+def test_metric_and_stage_trend(tmp_path):
+    index = tmp_path / "index.sqlite"
+    for run_id, value in [("300", 0.7), ("100", 0.8), ("200", 0.9)]:
+        record_run(index, run_id, CONFIG, {"accuracy_score": value}, {"train_model": value * 10})
+
+    assert metric_trend(index, "accuracy_score") == [("100", 0.8), ("200", 0.9), ("300", 0.7)]
+    assert metric_trend(index, "stage:train_model", last=1) == [("300", 7.0)]
+
+
+def test_record_run_replaces_existing(tmp_path):
+    index = tmp_path / "index.sqlite"
+    record_run(index, "100", CONFIG, {"accuracy_score": 0.8})
+    record_run(index, "100", CONFIG, {"accuracy_score": 0.95})
+
+    assert metric_trend(index, "accuracy_score") == [("100", 0.95)]
+
+
+def test_index_runs_backfills_from_yaml(tmp_path):
+    run_dir = tmp_path / "runs" / "100"
+    (run_dir / "performance").mkdir(parents=True)
+    (run_dir / "performance" / "metrics.yaml").write_text(yaml.dump({"accuracy_score": 0.5}))
+    (run_dir / "config.yaml").write_text(yaml.dump(CONFIG))
+    (tmp_path / "runs" / "incomplete").mkdir()
+
+    count = index_runs(tmp_path / "index.sqlite", tmp_path / "runs", "performance/metrics.yaml")
+
+    assert count == 1
+    assert best_runs(tmp_path / "index.sqlite", "accuracy_score")[0]["run_id"] == "100"
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.monitor_drift import (
+    build_sketch,
+    check_drift,
+    compare_sketches,
+    merge_sketches,
+    quantile,
+    update_sketch,
+)
+
+CONFIG = {"psi_threshold": 0.2, "ks_threshold": 0.1}
+
+
+@pytest.fixture
+def reference():
+    return np.random.default_rng(0).normal(size=5000)
+
+
+# Happy
+def test_merged_sketch_matches_full_sketch(reference):
+    sketch = build_sketch(reference, bins=10)
+    first = update_sketch(sketch, reference[:2000])
+    second = update_sketch(sketch, reference[2000:])
+
+    merged = merge_sketches(first, second)
+
+    assert merged["counts"] == sketch["counts"]
+    assert merged["moments"]["count"] == 5000
+    assert np.isclose(merged["moments"]["mean"], reference.mean())
+    assert np.isclose(merged["moments"]["m2"], sketch["moments"]["m2"])
+
+
+def test_quantile_estimate(reference):
+    sketch = build_sketch(reference, bins=20)
+
+    assert abs(quantile(sketch, 0.5) - np.median(reference)) < 0.05
+    assert quantile(sketch, 0.0) == reference.min()
+    assert quantile(sketch, 1.0) == reference.max()
+
+
+def test_same_distribution_no_drift(reference):
+    sketch = build_sketch(reference, bins=10)
+    batch = np.random.default_rng(1).normal(size=2000)
+
+    stats = compare_sketches(sketch, update_sketch(sketch, batch))
+
+    assert stats["psi"] < 0.05
+    assert stats["ks"] < 0.05
+
+
+def test_check_drift_flags_shifted_feature(reference):
+    sketches = {"a": build_sketch(reference), "b": build_sketch(reference)}
+    batch = pd.DataFrame({"a": reference[:1000], "b": reference[:1000] + 2})
+
+    report = check_drift(sketches, batch, CONFIG)
+
+    assert report["a"]["drift"] is False
+    assert report["b"]["drift"] is True
+    assert report["b"]["mean_shift"] == pytest.approx(2, abs=0.1)
+
+
+def test_non_finite_values_counted(reference):
+    sketch = build_sketch(reference)
+    batch = np.array([0.0, np.nan, -np.inf, 1.0])
+
+    stats = compare_sketches(sketch, update_sketch(sketch, batch))
+
+    assert stats["non_finite_share"] == 0.5
+
+
+# Unhappy
+def test_merge_different_bins(reference):
+    with pytest.raises(ValueError):
+        merge_sketches(build_sketch(reference, bins=10), build_sketch(reference, bins=5))
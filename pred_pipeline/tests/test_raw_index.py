@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from src import raw_index as ri
+from src.create_dataset import create_dataset
+
+RAW = """Subject: clouds
+Date: 3 Aug 1989
+
+;;;;;;;;;;;;;;;;;;;;
+;;; CLOUD COVER DB #1
+;;;;;;;;;;;;;;;;;;;;
+
+    3.0000  140.0000   43.5000
+    3.0000  135.0000   41.9063
+    2.0000  126.0000   21.0586
+
+;;;;;;;;;;;;;;;;;;;;
+;;; CLOUD COVER DB #2
+;;;;;;;;;;;;;;;;;;;;
+
+    4.7150  100.8120  -27.0538
+    4.7150   84.9033   20.1752
+;;; END OF DBS
+"""
+
+CONFIG = {
+    "data": {"columns": ["a", "b", "c"]},
+    "data_prep": {
+        "reader": "index",
+        "index_dir": None,
+        "first_cloud": {"block": 0, "left": 7, "right": 10},
+        "second_cloud": {"block": "DB #2", "left": 15, "right": 17},
+    },
+}
+
+
+@pytest.fixture
+def raw(tmp_path):
+    path = tmp_path / "clouds.data"
+    path.write_text(RAW)
+    return path
+
+
+# Happy
+def test_scan_finds_blocks_and_headers(raw):
+    blocks = ri.scan_blocks(raw)
+
+    assert [b["header"] for b in blocks] == ["CLOUD COVER DB #1", "CLOUD COVER DB #2"]
+    assert [(b["line"], b["rows"], b["min_cols"]) for b in blocks] == [(7, 3, 3), (15, 2, 3)]
+    np.testing.assert_array_equal(ri.read_block(raw, blocks[1])[:, 2], [-27.0538, 20.1752])
+
+
+def test_saved_index_skips_the_scan(raw, monkeypatch):
+    ri.load_index(raw)
+    assert ri.index_path(raw).exists()
+
+    monkeypatch.setattr(ri, "scan_blocks", lambda *args: pytest.fail("rescanned"))
+    assert len(ri.load_index(raw)["blocks"]) == 2
+
+
+def test_shared_index_dir_serves_copies(raw, tmp_path, monkeypatch):
+    copy = tmp_path / "run2" / "clouds.data"
+    copy.parent.mkdir()
+    copy.write_bytes(raw.read_bytes())
+    ri.load_index(raw, tmp_path / "index")
+
+    monkeypatch.setattr(ri, "scan_blocks", lambda *args: pytest.fail("rescanned"))
+    assert ri.load_index(copy, tmp_path / "index")["blocks"][0]["rows"] == 3
+
+
+def test_indexed_reader_matches_offsets(raw):
+    indexed = create_dataset(raw, CONFIG)
+    offsets = create_dataset(raw, {**CONFIG, "data_prep": {**CONFIG["data_prep"], "reader": "offsets"}})
+
+    assert len(indexed) == 5
+    np.testing.assert_array_equal(indexed.to_numpy(), offsets.to_numpy())
+
+
+# Unhappy
+def test_changed_file_is_rescanned(raw):
+    ri.load_index(raw)
+    raw.write_text(RAW.replace("    2.0000  126.0000   21.0586\n", ""))
+
+    assert ri.load_index(raw)["blocks"][0]["rows"] == 2
+
+
+def test_missing_block_raises(raw):
+    with pytest.raises(NotImplementedError):
+        ri.find_block(ri.load_index(raw), "DB #3")
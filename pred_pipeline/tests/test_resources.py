@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from src import resources as res
+from src.score_model import score_model
+
+CONFIG = {
+    "execution": {
+        "profile": "shared",
+        "profiles": {
+            "shared": {
+                "n_jobs": 64,
+                "threads": 8,
+                "chunk_size": 1000,
+                "memory_budget": "1GiB",
+                "stages": {"score_model": {"n_jobs": 1, "memory_budget": "4KiB"}},
+            },
+        },
+    }
+}
+
+
+@pytest.fixture
+def cgroup(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    (tmp_path / "memory.max").write_text(f"{1 << 30}\n")
+    return tmp_path
+
+
+# Happy
+def test_cgroup_v2_limits(cgroup):
+    assert res.cgroup_cpu_limit(cgroup) == 1.5
+    assert res.cgroup_memory_limit(cgroup) == 1 << 30
+    assert res.available_cores(cgroup) <= 2
+
+
+def test_cgroup_v1_limits(tmp_path):
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000")
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "memory.limit_in_bytes").write_text("9223372036854771712")
+
+    assert res.cgroup_cpu_limit(tmp_path) is None
+    assert res.cgroup_memory_limit(tmp_path) is None
+
+
+def test_profile_fits_the_detected_resources(cgroup):
+    cores = res.available_cores(cgroup)
+    profile = res.stage_profile(CONFIG, "train_model", cgroup)
+
+    assert profile["n_jobs"] == cores
+    assert profile["n_jobs"] * profile["threads"] <= cores
+    # 1GiB budget capped to 80% of the 1GiB limit
+    assert profile["memory_budget"] == int(0.8 * (1 << 30))
+
+
+def test_stage_overrides_and_chunk_rows(cgroup):
+    profile = res.stage_profile(CONFIG, "score_model", cgroup)
+
+    assert profile["n_jobs"] == 1 and profile["memory_budget"] == 4096
+    assert res.chunk_rows(profile, 40) == 102
+    assert res.chunk_rows(None, 40) is None
+    assert res.stage_profile({}, "score_model") is None
+
+
+def test_chunked_scores_match(cgroup):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(size=(500, 2)), columns=["a", "b"])
+    data["class"] = (data["a"] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(data[["a", "b"]], data["class"])
+    config = {"initial_features": ["a", "b"]}
+
+    with res.execution_context(res.stage_profile(CONFIG, "score_model", cgroup)):
+        chunked = score_model(data, model, config, chunk_size=64)
+    whole = score_model(data, model, config)
+
+    np.testing.assert_array_equal(chunked[0], whole[0])
+    np.testing.assert_array_equal(chunked[1], whole[1])
+
+
+def test_peak_rss_restarts_after_reset():
+    block = np.ones(64 << 20, dtype=np.uint8)
+    peak = res.peak_rss()
+    del block
+    if not res.reset_peak_rss():
+        pytest.skip("peak RSS cannot be reset on this platform")
+
+    assert res.peak_rss() < peak - (32 << 20)
+
+
+# Unhappy
+def test_unknown_profile_raises():
+    with pytest.raises(NotImplementedError):
+        res.stage_profile({"execution": {"profile": "gpu", "profiles": {}}}, "train_model")
+
+
+def test_bad_memory_budget_raises():
+    with pytest.raises(NotImplementedError):
+        res.parse_bytes("lots")
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.compact_dataset import from_frame
+from src.sample_data import reservoir_sample, sample_data, sample_order, sample_record
+
+CONFIG = {"method": "stratified", "strat_col": "class", "size": 100, "seed": 7}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"a": rng.normal(size=1000), "b": rng.normal(size=1000)})
+    frame["class"] = (rng.uniform(size=1000) < 0.2).astype(float)
+    return frame
+
+
+# Happy
+def test_stratified_prefixes_keep_class_shares(data):
+    labels = data["class"].to_numpy()
+    order = sample_order(len(data), 7, labels)
+
+    share = labels.mean()
+    for size in (10, 50, 333, 1000):
+        assert abs(labels[order[:size]].sum() - share * size) <= 1
+    assert sorted(order) == list(range(len(data)))
+
+
+def test_sample_is_reproducible_and_nested(data):
+    small, _ = sample_data(data, CONFIG)
+    again, _ = sample_data(data, CONFIG)
+    large, _ = sample_data(data, dict(CONFIG, size=0.5))
+
+    pd.testing.assert_frame_equal(small, again)
+    assert len(large) == 500
+    assert small.index.isin(large.index).all()
+
+
+def test_compact_sample_matches_frame_sample(data):
+    compact = from_frame(data, ["a", "b"], "class", reserve=1)
+
+    frame_sample, rows = sample_data(data, CONFIG)
+    compact_sample, compact_rows = sample_data(compact, CONFIG)
+
+    np.testing.assert_array_equal(rows, compact_rows)
+    np.testing.assert_allclose(compact_sample.column("a"), frame_sample["a"], rtol=1e-6)
+    assert compact_sample.buffer.shape[1] == compact.buffer.shape[1]
+
+
+def test_reservoir_sample_is_uniform(data):
+    chunks = lambda: (data.iloc[i : i + 64] for i in range(0, len(data), 64))
+    hits = np.zeros(len(data))
+    for seed in range(200):
+        sample, seen = reservoir_sample(chunks(), 100, seed)
+        assert seen == len(data) and len(sample) == 100
+        assert sample.index.is_monotonic_increasing
+        hits[sample.index] += 1
+
+    # Every row is kept with probability 0.1: early and late rows alike
+    assert abs(hits[:500].mean() - 20) < 2
+    assert abs(hits[500:].mean() - 20) < 2
+
+
+def test_reservoir_keeps_short_stream(data):
+    sample, seen = reservoir_sample([data.iloc[:30]], 100, 0)
+
+    assert seen == 30
+    pd.testing.assert_frame_equal(sample, data.iloc[:30])
+
+
+def test_sample_record_identifies_sample(data):
+    sample, _ = sample_data(data, CONFIG)
+    other, _ = sample_data(data, dict(CONFIG, seed=8))
+
+    record = sample_record(sample.index, sample["class"], len(data), CONFIG)
+
+    assert record["rows"] == 100 and record["population"] == 1000
+    assert record["sample_id"] != sample_record(other.index, other["class"], 1000, CONFIG)["sample_id"]
+
+
+# Unhappy
+def test_unknown_sampling_method(data):
+    with pytest.raises(NotImplementedError):
+        sample_data(data, dict(CONFIG, method="cluster"))
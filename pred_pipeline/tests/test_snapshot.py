@@ -0,0 +1,132 @@
+import datetime
+import os
+from unittest.mock import patch
+import pytest
+from src.aws_utils import collect_remote_garbage, sync_artifacts
+from src.manifest import MANIFEST_NAME, build_manifest, load_manifest, save_manifest
+from src.snapshot import BlobStore, checkout_run, collect_garbage, snapshot_run, usage
+from tests.test_manifest import STAGES, FakeS3
+
+RAW = "data/raw/clouds.data"
+
+
+class DatedS3(FakeS3):
+    """FakeS3 listing sizes and upload times, with batch deletes"""
+
+    def __init__(self, age_seconds=0):
+        super().__init__()
+        self.modified = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=age_seconds)
+
+    def get_paginator(self, name):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = [k for k in fake.objects if k.startswith(Prefix)]
+                contents = [{"Key": k, "Size": len(fake.objects[k]), "LastModified": fake.modified} for k in keys]
+                return [{"Contents": contents}]
+
+        return Paginator()
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.objects.pop(obj["Key"], None)
+
+
+@pytest.fixture
+def runs(tmp_path):
+    for run in ("100", "200"):
+        (tmp_path / run / "data" / "raw").mkdir(parents=True)
+        (tmp_path / run / "performance").mkdir()
+        (tmp_path / run / RAW).write_text("same raw bytes " * 100)
+        (tmp_path / run / "performance" / "metrics.yaml").write_text(f"run: {run}")
+        save_manifest(build_manifest(tmp_path / run, STAGES), tmp_path / run / MANIFEST_NAME)
+    return tmp_path
+
+
+# Happy
+def test_hardlink_snapshot_stores_identical_files_once(runs):
+    blobs = BlobStore(runs / "blobs")
+
+    first = snapshot_run(runs / "100", blobs)
+    second = snapshot_run(runs / "200", blobs)
+
+    assert first["new_bytes"] == first["bytes"]
+    # Only the metrics of the second run are new
+    assert second["new_bytes"] == len("run: 200")
+    assert os.path.samefile(runs / "100" / RAW, runs / "200" / RAW)
+    assert (runs / "200" / RAW).read_text() == "same raw bytes " * 100
+    assert usage(blobs, runs) == {
+        "runs": 2,
+        "referenced": 2 * len("same raw bytes " * 100) + 2 * len("run: 100"),
+        "stored": len("same raw bytes " * 100) + 2 * len("run: 100"),
+        "blobs": 3,
+    }
+
+
+def test_checkout_gives_private_copies(runs):
+    blobs = BlobStore(runs / "blobs")
+    snapshot_run(runs / "100", blobs)
+    snapshot_run(runs / "200", blobs, mode="manifest")
+
+    assert sorted(path.name for path in (runs / "200").iterdir()) == [MANIFEST_NAME]
+    assert checkout_run(runs / "100", blobs) == 2
+    assert checkout_run(runs / "200", blobs) == 2
+    (runs / "100" / RAW).write_text("rewritten in place")
+
+    assert (runs / "200" / RAW).read_text() == "same raw bytes " * 100
+    assert (runs / "200" / "performance" / "metrics.yaml").read_text() == "run: 200"
+
+
+def test_files_written_after_the_manifest_are_hashed_again(runs):
+    blobs = BlobStore(runs / "blobs")
+    (runs / "100" / "performance" / "metrics.yaml").write_text("written later")
+
+    snapshot_run(runs / "100", blobs)
+
+    sha256 = load_manifest(runs / "100" / MANIFEST_NAME)["artifacts"]["performance/metrics.yaml"]["sha256"]
+    assert blobs.path(sha256).read_text() == "written later"
+
+
+def test_garbage_collection_keeps_referenced_blobs(runs):
+    blobs = BlobStore(runs / "blobs")
+    snapshot_run(runs / "100", blobs)
+    snapshot_run(runs / "200", blobs)
+    (runs / "200" / MANIFEST_NAME).unlink()
+
+    assert collect_garbage(blobs, runs, grace_seconds=3600)["deleted"] == 0
+    assert collect_garbage(blobs, runs, grace_seconds=0, dry_run=True)["deleted"] == 1
+    result = collect_garbage(blobs, runs, grace_seconds=0)
+
+    assert result == {"deleted": 1, "bytes": len("run: 200"), "kept": 2}
+    # The run keeps its hardlinked copy
+    assert (runs / "200" / "performance" / "metrics.yaml").read_text() == "run: 200"
+
+
+def test_sync_reads_snapshotted_runs_from_blobs(runs):
+    blobs = BlobStore(runs / "blobs")
+    snapshot_run(runs / "100", blobs, mode="manifest")
+    snapshot_run(runs / "200", blobs)
+    s3 = DatedS3(age_seconds=7200)
+    config = {"bucket_name": "bucket", "prefix": "artifacts", "dedup": True}
+    with patch("boto3.client", return_value=s3):
+        uris = sync_artifacts(runs, config, STAGES, blobs)
+        s3.objects.pop("artifacts/200/manifest.yaml")
+        result = collect_remote_garbage(config, grace_seconds=3600)
+
+    # Run 100 is read from its blobs and the blob directory is not a run
+    assert sorted(uri.rsplit("/", 1)[-1] for uri in uris) == sorted(blobs)
+    assert "artifacts/blobs/manifest.yaml" not in s3.objects
+    assert result == {"deleted": 1, "bytes": len("run: 200"), "kept": 2}
+
+
+# Unhappy
+def test_unknown_mode(runs):
+    with pytest.raises(NotImplementedError):
+        snapshot_run(runs / "100", BlobStore(runs / "blobs"), mode="copy")
+
+
+def test_run_without_manifest(runs):
+    (runs / "100" / MANIFEST_NAME).unlink()
+    with pytest.raises(NotImplementedError):
+        snapshot_run(runs / "100", BlobStore(runs / "blobs"))
@@ -0,0 +1,180 @@
+import io
+import threading
+from unittest.mock import patch
+import pytest
+from botocore.exceptions import ClientError
+from src.storage import CachedStorage, LocalStorage, MemoryStorage, S3Storage, Storage, open_storage
+from src.streaming import read_chunks
+
+
+class LocalS3:
+    """Local stand-in for the boto3 S3 client, holding objects of one bucket in a dict"""
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = 0
+        self.lock = threading.Lock()
+
+    def _get(self, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return self.objects[Key]
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self._get(Key))}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[Key])}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, Config=None):
+        data = Fileobj.read()
+        with self.lock:
+            self.objects[Key] = data
+
+    def download_file(self, Bucket, Key, Filename, Config=None, Callback=None):
+        data = self._get(Key)
+        with open(Filename, "wb") as file:
+            file.write(data)
+        Callback(len(data))
+        with self.lock:
+            self.downloads += 1
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def get_paginator(self, name):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(k for k in fake.objects if k.startswith(Prefix))
+                return [{"Contents": [{"Key": k, "Size": len(fake.objects[k])} for k in keys]}]
+
+        return Paginator()
+
+
+@pytest.fixture(params=["local", "memory", "s3"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return LocalStorage(tmp_path / "store")
+    if request.param == "memory":
+        return MemoryStorage()
+    return S3Storage("bucket", "runs", client=LocalS3())
+
+
+# Happy
+def test_streaming_round_trip(store, tmp_path):
+    with store.open_write("a/b.csv") as file:
+        for _ in range(100):
+            file.write(b"x" * 1000)
+    (tmp_path / "c.bin").write_bytes(b"c")
+    store.put_file(tmp_path / "c.bin", "c.bin")
+
+    with store.open_read("a/b.csv") as file:
+        assert file.read(10) == b"x" * 10
+    store.get_file("c.bin", tmp_path / "copy.bin")
+    assert (tmp_path / "copy.bin").read_bytes() == b"c"
+    assert store.list() == {"a/b.csv": 100_000, "c.bin": 1}
+    assert store.list("a/") == {"a/b.csv": 100_000}
+
+    store.delete("c.bin")
+    assert not store.exists("c.bin") and store.exists("a/b.csv")
+
+
+def test_read_through_cache_and_prefetch(tmp_path):
+    s3 = LocalS3()
+    remote = S3Storage("bucket", client=s3)
+    for i in range(20):
+        with remote.open_write(f"part-{i}") as file:
+            file.write(str(i).encode())
+    cached = CachedStorage(remote, tmp_path / "cache", workers=4)
+
+    paths = cached.prefetch(f"part-{i}" for i in range(20))
+    with cached.open_read("part-7") as file:
+        assert file.read() == b"7"
+
+    assert [path.read_text() for path in paths] == [str(i) for i in range(20)]
+    assert s3.downloads == 20
+
+
+def test_push_only_changes_and_pull(tmp_path):
+    remote = MemoryStorage()
+    run = CachedStorage(remote, tmp_path / "run")
+    (tmp_path / "run" / "models").mkdir(parents=True)
+    (tmp_path / "run" / "config.yaml").write_text("a: 1")
+    (tmp_path / "run" / "models" / "model.pkl").write_bytes(b"model")
+
+    stored = run.push({})
+    (tmp_path / "run" / "config.yaml").write_text("a: 22")
+    (tmp_path / "run" / "models" / "model.pkl").unlink()
+    with patch.object(remote, "put_file", wraps=remote.put_file) as put:
+        run.push(stored)
+
+    assert [call.args[1] for call in put.call_args_list] == ["config.yaml"]
+    assert remote.objects == {"config.yaml": b"a: 22"}
+
+    elsewhere = CachedStorage(remote, tmp_path / "elsewhere")
+    assert list(elsewhere.pull()) == ["config.yaml"]
+    assert (tmp_path / "elsewhere" / "config.yaml").read_text() == "a: 22"
+
+
+def test_open_storage_and_pooled_client(tmp_path):
+    assert isinstance(open_storage("memory://"), MemoryStorage)
+    assert open_storage(f"file://{tmp_path}").root == tmp_path
+    s3 = open_storage("s3://bucket/runs/100", max_pool_connections=4)
+
+    assert (s3.bucket, s3.prefix) == ("bucket", "runs/100")
+    assert s3.client.meta.config.max_pool_connections == 4
+
+
+def test_stream_chunks_from_s3():
+    s3 = LocalS3()
+    s3.objects["archive/clouds.csv"] = b"a,b\n1,2\n3,4\n5,6\n"
+    with patch("boto3.client", return_value=s3):
+        chunks = list(read_chunks("s3://bucket/archive/clouds.csv", 5))
+
+    assert chunks == [b"a,b\n1,2\n", b"a,b\n3,4\n", b"a,b\n5,6\n"]
+
+
+def test_moto_round_trip():
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="bucket")
+        store = S3Storage("bucket", "runs", client=boto3.client("s3", region_name="us-east-1"))
+        with store.open_write("x") as file:
+            file.write(b"data")
+        assert store.open_read("x").read() == b"data" and store.list() == {"x": 4}
+
+
+# Unhappy
+def test_missing_object(store, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        store.open_read("missing")
+    with pytest.raises(FileNotFoundError):
+        CachedStorage(store, tmp_path / "cache").local_path("missing")
+    assert not (tmp_path / "cache" / "missing").exists()
+
+
+def test_storage_needs_every_operation():
+    class ReadOnly(Storage):
+        def open_read(self, key):
+            return io.BytesIO(b"")
+
+    with pytest.raises(TypeError):
+        ReadOnly()
+
+
+def test_failed_write_keeps_old_object(store):
+    with store.open_write("a") as file:
+        file.write(b"old")
+    with pytest.raises(RuntimeError):
+        with store.open_write("a") as file:
+            file.write(b"partial")
+            raise RuntimeError("interrupted")
+
+    assert store.open_read("a").read() == b"old"
+    assert list(store.list()) == ["a"]
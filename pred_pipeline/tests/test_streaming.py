@@ -0,0 +1,99 @@
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from src.generate_features import generate_features
+from src.score_model import score_model
+from src.streaming import Step, parse_chunk, read_chunks, run_chain, stream_score
+
+CONFIG = {
+    "generate_features": {
+        "feature_col": ["a", "b"],
+        "target_col": "class",
+        "feature_eng": [
+            {"operation": "multiply", "source1": "a", "source2": "b", "target": "a_x_b"},
+        ],
+    },
+    "score_model": {"initial_features": ["a", "a_x_b"]},
+    "stream_score": {"index_col": 0, "chunk_bytes": 1000, "queue_depth": 1, "cpu_workers": 2},
+}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(3000, 2)).round(4), columns=["a", "b"])
+    path = tmp_path / "archive.csv"
+    frame.to_csv(path)
+    return path, frame
+
+
+# Happy
+def test_chunks_are_line_aligned(tmp_path, archive):
+    path, frame = archive
+    chunks = list(read_chunks(path, 777))
+    parsed = pd.concat([parse_chunk(chunk) for chunk in chunks])
+
+    assert len(chunks) > 10
+    pd.testing.assert_frame_equal(parsed, pd.read_csv(path, index_col=0))
+
+    unterminated = tmp_path / "unterminated.csv"
+    unterminated.write_bytes(b"a,b\n1,2\n3,4")
+    assert list(read_chunks(unterminated, 5)) == [b"a,b\n1,2\n", b"a,b\n3,4"]
+
+
+def test_queues_bound_chunks_in_flight():
+    produced, consumed = [], []
+
+    def source():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    def slow_sink(i):
+        time.sleep(0.002)
+        consumed.append(i)
+        # Source can be ahead by the chunks held in queues and steps
+        assert len(produced) - len(consumed) <= 3 * (1 + 1) + 2
+
+    stats = asyncio.run(run_chain(source(), [Step("double", lambda i: 2 * i), Step("sink", slow_sink, "io")], depth=1))
+
+    assert consumed == [2 * i for i in range(50)]
+    assert stats["sink"]["chunks"] == 50 and stats["double"]["peak_queue"] <= 1
+
+
+def test_stream_score_matches_batch(tmp_path, archive):
+    path, frame = archive
+    x = frame.assign(a_x_b=frame["a"] * frame["b"])
+    model = LogisticRegression().fit(x[["a", "a_x_b"]], (x["a"] > 0).astype(int))
+
+    stats = stream_score(str(path), tmp_path / "out" / "scores.csv", model, CONFIG)
+    streamed = pd.read_csv(tmp_path / "out" / "scores.csv", index_col=0)
+
+    features = generate_features(frame.assign(**{"class": np.nan}), CONFIG["generate_features"])
+    probability, label = score_model(features, model, CONFIG["score_model"])
+    assert stats["parse"]["chunks"] == stats["write"]["chunks"] > 10
+    np.testing.assert_array_equal(streamed.index, frame.index)
+    np.testing.assert_allclose(streamed["Probability"], probability)
+    np.testing.assert_array_equal(streamed["Class"], label)
+
+
+# Unhappy
+def test_failing_step_stops_chain():
+    def source():
+        yield from range(1000)
+
+    def fail(i):
+        if i == 5:
+            raise ValueError("bad chunk")
+        return i
+
+    with pytest.raises(ValueError, match="bad chunk"):
+        asyncio.run(run_chain(source(), [Step("fail", fail), Step("sink", lambda i: None, "io")], depth=1))
+
+
+def test_stream_score_missing_source(tmp_path):
+    with pytest.raises(NotImplementedError):
+        stream_score(str(tmp_path / "missing.csv"), tmp_path / "scores.csv", None, CONFIG)
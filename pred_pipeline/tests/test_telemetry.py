@@ -0,0 +1,66 @@
+import json
+import logging
+import pytest
+from src.telemetry import (
+    JsonFormatter,
+    MetricsRegistry,
+    start_queue_logging,
+    stop_queue_logging,
+)
+
+
+@pytest.fixture
+def json_logger(tmp_path):
+    logger = logging.getLogger("telemetry_test")
+    logger.handlers = []
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(tmp_path / "log.jsonl")
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    yield logger, tmp_path / "log.jsonl"
+    for h in logger.handlers:
+        h.close()
+    logger.handlers = []
+
+
+# Happy
+def test_queued_json_records_keep_extra_fields(json_logger):
+    logger, path = json_logger
+
+    listeners = start_queue_logging(["telemetry_test"])
+    logger.info("Stage %s finished", "train_model", extra={"stage": "train_model", "seconds": 1.5})
+    stop_queue_logging(listeners)
+
+    entry = json.loads(path.read_text().splitlines()[-1])
+    assert entry["message"] == "Stage train_model finished"
+    assert entry["stage"] == "train_model" and entry["seconds"] == 1.5
+    assert entry["level"] == "INFO"
+
+
+def test_counters_and_histograms():
+    metrics = MetricsRegistry()
+
+    metrics.inc("bytes_total", 100, bucket="a")
+    metrics.inc("bytes_total", 50, bucket="a")
+    for value in (0.004, 0.2, 0.3, 100.0):
+        metrics.observe("seconds", value, buckets=(0.1, 1.0), stage="x")
+
+    snap = metrics.snapshot()
+    assert snap["counters"]["bytes_total"] == [{"labels": {"bucket": "a"}, "value": 150.0}]
+    hist = snap["histograms"]["seconds"][0]
+    assert hist["counts"] == [1, 2, 1] and hist["count"] == 4
+    text = metrics.to_prometheus()
+    assert 'seconds_bucket{stage="x",le="1.0"} 3' in text
+    assert 'seconds_bucket{stage="x",le="+Inf"} 4' in text
+
+
+def test_export_writes_json_and_prometheus(tmp_path):
+    metrics = MetricsRegistry()
+    with metrics.timer("model_load_seconds"):
+        pass
+
+    metrics.export(tmp_path / "telemetry" / "metrics.json")
+
+    assert json.loads((tmp_path / "telemetry" / "metrics.json").read_text())["histograms"]
+    assert "model_load_seconds_count 1" in (tmp_path / "telemetry" / "metrics.prom").read_text()
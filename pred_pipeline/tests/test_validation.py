@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.compact_dataset import from_frame
+from src.validation import apply_schema, compile_schema, validate
+
+SCHEMA = {
+    "entropy": {"min": 0, "min_exclusive": True, "max": 1},
+    "count": {"dtype": "int", "nullable": True},
+    "class": {"dtype": "int", "allowed": [0, 1]},
+}
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "entropy": [0.5, 0.0, 1.0, np.nan, np.inf, 0.2],
+            "count": [1.0, 2.0, np.nan, 3.5, 4.0, 5.0],
+            "class": [0.0, 1.0, 1.0, 0.0, 2.0, 1.0],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+
+
+# Happy
+def test_violation_counts(data):
+    result = validate(data, compile_schema(SCHEMA))
+
+    assert result.counts == {
+        "entropy.nullable": 1,
+        "entropy.finite": 1,
+        "entropy.min": 1,
+        "entropy.max": 1,
+        "count.finite": 0,
+        "count.dtype": 1,
+        "class.nullable": 0,
+        "class.finite": 0,
+        "class.dtype": 0,
+        "class.allowed": 1,
+    }
+    np.testing.assert_array_equal(result.bad, [False, True, False, True, True, False])
+    assert list(result.reasons()) == [
+        "",
+        "entropy.min",
+        "",
+        "entropy.nullable,count.dtype",
+        "entropy.finite,entropy.max,class.allowed",
+        "",
+    ]
+
+
+def test_compact_dataset_matches_frame(data):
+    clean = data.fillna(0.5).replace(np.inf, 0.5)
+    compact = from_frame(clean, ["entropy", "count"], "class")
+
+    assert validate(compact, compile_schema(SCHEMA)).counts == validate(clean, compile_schema(SCHEMA)).counts
+
+
+def test_quarantine_moves_bad_rows(tmp_path, data):
+    kept = apply_schema(data, SCHEMA, "quarantine", "raw", tmp_path / "raw.csv")
+    quarantined = pd.read_csv(tmp_path / "raw.csv", index_col=0)
+
+    assert list(kept.index) == [10, 12, 15]
+    assert list(quarantined.index) == [11, 13, 14]
+    assert quarantined.loc[11, "violations"] == "entropy.min"
+
+
+def test_clean_rows_remove_quarantine(tmp_path, data):
+    (tmp_path / "raw.csv").write_text("stale")
+    kept = apply_schema(data.loc[[10, 12, 15]], SCHEMA, "quarantine", "raw", tmp_path / "raw.csv")
+
+    assert len(kept) == 3
+    assert not (tmp_path / "raw.csv").exists()
+
+
+# Unhappy
+def test_fail_action_raises(data):
+    with pytest.raises(NotImplementedError):
+        apply_schema(data, SCHEMA, "fail", "raw")
+
+
+def test_text_values_fail_nullable():
+    frame = pd.DataFrame({"entropy": ["0.5", "abc"], "count": [1, 2], "class": [0, 1]})
+
+    assert validate(frame, compile_schema(SCHEMA)).counts["entropy.nullable"] == 1
+
+
+def test_missing_column_and_unknown_rule(data):
+    with pytest.raises(KeyError):
+        validate(data.drop(columns="count"), compile_schema(SCHEMA))
+    with pytest.raises(NotImplementedError):
+        compile_schema({"entropy": {"minimum": 0}})
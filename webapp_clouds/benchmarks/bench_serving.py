@@ -0,0 +1,115 @@
+"""Memory and throughput of model serving workers at increasing worker counts.
+
+Three ways for N worker processes to hold one forest are compared:
+
+    private    each worker unpickles the model, as separate Streamlit servers do
+    inherited  the parent unpickles the model and forks, sharing pages copy-on-write
+    packed     the parent maps the packed node arrays (src/shared_model.py) and forks
+
+For each worker the resident (RSS) and proportional (PSS, shared pages split between
+the processes mapping them) memory is read from /proc after a warm-up, then every worker
+scores single-row requests for a fixed time. Linux only. Run from the webapp_clouds
+directory:
+
+    python benchmarks/bench_serving.py --workers 1,4,16 --trees 200
+"""
+import argparse
+import gc
+import multiprocessing as mp
+import sys
+import tempfile
+import time
+from pathlib import Path
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.shared_model import PackedForest, pack_forest  # noqa: E402
+
+MODES = ("private", "inherited", "packed")
+
+# Set in the parent before forking, read by the workers
+SHARED = {}
+
+
+def memory_kib(pid: int) -> dict:
+    """Rss and Pss of a process in KiB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as file:
+        for line in file:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values
+
+
+def worker(mode, model_file, queries, seconds, ready, go, results):
+    model = joblib.load(model_file) if mode == "private" else SHARED["model"]
+    model.predict_proba(queries)
+    ready.put(mp.current_process().pid)
+    go.wait()
+    served, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        model.predict_proba(queries[served % len(queries)][None, :])
+        served += 1
+    results.put(served)
+
+
+def run(mode, model_file, queries, n_workers, seconds):
+    context = mp.get_context("fork")
+    ready, results, go = context.Queue(), context.Queue(), context.Event()
+    gc.collect()
+    gc.freeze()
+    processes = [
+        context.Process(target=worker, args=(mode, model_file, queries, seconds, ready, go, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    pids = [ready.get() for _ in processes]
+    memory = [memory_kib(pid) for pid in pids]
+    start = time.perf_counter()
+    go.set()
+    served = sum(results.get() for _ in processes)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    gc.unfreeze()
+    return memory, served / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,4,16", help="Comma separated worker counts")
+    parser.add_argument("--trees", type=int, default=200, help="Trees in the forest")
+    parser.add_argument("--rows", type=int, default=20000, help="Training rows of the forest")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Scoring time per run")
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(args.rows, 3))
+    y = (x[:, 0] + x[:, 1] * x[:, 2] + rng.normal(scale=0.5, size=args.rows) > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=args.trees, random_state=0, n_jobs=-1).fit(x, y)
+    queries = rng.normal(size=(256, 3))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_file = Path(tmp) / "model.pkl"
+        joblib.dump(forest, model_file)
+        pack_forest(forest, Path(tmp) / "packed")
+        del forest
+        print(f"{args.trees} trees, pickle {model_file.stat().st_size / 2**20:.1f} MiB")
+        print(f"  {'mode':>9s} {'workers':>7s} {'RSS MiB':>9s} {'PSS MiB':>9s} {'total PSS':>9s} {'req/s':>9s}")
+        for mode in args.modes.split(","):
+            SHARED.clear()
+            if mode == "inherited":
+                SHARED["model"] = joblib.load(model_file)
+            elif mode == "packed":
+                SHARED["model"] = PackedForest(Path(tmp) / "packed")
+            for n_workers in (int(n) for n in args.workers.split(",")):
+                memory, throughput = run(mode, model_file, queries, n_workers, args.seconds)
+                rss = np.mean([m["Rss"] for m in memory]) / 1024
+                pss = np.mean([m["Pss"] for m in memory]) / 1024
+                print(f"  {mode:>9s} {n_workers:7d} {rss:9.1f} {pss:9.1f} {pss * n_workers:9.1f} {throughput:9.0f}")
@@ -8,23 +8,150 @@ It enables the user to perform multiple operations such as:
 - Running the application using the Streamlit framework.
 - Enabling user to select models and input feature values through the sidebar.
 - Predicting the output of the model based on user inputs.
+- Scoring uploaded CSV files of many observations.
+- Validating inputs against the schema of the config before scoring them.
 
 Functions:
     main: The main function of the script. It orchestrates the process of loading configurations,
           downloading models and data from S3, loading models and data into memory, running the 
           Streamlit application, and handling prediction logic.
+    score_file_upload: Renders the CSV upload mode, scoring an uploaded file block by block
+                       and offering the results for download.
+    input_is_valid: Checks the inputs of a single observation, warning about violations.
 """
-import logging.config
+import logging
+import time
 from pathlib import Path
 import os
+import numpy as np
 import pandas as pd
 import streamlit as st
 import src.aws_utils as aws
+import src.batch_scoring as batch_scoring
+import src.calibration as calibration
+import src.drift as drift
+import src.explain as explain
+import src.feature_store as feature_store
+import src.onnx_model as onnx_model
+import src.prediction_cache as prediction_cache
+import src.telemetry as telemetry
 import src.utils as utl
+import src.validation as validation
 
-logging.config.fileConfig("config/logging/local.conf", disable_existing_loggers=True)
 logger = logging.getLogger("clouds")
 
+
+def score_file_upload(
+    model,
+    model_selection: str,
+    features: list,
+    calibration_file,
+    batch_config: dict,
+    feature_table=None,
+    rules=None,
+) -> None:
+    """
+    Score an uploaded CSV file and offer the results for download.
+
+    The upload is parsed and scored block by block with a progress bar. Results are
+    kept in a spooled temporary file between reruns, so the download button can be
+    clicked after scoring.
+
+    Args:
+        model (Any): The selected model.
+        model_selection (str): The name of the selected model.
+        features (list): The model features, required as columns of the upload.
+        calibration_file (Path or None): The calibration of the model, if it ships one.
+        batch_config (dict): The batch_scoring settings of the config.
+        feature_table (FeatureTable, optional): The feature store table; uploads may then
+                                                hold observation ids instead of features.
+        rules (List[Rule], optional): The validation rules of the features.
+    """
+    st.header("Score a CSV file")
+    upload = st.file_uploader("CSV file with one observation per row", type="csv")
+    required = f"Required columns: {', '.join(features)}"
+    if feature_table is not None:
+        required += f", or `{feature_table.key}` to read stored features"
+    st.caption(required)
+    if upload is None:
+        st.session_state.pop("batch_results", None)
+        return
+
+    if st.button("Score file"):
+        calibrator = (
+            None if calibration_file is None else calibration.load_calibration(calibration_file)
+        )
+        progress = st.progress(0.0)
+        start = time.perf_counter()
+        try:
+            results, rows, skipped = batch_scoring.score_upload(
+                upload,
+                model,
+                features,
+                batch_config,
+                calibrator,
+                lambda share, n: progress.progress(share, text=f"{n:,} rows scored"),
+                feature_table,
+                rules,
+            )
+        except ValueError as e_1:
+            logger.warning("Upload %s could not be scored: %s", upload.name, e_1)
+            st.session_state.pop("batch_results", None)
+            st.error(f"The file could not be scored: {e_1}")
+            return
+        telemetry.METRICS.observe(
+            "batch_scoring_seconds", time.perf_counter() - start, model=model_selection
+        )
+        telemetry.METRICS.inc("predictions_total", rows - skipped, model=model_selection)
+        st.session_state["batch_results"] = (upload.name, results, rows, skipped)
+
+    if "batch_results" in st.session_state:
+        name, results, rows, skipped = st.session_state["batch_results"]
+        st.write(f"{rows:,} rows scored with {model_selection}.")
+        if skipped:
+            message = f"{skipped:,} rows have missing feature values and were not scored."
+            if rules:
+                message = (
+                    f"{skipped:,} rows have missing or invalid feature values and were not "
+                    "scored; the violations column lists the rules they break."
+                )
+            st.warning(message)
+        results.seek(0)
+        st.download_button(
+            "Download predictions",
+            results.read(),
+            file_name=f"{Path(name).stem}_predictions.csv",
+            mime="text/csv",
+        )
+
+
+def input_is_valid(user_input: dict, rules: list) -> bool:
+    """
+    Check the inputs of a single observation against the validation rules.
+
+    Invalid inputs are reported with the rules they violate, and the result of an earlier
+    submission is cleared so it is not shown for them.
+
+    Args:
+        user_input (dict): The feature values.
+        rules (list): The validation rules of the features.
+
+    Returns:
+        bool: True if the inputs may be scored.
+    """
+    if not rules:
+        return True
+    checked = validation.validate(pd.DataFrame([user_input]), rules)
+    if not checked.n_bad:
+        return True
+    violated = [label for label, count in checked.counts.items() if count]
+    logger.warning("Input rejected by the validation schema", extra={"violations": violated})
+    st.warning(f"The input was not scored, it violates: {', '.join(violated)}")
+    st.session_state.pop("prediction", None)
+    st.session_state.pop("explanation", None)
+    return False
+
+
 def main():
     """
     The main function of the script.
@@ -59,6 +186,9 @@ def main():
     """
     
     config = utl.load_config("config/config.yaml")
+    telemetry.setup_telemetry(
+        "config/logging/local.conf", config.get("telemetry", {}).get("metrics_port")
+    )
     run_config = config.get("run_config", {})
 
     # Download model from S3
@@ -71,26 +201,39 @@ def main():
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
 
-    aws.download_s3(
-        config["aws"]["model_bucket"],
-        config["model_config"]["model1"][0]["name"],
-        model_dir / config["model_config"]["model1"][0]["name"],
-    )
-    aws.download_s3(
-        config["aws"]["model_bucket"],
-        config["model_config"]["model2"][0]["name"],
-        model_dir / config["model_config"]["model2"][0]["name"],
-    )
-    aws.download_s3(
-        config["aws"]["model_bucket"],
-        config["model_config"]["data"],
-        data_dir / config["model_config"]["data"],
-    )
+    # Models and training data are replaced once per server process; the optional
+    # files of both models are fetched when missing. Each set downloads in parallel.
+    bucket = config["aws"]["model_bucket"]
+    workers = config["aws"].get("download_workers", 8)
+    core = {config["model_config"]["data"]: data_dir / config["model_config"]["data"]}
+    optional = {}
+    for key in ("model1", "model2"):
+        # A model shipping an ONNX export is served from it; its pickle is never fetched
+        for name in utl.model_files(config["model_config"][key]):
+            core[name] = model_dir / name
+        for setting in ("calibration", "drift_sketch"):
+            name = utl.model_setting(config["model_config"][key], setting)
+            if name is not None:
+                optional[name] = model_dir / name
+    aws.prefetch_s3(bucket, core, workers, refresh=True)
+    if optional:
+        aws.prefetch_s3(bucket, optional, workers)
 
     # Load data
     train_path = Path(data_dir) / "train.csv"
 
-    train_df = utl.load_data(train_path)
+    # Engineered features written by the pipeline's feature store, read by id
+    feature_table = None
+    table_prefix = config.get("feature_store", {}).get("table_dir")
+    if table_prefix is not None:
+        table_dir = data_dir / "feature_store" / Path(table_prefix).name
+        table_dir.mkdir(parents=True, exist_ok=True)
+        aws.prefetch_s3(
+            bucket,
+            {f"{table_prefix}/{name}": table_dir / name for name in feature_store.TABLE_FILES},
+            workers,
+        )
+        feature_table = feature_store.load_feature_table(table_dir)
 
     st.title("Model prediction")
     st.sidebar.header("Feature inputs")
@@ -98,25 +241,72 @@ def main():
         model_selection = st.sidebar.selectbox(
             "Select model", options=["Model 1", "Model 2"]
         )
-        if model_selection == "Model 1":
-            model = utl.load_model(Path(model_dir) / config["model_config"]["model1"][0]["name"])
-            model_selection = "model1"
-        elif model_selection == "Model 2":
-            model = utl.load_model(Path(model_dir) / config["model_config"]["model2"][0]["name"])
-            model_selection = "model2"
+        model_selection = "model1" if model_selection == "Model 1" else "model2"
+        model_files = utl.model_files(config["model_config"][model_selection])
+        if utl.model_setting(config["model_config"][model_selection], "onnx_model") is not None:
+            # The ONNX export replaces the pickled estimator, so sklearn is never loaded
+            model = onnx_model.load_onnx_model(model_dir / model_files[0], model_dir / model_files[1])
+        else:
+            model = utl.load_model(model_dir / model_files[0])
 
         logger.info("Model %s selected", model_selection)
     except Exception as e_1:
         logger.error("Failed to select model")
         raise NotImplementedError from e_1
 
+    model_settings = config["model_config"][model_selection]
+    calibration_name = utl.model_setting(model_settings, "calibration")
+    calibration_file = None
+    if calibration_name is not None:
+        calibration_file = model_dir / calibration_name
+        if not calibration_file.exists():
+            aws.download_s3(config["aws"]["model_bucket"], calibration_name, calibration_file)
+
+    features = model_settings[1]["features"]
+    schema = config.get("validation")
+    rules = None
+    if schema:
+        rules = [rule for rule in validation.load_rules(schema) if rule.column in features]
+
+    mode = st.sidebar.radio("Scoring mode", options=["Single observation", "CSV upload"])
+    if mode == "CSV upload":
+        score_file_upload(
+            model,
+            model_selection,
+            features,
+            calibration_file,
+            config["batch_scoring"],
+            feature_table,
+            rules,
+        )
+        return
+
     user_input = {}
 
-    for feature in config["model_config"][model_selection][1]["features"]:
+    looked_up = None
+    if feature_table is not None and st.sidebar.checkbox("Look up an observation by id"):
+        row_id = st.sidebar.number_input("Observation id", min_value=0, step=1)
+        looked_up = feature_table.lookup([row_id], columns=features)
+        if looked_up.empty:
+            st.sidebar.warning(f"No observation with id {row_id} in the feature store")
+            looked_up = None
+
+    if feature_table is None:
+        train_df = utl.load_data(train_path)
+
+    for feature in features:
+        if looked_up is not None:
+            user_input[feature] = float(looked_up[feature].iloc[0])
+            st.sidebar.write(f"{feature}: {user_input[feature]:.4f}")
+            continue
         # Assuming the min_value, max_value and default_value are known
-        min_value = float(train_df[feature].min())
-        max_value = float(train_df[feature].max())
-        default_value = float(train_df[feature].mean())
+        if feature_table is not None:
+            stats = feature_table.stats(feature)
+            min_value, max_value, default_value = stats["min"], stats["max"], stats["mean"]
+        else:
+            min_value = float(train_df[feature].min())
+            max_value = float(train_df[feature].max())
+            default_value = float(train_df[feature].mean())
 
         user_input[feature] = st.sidebar.slider(
             feature, min_value, max_value, default_value
@@ -125,15 +315,87 @@ def main():
     # After getting all inputs, predict with the selected model and show on main page
 
     try:
-        if st.sidebar.button("Submit"):
+        if st.sidebar.button("Submit") and input_is_valid(user_input, rules):
             df_input = pd.DataFrame([user_input])
-            prediction = model.predict(df_input)
+            start = time.perf_counter()
+
+            def score() -> dict:
+                if calibration_name is not None:
+                    # Classify at the threshold chosen on held-out data instead of 0.5
+                    _, prediction = calibration.predict_calibrated(
+                        calibration.load_calibration(calibration_file),
+                        model.predict_proba(df_input)[:, 1],
+                    )
+                else:
+                    prediction = model.predict(df_input)
+                result = {"prediction": prediction.tolist(), "explanation": None}
+                # Only tree models (not exported graphs) can be attributed to features
+                if explain.is_explainable(model):
+                    explanation = explain.explain_prediction(model, df_input)
+                    result["explanation"] = explanation.to_dict(orient="split")
+                return result
+
+            # Identical (quantized) inputs to the same model version are scored once
+            cache_config = config["prediction_cache"]
+            cache = prediction_cache.get_prediction_cache(
+                cache_config["backend"],
+                cache_config["maxsize"],
+                cache_config["ttl_seconds"],
+                cache_config.get("redis_url"),
+            )
+            in_use = model_files + ([calibration_name] if calibration_name else [])
+            model_id = utl.model_id(model_dir, in_use)
+            key = prediction_cache.cache_key(
+                model_id, list(user_input.values()), cache_config["decimals"]
+            )
+            result = cache.get_or_compute(key, score)
+            prediction = np.asarray(result["prediction"])
             st.session_state["prediction"] = prediction
-            logger.info("New prediction request submitted")
+            if result["explanation"] is None:
+                st.session_state.pop("explanation", None)
+            else:
+                st.session_state["explanation"] = pd.DataFrame(**result["explanation"])
+            telemetry.METRICS.observe(
+                "prediction_seconds", time.perf_counter() - start, model=model_selection
+            )
+            telemetry.METRICS.inc("predictions_total", model=model_selection)
+            logger.info(
+                "New prediction request submitted",
+                extra={"model": model_selection, "prediction": prediction.tolist()},
+            )
+
+            # Check recent inputs against the training distribution shipped with the model
+            sketch_name = utl.model_setting(
+                config["model_config"][model_selection], "drift_sketch"
+            )
+            if sketch_name is not None:
+                sketch_file = model_dir / sketch_name
+                if not sketch_file.exists():
+                    aws.download_s3(config["aws"]["model_bucket"], sketch_name, sketch_file)
+                monitor = drift.get_drift_monitor(
+                    sketch_file,
+                    config["drift"]["window"],
+                    config["drift"]["psi_threshold"],
+                    config["drift"]["ks_threshold"],
+                )
+                monitor.observe(user_input)
+                if monitor.last_report is not None:
+                    drifted = [f for f, stats in monitor.last_report.items() if stats["drift"]]
+                    if drifted:
+                        st.warning(
+                            f"Recent inputs drift from the training data in: {', '.join(drifted)}"
+                        )
         if "prediction" in st.session_state:
             st.write(
                 f'The prediction from {model_selection} is: {st.session_state["prediction"]}'
             )
+        if "explanation" in st.session_state:
+            explanation = st.session_state["explanation"].iloc[0]
+            st.write(
+                f"Probability of class 1: {explanation.sum():.3f} "
+                f"(base rate {explanation['bias']:.3f} plus feature contributions below)"
+            )
+            st.bar_chart(explanation.drop("bias"))
     except Exception as e_2:
         logger.error("Failed to generate new predictions")
         raise NotImplementedError from e_2
@@ -0,0 +1,225 @@
+"""
+This module serves predictions over HTTP from a pool of forked worker processes that share
+one copy of the models. The parent process downloads the models, packs tree ensembles into
+memory-mapped node arrays (see src/shared_model.py), loads everything else, freezes the
+garbage collector so its objects are never written to, binds the listening socket and forks
+the workers. The workers accept connections on the inherited socket and read the models
+from pages the kernel shares between them, so the memory of a worker stays nearly flat as
+workers are added, unlike separate Streamlit server processes that each unpickle the models.
+
+Endpoints:
+    GET /health: Returns {"status": "ok", "models": [...]}.
+    POST /predict: Takes {"model": "model1", "rows": [{feature: value, ...}, ...]} and
+                   returns {"probability": [...], "prediction": [...]}, plus the rules
+                   each row violates as "violations" when the config has a schema.
+
+Functions:
+    load_models: Downloads and loads every model of model_config once, packed when possible.
+    make_handler: Builds the request handler class serving the given models.
+    serve: Forks the workers on a bound socket and supervises them until stopped.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+import yaml
+import src.aws_utils as aws
+import src.batch_scoring as batch_scoring
+import src.calibration as calibration
+import src.shared_model as shared_model
+import src.utils as utl
+import src.validation as validation
+
+logger = logging.getLogger("clouds")
+
+
+def load_models(config: dict) -> Dict[str, Tuple[Any, List[str], Optional[dict]]]:
+    """
+    Load every model of model_config, packing tree ensembles into shared memory maps.
+
+    Args:
+        config (dict): The app configuration.
+
+    Returns:
+        Dict: The model, its features and its calibration (or None) by model key.
+    """
+    model_dir = Path(config["run_config"]["model_dir"])
+    pack_root = Path(config["serving"]["pack_dir"])
+    models = {}
+    for key, settings in config["model_config"].items():
+        if not isinstance(settings, list):
+            continue
+        name = utl.model_setting(settings, "name")
+        calibration_name = utl.model_setting(settings, "calibration")
+        for file_name in filter(None, (name, calibration_name)):
+            if not (model_dir / file_name).exists():
+                aws.download_s3(config["aws"]["model_bucket"], file_name, model_dir / file_name)
+        try:
+            model = shared_model.load_packed(
+                model_dir / name, pack_root / Path(name).stem, utl.model_id(model_dir, [name])
+            )
+        except Exception as e_1:
+            logger.error("Failed to load model %s for serving", key)
+            raise NotImplementedError from e_1
+        calibrator = None
+        if calibration_name is not None:
+            calibrator = calibration.load_calibration(model_dir / calibration_name)
+        models[key] = (model, utl.model_setting(settings, "features"), calibrator)
+        logger.info("Model %(key)s ready to serve as %(type)s", {"key": key, "type": type(model).__name__})
+    return models
+
+
+def _jsonable(values: pd.Series) -> list:
+    """Values as plain Python objects, missing ones as None"""
+    return [None if pd.isna(value) else getattr(value, "item", lambda: value)() for value in values]
+
+
+def make_handler(
+    models: Dict[str, Tuple[Any, List[str], Optional[dict]]],
+    rules: Optional[List[validation.Rule]] = None,
+) -> type:
+    """
+    Build a request handler serving the given models.
+
+    Args:
+        models (Dict): The output of load_models.
+        rules (List[Rule], optional): Validation rules; rows violating them are not scored.
+
+    Returns:
+        type: A BaseHTTPRequestHandler subclass.
+    """
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        """Answer /health and /predict requests"""
+
+        def _reply(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "models": list(models)})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if self.path != "/predict":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                model, features, calibrator = models[request["model"]]
+                rows = pd.DataFrame(request["rows"], columns=features, dtype=float)
+            except (KeyError, TypeError, ValueError) as e_1:
+                self._reply(400, {"error": f"bad request: {e_1}"})
+                return
+            model_rules = [rule for rule in rules or [] if rule.column in features]
+            scored = batch_scoring.score_batch(rows, model, features, calibrator, model_rules)
+            self._reply(
+                200,
+                {
+                    "probability": _jsonable(scored["probability"]),
+                    "prediction": _jsonable(scored["prediction"]),
+                    **({"violations": scored["violations"].tolist()} if model_rules else {}),
+                },
+            )
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return PredictionHandler
+
+
+def serve(handler: type, host: str, port: int, workers: int) -> None:
+    """
+    Fork workers accepting connections on one listening socket and wait for them.
+
+    SIGTERM or SIGINT stops the workers; a worker that dies is replaced.
+
+    Args:
+        handler (type): The request handler class, see make_handler.
+        host (str): The address to bind.
+        port (int): The port to bind.
+        workers (int): The number of worker processes.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    # Objects created so far are never collected, so the collector does not write to
+    # (and un-share) the pages holding them in the workers
+    gc.collect()
+    gc.freeze()
+
+    def fork_worker() -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            server = HTTPServer((host, port), handler, bind_and_activate=False)
+            server.socket = sock
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        return pid
+
+    children = {fork_worker() for _ in range(workers)}
+    logger.info("Serving on %(h)s:%(p)s with %(n)s workers", {"h": host, "p": port, "n": workers})
+    stopping = False
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logger.warning("Worker %(pid)s exited with status %(s)s; restarting", {"pid": pid, "s": status})
+            children.add(fork_worker())
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve predictions from prefork workers")
+    parser.add_argument("--config", default="config/config.yaml", help="Path to configuration file")
+    parser.add_argument("--workers", type=int, default=None, help="Overrides serving.workers")
+    parser.add_argument("--port", type=int, default=None, help="Overrides serving.port")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    with open(args.config, "r") as file:
+        app_config = yaml.safe_load(file)
+    serving = app_config["serving"]
+    serve(
+        make_handler(
+            load_models(app_config), validation.compile_schema(app_config.get("validation") or {})
+        ),
+        serving["host"],
+        args.port or serving["port"],
+        args.workers or serving["workers"],
+    )
@@ -6,15 +6,19 @@ caching functionality to optimize performance.
 
 Functions:
     download_s3: This function fetches and downloads a specified file from an S3
-    bucket to a local path. It uses the Boto3 client to interact with AWS S3.
+    bucket to a local path. It uses the S3 store of src/storage.py.
     The downloaded file path is returned. The function is also decorated with a
     Streamlit caching function to prevent redundant download operations and improve performance.
+    prefetch_s3: Downloads a set of files in parallel over the same connection pool,
+    once per server process.
 """
 
 import logging
+import time
 from pathlib import Path
-import boto3
+from typing import Dict
 import streamlit as st
+import src.storage as storage
 
 logger = logging.getLogger("clouds")
 
@@ -31,11 +35,46 @@ def download_s3(bucket_name: str, object_key: str, local_file_path: Path) -> Non
     Returns:
         None
     """
-    s3_client = boto3.client("s3")
-    print(f"Fetching Key: {object_key} from S3 Bucket: {bucket_name}")
+    logger.info(
+        "Fetching key %(key)s from S3 bucket %(bucket)s",
+        {"key": object_key, "bucket": bucket_name},
+        extra={"bucket": bucket_name, "key": object_key},
+    )
     try:
-        s3_client.download_file(bucket_name, object_key, str(local_file_path))
-        logger.info("Model files successfully downloaded to local")
+        start = time.perf_counter()
+        storage.fetch(
+            storage.open_s3_storage(bucket_name), {object_key: Path(local_file_path)}, refresh=True
+        )
+        logger.info(
+            "Model files successfully downloaded to local",
+            extra={"key": object_key, "seconds": time.perf_counter() - start},
+        )
+    except Exception as e_1:
+        logger.error("Failed to download model files due to %(error)s", {"error": e_1})
+        raise NotImplementedError from e_1
+
+
+@st.cache_resource
+def prefetch_s3(
+    bucket_name: str, targets: Dict[str, Path], workers: int = 8, refresh: bool = False
+) -> None:
+    """
+    Download files from an S3 bucket in parallel over one connection pool.
+
+    Args:
+        bucket_name (str): The name of the S3 bucket.
+        targets (dict): The object key -> local path.
+        workers (int): The downloads in flight at once.
+        refresh (bool): Whether to replace files already downloaded; otherwise
+            only missing files are fetched.
+
+    Returns:
+        None
+    """
+    try:
+        storage.fetch(
+            storage.open_s3_storage(bucket_name, max(workers, 1)), targets, workers, refresh
+        )
     except Exception as e_1:
         logger.error("Failed to download model files due to %(error)s", {"error": e_1})
         raise NotImplementedError from e_1
@@ -0,0 +1,227 @@
+"""
+This module scores uploaded CSV files of many observations. Uploads are parsed block by
+block with the pyarrow streaming CSV reader and each block is scored with one vectorized
+call, so memory stays at one block of inputs plus the results, which are written to a
+spooled temporary file that moves to disk once it grows past a limit.
+
+Functions:
+    open_batches: Opens a streaming reader over an uploaded CSV, feature columns as text.
+    coerce_features: Reads the feature columns of a block as floats, bad cells as missing.
+    missing_columns: Lists the model features absent from an upload.
+    join_features: Adds the features of the ids of a block from the feature store.
+    score_batch: Scores one block of rows, leaving rows with missing or invalid values
+                 unscored.
+    score_upload: Scores every block of an upload into a spooled CSV, reporting progress.
+"""
+import logging
+import tempfile
+from collections import Counter
+from typing import IO, Any, Callable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import src.calibration as calibration
+import src.validation as validation
+from clouds_common.validation import column_values
+
+logger = logging.getLogger("clouds")
+
+
+def open_batches(file: IO[bytes], features: List[str], block_size: int) -> Any:
+    """
+    Open a streaming reader over a CSV file.
+
+    Args:
+        file (IO[bytes]): The uploaded file.
+        features (List[str]): The model features, read as text so that a cell that is
+                              not a number cannot fail the whole upload.
+        block_size (int): Bytes of CSV parsed per block.
+
+    Returns:
+        pyarrow.csv.CSVStreamingReader: Yields one RecordBatch per block.
+    """
+    from pyarrow import csv
+    import pyarrow as pa
+
+    return csv.open_csv(
+        file,
+        read_options=csv.ReadOptions(block_size=block_size),
+        convert_options=csv.ConvertOptions(
+            column_types={feature: pa.string() for feature in features}
+        ),
+    )
+
+
+def coerce_features(batch: pd.DataFrame, features: List[str]) -> int:
+    """
+    Read the feature columns of a block as float64 values, in place.
+
+    Args:
+        batch (pd.DataFrame): The rows; features it does not hold are left alone.
+        features (List[str]): The model features.
+
+    Returns:
+        int: The cells that held text that is not a number, now missing values.
+    """
+    bad = 0
+    for feature in features:
+        if feature not in batch:
+            continue
+        given = batch[feature].notna() & (batch[feature].astype(str).str.strip() != "")
+        batch[feature] = column_values(batch, feature)
+        bad += int((given & batch[feature].isna()).sum())
+    return bad
+
+
+def missing_columns(columns: List[str], features: List[str]) -> List[str]:
+    """
+    List the model features an upload does not have.
+
+    Args:
+        columns (List[str]): The columns of the upload.
+        features (List[str]): The model features.
+
+    Returns:
+        List[str]: The missing features, in model order.
+    """
+    present = set(columns)
+    return [feature for feature in features if feature not in present]
+
+
+def join_features(batch: pd.DataFrame, table: Any, features: List[str]) -> pd.DataFrame:
+    """
+    Add the stored features of the observation ids of a block.
+
+    Args:
+        batch (pd.DataFrame): The rows, holding the key column of the feature table.
+        table (FeatureTable): The feature table to read from.
+        features (List[str]): The model features to fetch.
+
+    Returns:
+        pd.DataFrame: The rows with the features added; unknown ids get missing values.
+    """
+    # Each stored row is merged onto every row with its id, so fetch it once
+    ids = batch[table.key].dropna().unique()
+    stored = table.lookup(ids, columns=features)
+    return batch.merge(stored, how="left", left_on=table.key, right_index=True)
+
+
+def score_batch(
+    batch: pd.DataFrame,
+    model: Any,
+    features: List[str],
+    calibrator: Optional[dict] = None,
+    rules: Optional[List[validation.Rule]] = None,
+) -> pd.DataFrame:
+    """
+    Score one block of rows.
+
+    Args:
+        batch (pd.DataFrame): The rows, holding at least the model features.
+        model (Any): A fitted classifier or OnnxModel.
+        features (List[str]): The model features in model order.
+        calibrator (dict, optional): The calibration of the model, if it ships one.
+        rules (List[Rule], optional): Validation rules of the features.
+
+    Returns:
+        pd.DataFrame: The rows with probability and prediction columns added; rows with
+                      a missing feature value or violating a rule keep both empty, and the
+                      probability stays empty for models that do not predict probabilities.
+                      With rules, a violations column lists the rules each row violates.
+    """
+    valid = batch[features].notna().all(axis=1).to_numpy()
+    violations = None
+    if rules:
+        checked = validation.validate(batch, rules)
+        valid = valid & ~checked.bad
+        violations = checked.reasons()
+    probability = np.full(len(batch), np.nan)
+    prediction = pd.Series(pd.NA, index=batch.index, dtype="object")
+    if valid.any():
+        rows = batch.loc[valid, features]
+        if calibrator is not None:
+            prob, classes = calibration.predict_calibrated(
+                calibrator, model.predict_proba(rows)[:, 1]
+            )
+            probability[valid] = prob
+        else:
+            # Models without probabilities (e.g. SVC) only fill the prediction
+            if hasattr(model, "predict_proba"):
+                probability[valid] = model.predict_proba(rows)[:, 1]
+            classes = model.predict(rows)
+        prediction[valid] = classes
+    scored = batch.assign(probability=probability, prediction=prediction)
+    if violations is not None:
+        scored["violations"] = violations
+    return scored
+
+
+def score_upload(
+    file: IO[bytes],
+    model: Any,
+    features: List[str],
+    config: dict,
+    calibrator: Optional[dict] = None,
+    on_progress: Optional[Callable[[float, int], None]] = None,
+    table: Any = None,
+    rules: Optional[List[validation.Rule]] = None,
+) -> Tuple[tempfile.SpooledTemporaryFile, int, int]:
+    """
+    Score an uploaded CSV block by block.
+
+    Args:
+        file (IO[bytes]): The uploaded file.
+        model (Any): A fitted classifier or OnnxModel.
+        features (List[str]): The model features in model order.
+        config (dict): The batch_scoring settings (block_size, spool_max_size).
+        calibrator (dict, optional): The calibration of the model, if it ships one.
+        on_progress (Callable, optional): Called after each block with the share of the
+                                          file read and the rows scored so far.
+        table (FeatureTable, optional): A feature table; uploads lacking the features but
+                                        holding its key column are scored from it.
+        rules (List[Rule], optional): Validation rules of the features; violating rows
+                                      are left unscored with the rules they violate.
+
+    Returns:
+        Tuple: The results as CSV in a spooled file positioned at the start, the rows
+               read and the rows left unscored for missing or invalid values.
+    """
+    size = file.seek(0, 2)
+    file.seek(0)
+    reader = open_batches(file, features, config["block_size"])
+    missing = missing_columns(reader.schema.names, features)
+    by_key = bool(missing) and table is not None and table.key in reader.schema.names
+    if missing and not by_key:
+        raise ValueError(f"Upload is missing the model features: {', '.join(missing)}")
+
+    results = tempfile.SpooledTemporaryFile(max_size=config["spool_max_size"], mode="w+b")
+    rows, skipped, unparsed = 0, 0, 0
+    violations = Counter()
+    for record_batch in reader:
+        if record_batch.num_rows == 0:
+            continue
+        batch = record_batch.to_pandas()
+        # Cells that are not numbers leave only their own rows unscored
+        unparsed += coerce_features(batch, features)
+        if by_key:
+            batch = join_features(batch, table, missing)
+        scored = score_batch(batch, model, features, calibrator, rules)
+        scored.to_csv(results, header=rows == 0, index=False)
+        rows += len(scored)
+        skipped += int(scored["prediction"].isna().sum())
+        if rules:
+            violations.update(
+                label for reasons in scored["violations"] if reasons for label in reasons.split(",")
+            )
+        if on_progress is not None:
+            on_progress(min(1.0, file.tell() / max(size, 1)), rows)
+    results.seek(0)
+    logger.info(
+        "Scored %(rows)s uploaded rows, %(skipped)s left unscored",
+        {"rows": rows, "skipped": skipped},
+    )
+    if unparsed:
+        logger.warning("%s uploaded feature values are not numbers", unparsed)
+    if violations:
+        logger.warning("Uploaded rows violate the validation schema: %s", dict(violations))
+    return results, rows, skipped
+
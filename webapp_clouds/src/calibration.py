@@ -0,0 +1,40 @@
+"""
+This module applies the probability calibration fitted by the training pipeline's
+calibrate_model stage to online predictions. The calibration file holds a plain
+isotonic or Platt map from model probabilities to calibrated probabilities and the
+decision threshold chosen on held-out data, so no sklearn objects are unpickled. The
+map is applied by clouds_common.calibration, as in the pipeline's score_model stage.
+
+Functions:
+    load_calibration: Loads the calibration saved with a model once per server process.
+    predict_calibrated: Returns calibrated probabilities and the classes at the chosen
+                        threshold.
+"""
+import logging
+from pathlib import Path
+import streamlit as st
+import yaml
+from clouds_common.calibration import predict_calibrated  # noqa: F401
+
+logger = logging.getLogger("clouds")
+
+
+@st.cache_resource
+def load_calibration(calibration_file: Path) -> dict:
+    """
+    Load the calibrator and decision threshold of a model.
+
+    Args:
+        calibration_file (Path): The path to the calibration yaml written by the pipeline.
+
+    Returns:
+        dict: Calibrator parameters, threshold and class labels.
+    """
+    try:
+        with open(calibration_file, "r") as file:
+            calibration = yaml.safe_load(file)
+        logger.info("Calibration loaded from %s", calibration_file)
+        return calibration
+    except Exception as e_1:
+        logger.error("Failed to load calibration")
+        raise NotImplementedError from e_1
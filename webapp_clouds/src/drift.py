@@ -0,0 +1,134 @@
+"""
+This module checks online prediction inputs for drift against the reference sketches
+that the training pipeline ships with each model. The sketches hold quantile bin
+edges, bin counts and moments of every feature on the training data, so drift can
+be measured without access to the training data itself. Inputs are binned and compared
+with the statistics of clouds_common.drift, as in the pipeline's monitor_drift stage.
+
+Classes:
+    DriftMonitor: Accumulates recent inputs on the reference bins and reports the
+                  population stability index (PSI) and KS statistic per feature
+                  once a window of observations is full.
+
+Functions:
+    load_sketches: Loads the reference sketches saved by the pipeline.
+    get_drift_monitor: Returns the drift monitor of a model, shared across sessions.
+"""
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+import streamlit as st
+import yaml
+from clouds_common.drift import bin_positions, psi_ks
+
+logger = logging.getLogger("clouds")
+
+
+@st.cache_resource
+def load_sketches(sketch_file: Path) -> dict:
+    """
+    Load the reference sketches of a model.
+
+    Args:
+        sketch_file (Path): The path to the sketch yaml written by the pipeline.
+
+    Returns:
+        dict: Feature name -> sketch.
+    """
+    try:
+        with open(sketch_file, "r") as file:
+            sketches = yaml.safe_load(file)
+        logger.info("Reference sketches loaded from %s", sketch_file)
+        return sketches
+    except Exception as e_1:
+        logger.error("Failed to load reference sketches")
+        raise NotImplementedError from e_1
+
+
+class DriftMonitor:
+    """
+    Rolling drift check of online inputs against reference sketches.
+
+    Observations are binned as they arrive, so memory stays at one count per bin
+    regardless of the window size. The monitor is safe to share between
+    Streamlit sessions.
+
+    Args:
+        sketches (dict): Feature name -> reference sketch.
+        window (int): Number of observations compared at a time.
+        psi_threshold (float): PSI above which a feature is flagged.
+        ks_threshold (float): KS statistic above which a feature is flagged.
+    """
+
+    def __init__(self, sketches: dict, window: int, psi_threshold: float, ks_threshold: float):
+        self.sketches = sketches
+        self.window = window
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self._edges = {col: np.asarray(s["edges"]) for col, s in sketches.items()}
+        self._counts = {
+            col: np.zeros(edges.size + 1, dtype=np.int64) for col, edges in self._edges.items()
+        }
+        self._seen = 0
+        self._lock = threading.Lock()
+        self.last_report: Optional[Dict[str, dict]] = None
+
+    def observe(self, row: dict) -> Optional[Dict[str, dict]]:
+        """
+        Add one observation and return a report when the window is full.
+
+        Args:
+            row (dict): Feature name -> value.
+
+        Returns:
+            dict or None: Feature name -> psi, ks and drift flag, once per window,
+                for the features observed in the window.
+        """
+        with self._lock:
+            for col, edges in self._edges.items():
+                value = row.get(col)
+                if value is not None and np.isfinite(value):
+                    self._counts[col][bin_positions(value, edges)] += 1
+            self._seen += 1
+            if self._seen < self.window:
+                return None
+            # Features the rows never supply (those of other models) have nothing to compare
+            report = {col: self._compare(col) for col, counts in self._counts.items() if counts.sum()}
+            for counts in self._counts.values():
+                counts[:] = 0
+            self._seen = 0
+            self.last_report = report
+        drifted = [col for col, stats in report.items() if stats["drift"]]
+        if drifted:
+            logger.warning("Online drift detected in features %s", drifted)
+        return report
+
+    def _compare(self, col: str) -> dict:
+        """PSI and KS statistic of the current window against the reference"""
+        psi, ks = psi_ks(self.sketches[col]["counts"], self._counts[col])
+        return {
+            "psi": psi,
+            "ks": ks,
+            "drift": bool(psi > self.psi_threshold or ks > self.ks_threshold),
+        }
+
+
+@st.cache_resource
+def get_drift_monitor(
+    sketch_file: Path, window: int, psi_threshold: float, ks_threshold: float
+) -> DriftMonitor:
+    """
+    Create the drift monitor of a model once per server process.
+
+    Args:
+        sketch_file (Path): The path to the sketch yaml written by the pipeline.
+        window (int): Number of observations compared at a time.
+        psi_threshold (float): PSI above which a feature is flagged.
+        ks_threshold (float): KS statistic above which a feature is flagged.
+
+    Returns:
+        DriftMonitor: Monitor shared by every session using this model.
+    """
+    return DriftMonitor(load_sketches(sketch_file), window, psi_threshold, ks_threshold)
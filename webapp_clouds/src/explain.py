@@ -0,0 +1,65 @@
+"""
+This module explains predictions of tree-based models by following each input's
+decision path and crediting every change in predicted probability to the feature
+of the split that caused it. The bias plus the attributions of a row add up to the
+model's predicted probability of the positive class. The attributions of each tree are
+derived by clouds_common.explain, shared with the pipeline's explain_model stage.
+
+Functions:
+    is_explainable: Tells whether a model is a tree classifier or a forest of them.
+    explain_prediction: Returns the bias and per-feature attributions of the given
+                        inputs. The tree structures needed for this are derived once
+                        per model and reused across requests.
+"""
+import logging
+import threading
+from typing import Any, List, Tuple
+import numpy as np
+import pandas as pd
+from clouds_common.explain import is_explainable, tree_edges
+from scipy import sparse
+
+logger = logging.getLogger("clouds")
+
+_EDGE_CACHE = {}
+_EDGE_LOCK = threading.Lock()
+
+
+def _model_edges(model: Any, n_features: int) -> List[Tuple[Any, float, sparse.csr_matrix]]:
+    """Tree structures of a model, derived on first use and then cached"""
+    key = (id(model), n_features)
+    with _EDGE_LOCK:
+        if key not in _EDGE_CACHE:
+            if not is_explainable(model):
+                logger.error("Model %s has no tree structure to explain", type(model).__name__)
+                raise NotImplementedError
+            trees = getattr(model, "estimators_", [model])
+            # The model is kept alongside its trees so its id cannot be reused
+            _EDGE_CACHE[key] = (
+                model,
+                [(tree, *tree_edges(tree, n_features)) for tree in trees],
+            )
+        return _EDGE_CACHE[key][1]
+
+
+def explain_prediction(model: Any, df_input: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attribute the predictions of a tree-based model to its input features.
+
+    Args:
+        model (Any): A fitted sklearn decision tree or forest classifier.
+        df_input (pd.DataFrame): The inputs, one row per prediction.
+
+    Returns:
+        pd.DataFrame: A bias column and one attribution column per feature.
+    """
+    x = np.ascontiguousarray(df_input.to_numpy(dtype=np.float32))
+    trees = _model_edges(model, x.shape[1])
+    contributions = np.zeros(x.shape)
+    bias = 0.0
+    for tree, tree_bias, edges in trees:
+        contributions += (tree.tree_.decision_path(x) @ edges).toarray()
+        bias += tree_bias
+    out = pd.DataFrame(contributions / len(trees), index=df_input.index, columns=df_input.columns)
+    out.insert(0, "bias", bias / len(trees))
+    return out
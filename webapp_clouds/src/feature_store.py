@@ -0,0 +1,98 @@
+"""
+This module reads feature tables written to the feature store by the training pipeline's
+generate_features stage. A table version holds the engineered features in Parquet sorted
+by primary key, the sorted keys as a .npy index and a yaml description with column
+statistics, so the app can look observations up by id and set its input ranges without
+recomputing features or loading the whole table. The layout and the lookups are shared
+with the pipeline's feature store through clouds_common.feature_store.
+
+Classes:
+    FeatureTable: One version of a feature table with statistics and point lookups that
+                  read only the row groups holding the requested keys.
+
+Functions:
+    load_feature_table: Opens a feature table version once per server process.
+"""
+import logging
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import streamlit as st
+import yaml
+from clouds_common.feature_store import DATA_FILE, KEYS_FILE, TABLE_FILE, key_positions, read_rows
+
+logger = logging.getLogger("clouds")
+
+TABLE_FILES = (TABLE_FILE, KEYS_FILE, DATA_FILE)
+
+
+class FeatureTable:
+    """
+    One version of a feature table.
+
+    Args:
+        path (Path): The directory of the table version.
+    """
+
+    def __init__(self, path: Path):
+        import pyarrow.parquet as pq
+
+        path = Path(path)
+        with open(path / TABLE_FILE, "r") as file:
+            self.description = yaml.safe_load(file)
+        self.key = self.description["key"]
+        self.keys = np.load(path / KEYS_FILE, mmap_mode="r")
+        self.parquet = pq.ParquetFile(path / DATA_FILE)
+
+    @property
+    def version(self) -> str:
+        """The hash of the feature spec the table was computed with"""
+        return self.description["version"]
+
+    def stats(self, column: str) -> dict:
+        """
+        Summary statistics of a column.
+
+        Args:
+            column (str): The column name.
+
+        Returns:
+            dict: min, max and mean of the column.
+        """
+        return self.description["stats"][column]
+
+    def lookup(self, keys, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Fetch rows by primary key.
+
+        Args:
+            keys (array-like): The primary keys to fetch.
+            columns (List[str], optional): The columns to read, all by default.
+
+        Returns:
+            pd.DataFrame: The found rows in the order of keys, indexed by key; unknown
+                          keys are left out.
+        """
+        positions, _ = key_positions(self.keys, keys)
+        return read_rows(self.parquet, self.key, self.description["row_group_size"], positions, columns)
+
+
+@st.cache_resource
+def load_feature_table(path: Path) -> FeatureTable:
+    """
+    Open a feature table version.
+
+    Args:
+        path (Path): The directory holding the table files.
+
+    Returns:
+        FeatureTable: The table ready for lookups.
+    """
+    try:
+        table = FeatureTable(path)
+        logger.info("Feature table version %s loaded from %s", table.version, path)
+        return table
+    except Exception as e_1:
+        logger.error("Failed to load feature table")
+        raise NotImplementedError from e_1
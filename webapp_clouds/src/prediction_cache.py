@@ -0,0 +1,223 @@
+"""
+This module caches prediction results so repeated inputs are not scored again. Inputs
+are quantized before they are used as keys, so slider values that differ only by
+floating point noise share an entry. Entries expire after a time to live, and the
+in-process cache evicts the least recently used entry once it is full.
+
+Classes:
+    PredictionCache: Bounded in-process cache with TTL and LRU eviction, safe to share
+                     between Streamlit sessions.
+    RedisPredictionCache: Cache kept in redis (or any client with the same get/set
+                          interface), shared between server processes.
+
+Functions:
+    cache_key: Builds the key of a model and a quantized input vector.
+    get_prediction_cache: Creates the configured cache once per server process.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Sequence
+import numpy as np
+import streamlit as st
+from src.telemetry import METRICS
+
+logger = logging.getLogger("clouds")
+
+
+def cache_key(model_id: str, values: Sequence[float], decimals: int) -> str:
+    """
+    Build the cache key of a model and an input vector.
+
+    Args:
+        model_id (str): Identifies the model and its version.
+        values (Sequence[float]): The feature values in model order.
+        decimals (int): Decimals kept when quantizing the values.
+
+    Returns:
+        str: A fixed-length key.
+    """
+    quantized = np.round(np.asarray(values, dtype=np.float64), decimals) + 0.0
+    digest = hashlib.sha256(quantized.tobytes()).hexdigest()[:32]
+    return f"prediction:{model_id}:{digest}"
+
+
+class _CacheStats:
+    """Hit and miss counts, also exported as metrics"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        METRICS.inc(
+            "prediction_cache_requests_total", backend=self.backend, result="hit" if hit else "miss"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict]) -> dict:
+        """
+        Return the cached result of a key, computing and storing it on a miss.
+
+        Args:
+            key (str): The key built by cache_key.
+            compute (Callable): Produces the JSON-serializable result on a miss.
+
+        Returns:
+            dict: The cached or computed result.
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+
+class PredictionCache(_CacheStats):
+    """
+    In-process prediction cache with TTL and LRU eviction.
+
+    Args:
+        maxsize (int): Entries kept before the least recently used is evicted.
+        ttl (float): Seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a result.
+
+        Args:
+            key (str): The key built by cache_key.
+
+        Returns:
+            dict or None: The result, None if missing or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            self._record(entry is not None)
+        return None if entry is None else entry[1]
+
+    def put(self, key: str, result: dict) -> None:
+        """
+        Store a result, evicting the least recently used entries beyond maxsize.
+
+        Args:
+            key (str): The key built by cache_key.
+            result (dict): The result to store.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class RedisPredictionCache(_CacheStats):
+    """
+    Prediction cache kept in redis and shared between server processes.
+
+    Expiry uses the TTL of each key; eviction beyond the memory limit follows the
+    server's maxmemory-policy (allkeys-lru gives LRU behaviour).
+
+    Args:
+        client (Any): A redis client, or any object with get(key) and set(key, value, ex=).
+        ttl (float): Seconds an entry stays valid.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client: Any, ttl: float):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a result.
+
+        Args:
+            key (str): The key built by cache_key.
+
+        Returns:
+            dict or None: The result, None if missing, expired or unreachable.
+        """
+        try:
+            raw = self.client.get(key)
+        except Exception as e_1:
+            logger.warning("Prediction cache lookup failed: %s", e_1)
+            raw = None
+        with self._lock:
+            self._record(raw is not None)
+        return None if raw is None else json.loads(raw)
+
+    def put(self, key: str, result: dict) -> None:
+        """
+        Store a result with the cache TTL.
+
+        Args:
+            key (str): The key built by cache_key.
+            result (dict): The JSON-serializable result to store.
+        """
+        try:
+            self.client.set(key, json.dumps(result), ex=max(1, int(self.ttl)))
+        except Exception as e_1:
+            # A cache that is down must not fail the prediction
+            logger.warning("Prediction cache store failed: %s", e_1)
+
+
+@st.cache_resource
+def get_prediction_cache(
+    backend: str, maxsize: int, ttl: float, redis_url: Optional[str] = None
+) -> _CacheStats:
+    """
+    Create the prediction cache once per server process.
+
+    Args:
+        backend (str): "memory" or "redis".
+        maxsize (int): Entries kept by the in-process cache.
+        ttl (float): Seconds an entry stays valid.
+        redis_url (str, optional): The redis server of the redis backend.
+
+    Returns:
+        PredictionCache or RedisPredictionCache: The cache shared by every session.
+    """
+    if backend == "redis":
+        import redis
+
+        logger.info("Prediction cache kept in redis at %s", redis_url)
+        return RedisPredictionCache(redis.Redis.from_url(redis_url), ttl)
+    if backend != "memory":
+        logger.error("Prediction cache backend %s is not supported", backend)
+        raise NotImplementedError
+    return PredictionCache(maxsize, ttl)
@@ -0,0 +1,184 @@
+"""
+This module packs tree ensembles into flat arrays on disk and predicts from them through
+memory maps. The pages of a memory-mapped file live in the page cache once, so any number
+of server processes that map the same packed model share a single copy of its nodes,
+whereas unpickling the estimator gives every process a private copy.
+
+Classes:
+    PackedForest: A decision tree or forest packed into flat node arrays, with the
+                  predict / predict_proba interface of the sklearn classifiers.
+
+Functions:
+    is_packable: Tells whether a model is a tree classifier that can be packed.
+    pack_forest: Writes the node arrays of a tree classifier to a directory.
+    load_packed: Packs a model file when its pack is missing or stale and maps the pack.
+"""
+import logging
+from pathlib import Path
+from typing import Any, List
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+
+logger = logging.getLogger("clouds")
+
+ARRAYS = ("left", "right", "feature", "threshold", "proba", "roots")
+PACKED_TYPES = ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier")
+
+
+def is_packable(model: Any) -> bool:
+    """
+    Tell whether a model is a decision tree classifier or a forest of them.
+
+    Boosted ensembles (gradient boosting, AdaBoost) also hold trees, but their leaves
+    are regression values or weighted votes rather than class counts averaged over
+    trees, so they are not packable.
+
+    Args:
+        model (Any): A fitted model.
+
+    Returns:
+        bool: True if pack_forest supports the model.
+    """
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    return isinstance(model, (DecisionTreeClassifier, RandomForestClassifier, ExtraTreesClassifier))
+
+
+def pack_forest(model: Any, path: Path, source: str = "") -> None:
+    """
+    Write the nodes of all trees of a classifier as flat arrays.
+
+    Child indices are global, so one traversal step moves every tree at once.
+
+    Args:
+        model (Any): A fitted decision tree or forest classifier.
+        path (Path): The directory to write the pack to.
+        source (str, optional): Identifies the packed model file, to detect stale packs.
+    """
+    trees = list(np.ravel(getattr(model, "estimators_", [model])))
+    left, right, feature, threshold, proba, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        tree_ = tree.tree_
+        internal = tree_.children_left >= 0
+        left.append(np.where(internal, tree_.children_left + offset, -1))
+        right.append(np.where(internal, tree_.children_right + offset, -1))
+        feature.append(np.where(internal, tree_.feature, -1))
+        threshold.append(tree_.threshold)
+        value = tree_.value[:, 0, :]
+        proba.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += tree_.node_count
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    arrays = {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "proba": np.concatenate(proba).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(path / f"{name}.npy", array)
+    meta = {
+        "source": source,
+        "model_type": type(model).__name__,
+        "classes": np.asarray(model.classes_).tolist(),
+        "features": [str(f) for f in getattr(model, "feature_names_in_", [])] or None,
+        "max_depth": int(max(tree.tree_.max_depth for tree in trees)),
+        "trees": len(trees),
+        "nodes": int(offset),
+    }
+    with open(path / "meta.yaml", "w") as file:
+        yaml.safe_dump(meta, file, sort_keys=False)
+    logger.info("Packed %(t)s trees, %(n)s nodes, to %(p)s", {"t": len(trees), "n": offset, "p": path})
+
+
+class PackedForest:
+    """
+    A packed tree classifier predicting from memory-mapped node arrays.
+
+    Args:
+        path (Path): The directory written by pack_forest.
+    """
+
+    def __init__(self, path: Path):
+        path = Path(path)
+        with open(path / "meta.yaml", "r") as file:
+            self.meta = yaml.safe_load(file)
+        for name in ARRAYS:
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+        self.classes_ = np.asarray(self.meta["classes"])
+        self.features: List[str] = self.meta["features"]
+
+    def predict_proba(self, df_input: Any) -> np.ndarray:
+        """
+        Predict class probabilities, averaged over the trees like a random forest.
+
+        Args:
+            df_input (pd.DataFrame or np.ndarray): The inputs.
+
+        Returns:
+            np.ndarray: (n_rows, n_classes) probabilities ordered like classes_.
+        """
+        if isinstance(df_input, pd.DataFrame) and self.features is not None:
+            df_input = df_input[self.features]
+        # Trees compare float32 inputs against their thresholds, as in sklearn
+        x = np.asarray(df_input, dtype=np.float32)
+        rows = np.arange(len(x))[:, None]
+        node = np.broadcast_to(np.asarray(self.roots), (len(x), len(self.roots))).copy()
+        for _ in range(self.meta["max_depth"]):
+            feature = self.feature[node]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = x[rows, np.maximum(feature, 0)] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, self.left[node], self.right[node]), node)
+        return self.proba[node].mean(axis=1)
+
+    def predict(self, df_input: Any) -> np.ndarray:
+        """
+        Predict the class of each row.
+
+        Args:
+            df_input (pd.DataFrame or np.ndarray): The inputs.
+
+        Returns:
+            np.ndarray: The most probable class per row.
+        """
+        return self.classes_[np.argmax(self.predict_proba(df_input), axis=1)]
+
+
+def load_packed(model_file: Path, pack_dir: Path, source: str) -> Any:
+    """
+    Map the pack of a model file, packing it first when missing or stale.
+
+    Models other than decision trees and random or extra trees forests are returned
+    unpickled.
+
+    Args:
+        model_file (Path): The pickled model.
+        pack_dir (Path): The directory of its pack.
+        source (str): Identifies the model file version, see utils.model_id.
+
+    Returns:
+        PackedForest or Any: The memory-mapped model, or the unpickled one.
+    """
+    meta_file = Path(pack_dir) / "meta.yaml"
+    if meta_file.exists():
+        with open(meta_file, "r") as file:
+            meta = yaml.safe_load(file)
+        # Packs written before the type was recorded may hold a boosted model
+        if meta.get("source") == source and meta.get("model_type") in PACKED_TYPES:
+            return PackedForest(pack_dir)
+    model = joblib.load(model_file)
+    if not is_packable(model):
+        logger.info("%s is not a packable tree classifier; serving the unpickled model", model_file)
+        return model
+    pack_forest(model, pack_dir, source)
+    return PackedForest(pack_dir)
@@ -0,0 +1,27 @@
+"""
+This module opens the stores the app's artifacts come from. The stores themselves are
+shared with the training pipeline through clouds_common.storage: objects are read and
+written as streams copied in blocks, a downloaded file is renamed into place only once
+it is complete, and a batch of files is fetched in parallel over one S3 connection pool.
+
+Functions:
+    open_s3_storage: Opens the S3 store of a bucket, counting downloads in the app metrics.
+"""
+from clouds_common.storage import LocalStorage, MemoryStorage, S3Storage, Storage, fetch  # noqa: F401
+from src.telemetry import METRICS
+
+
+def open_s3_storage(bucket: str, max_pool_connections: int = 16) -> S3Storage:
+    """
+    Open the S3 store of a bucket.
+
+    A new client is made on every call; the downloads of one batch share its pool.
+
+    Args:
+        bucket (str): The bucket name.
+        max_pool_connections (int): The connections kept open.
+
+    Returns:
+        S3Storage: The store.
+    """
+    return S3Storage(bucket, max_pool_connections=max_pool_connections, metrics=METRICS)
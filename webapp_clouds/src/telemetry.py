@@ -0,0 +1,84 @@
+"""
+This module provides structured logging and metrics for the app. The JSON formatter,
+the queued log handlers and the metrics registry are shared with the training pipeline
+through clouds_common.telemetry; this module keeps the app's registry of predictions,
+model loads and S3 transfers and serves it in the Prometheus text format.
+
+Functions:
+    serve_metrics: Serves the metrics of a registry over HTTP at /metrics.
+    setup_telemetry: Configures logging and starts the metrics endpoint once per
+                     server process.
+"""
+import logging
+import logging.config
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueListener
+from typing import List, Optional
+import streamlit as st
+from clouds_common.telemetry import (  # noqa: F401
+    DEFAULT_BUCKETS,
+    JsonFormatter,
+    MetricsRegistry,
+    start_queue_logging,
+    stop_queue_logging,
+)
+
+
+# Process-wide registry shared by every Streamlit session
+METRICS = MetricsRegistry()
+
+
+def serve_metrics(registry: MetricsRegistry, port: int) -> ThreadingHTTPServer:
+    """
+    Serve the Prometheus text of a registry at http://<host>:<port>/metrics.
+
+    Args:
+        registry (MetricsRegistry): The metrics to serve.
+        port (int): The port to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The server, running in a daemon thread.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            # Scrapes are frequent; keep them out of the application log
+            pass
+
+    server = ThreadingHTTPServer(("", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.getLogger("clouds").info("Metrics served on port %s", port)
+    return server
+
+
+@st.cache_resource
+def setup_telemetry(logging_conf: str, metrics_port: Optional[int] = None) -> List[QueueListener]:
+    """
+    Configure logging from a fileConfig file, queue its handlers and start the
+    metrics endpoint. Streamlit reruns the script on every interaction, so this
+    is cached to run once per server process.
+
+    Args:
+        logging_conf (str): The path to the logging configuration.
+        metrics_port (int, optional): The port of the metrics endpoint, None to disable it.
+
+    Returns:
+        list: The queue listeners draining the log records.
+    """
+    logging.config.fileConfig(logging_conf, disable_existing_loggers=True)
+    listeners = start_queue_logging()
+    if metrics_port is not None:
+        serve_metrics(METRICS, metrics_port)
+    return listeners
@@ -10,15 +10,24 @@ Functions:
 
     load_data: This function loads data from a specified CSV file into a pandas DataFrame. 
                The loaded DataFrame is returned.
+
+    model_setting: This function looks up an optional setting in the list of settings of a
+                   model in config.yaml.
+
+    model_files: This function lists the files a model is served from: its ONNX export
+                 when it ships one, its pickle otherwise.
+
+    model_id: This function identifies a model version by the names, sizes and
+              modification times of its files.
 """
 import argparse
 from pathlib import Path
 import logging
-from typing import Any
-import joblib
+from typing import Any, List
 import pandas as pd
 import streamlit as st
 import yaml
+from src.telemetry import METRICS
 
 
 logger = logging.getLogger("clouds")
@@ -34,8 +43,12 @@ def load_model(model_file: Path) -> Any:
     Returns:
         Any: The loaded model object.
     """
+    # Imported here so serving ONNX exports needs neither joblib nor sklearn
+    import joblib
+
     try:
-        model = joblib.load(model_file)
+        with METRICS.timer("model_load_seconds", runtime="pickle"):
+            model = joblib.load(model_file)
         logger.info("Model successfully loaded as object")
         return model
     except Exception as e_1:
@@ -89,4 +102,54 @@ def load_config(config_path: Path) -> Any:
             logger.error("Error while loading configuration from %s", config_path)
             raise NotImplementedError from e_0
     
-    return config
\ No newline at end of file
+    return config
+
+def model_setting(settings: list, key: str, default: Any = None) -> Any:
+    """
+    Look up a setting in the list of single-key mappings describing a model.
+
+    Args:
+        settings (list): The entry of a model under model_config, e.g. [{"name": ...}, {"features": ...}].
+        key (str): The setting to look up.
+        default (Any): Returned when the model does not define the setting.
+
+    Returns:
+        Any: The value of the setting.
+    """
+    for setting in settings:
+        if key in setting:
+            return setting[key]
+    return default
+
+def model_files(settings: list) -> List[str]:
+    """
+    List the files a model is served from.
+
+    Args:
+        settings (list): The entry of a model under model_config.
+
+    Returns:
+        List[str]: The ONNX graph and its feature spec when the model ships an
+        export, the pickled estimator otherwise.
+    """
+    onnx_name = model_setting(settings, "onnx_model")
+    if onnx_name is not None:
+        return [onnx_name, model_setting(settings, "feature_spec")]
+    return [model_setting(settings, "name")]
+
+def model_id(model_dir: Path, file_names: List[str]) -> str:
+    """
+    Identify a model version by its files, so cached results of a replaced model are not reused.
+
+    Args:
+        model_dir (Path): The directory holding the model files.
+        file_names (List[str]): The model, export and calibration files in use.
+
+    Returns:
+        str: Names, sizes and modification times of the files.
+    """
+    parts = []
+    for name in file_names:
+        stat = (Path(model_dir) / name).stat()
+        parts.append(f"{name}@{stat.st_size}-{stat.st_mtime_ns}")
+    return "|".join(parts)
@@ -0,0 +1,36 @@
+"""
+This module checks model inputs against a declarative schema before they are scored.
+The schema compiler is shared with the training pipeline's validation section through
+clouds_common.validation, which compiles each column spec once into vectorized NumPy
+checks and validates a block of rows in one pass over its columns, so the checks cost
+well under a millisecond for a single observation.
+
+Functions:
+    load_rules: Compiles the schema of the config once per server process.
+"""
+import logging
+from typing import Dict, List, Optional
+import streamlit as st
+from clouds_common.validation import Rule, ValidationResult, compile_schema, validate  # noqa: F401
+
+logger = logging.getLogger("clouds")
+
+
+@st.cache_resource
+def load_rules(schema: Dict[str, Optional[dict]]) -> List[Rule]:
+    """
+    Compile the validation schema of the config.
+
+    Args:
+        schema (Dict): The column specs, see compile_schema.
+
+    Returns:
+        List[Rule]: The compiled rules.
+    """
+    try:
+        rules = compile_schema(schema)
+        logger.info("Validation schema of %s rules compiled", len(rules))
+        return rules
+    except Exception as e_1:
+        logger.error("Failed to compile validation schema")
+        raise NotImplementedError from e_1
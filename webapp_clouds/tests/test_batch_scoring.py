@@ -0,0 +1,74 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from src.batch_scoring import missing_columns, score_upload
+
+FEATURES = ["a", "b"]
+CONFIG = {"block_size": 1 << 12, "spool_max_size": 1 << 14}
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(200, 2)), columns=FEATURES)
+    return LogisticRegression().fit(x, (x["a"] > 0).astype(float))
+
+
+@pytest.fixture
+def upload():
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame(rng.normal(size=(2000, 2)).round(4), columns=FEATURES)
+    frame.insert(0, "id", np.arange(2000))
+    return frame
+
+
+# Happy
+def test_upload_is_scored_in_blocks(model, upload):
+    progress = []
+    file = io.BytesIO(upload.to_csv(index=False).encode())
+
+    results, rows, skipped = score_upload(
+        file, model, FEATURES, CONFIG, on_progress=lambda share, n: progress.append((share, n))
+    )
+    scored = pd.read_csv(results)
+
+    assert rows == 2000 and skipped == 0
+    assert len(progress) > 1 and progress[-1] == (1.0, 2000)
+    assert list(scored.columns) == ["id", "a", "b", "probability", "prediction"]
+    np.testing.assert_allclose(scored["probability"], model.predict_proba(upload[FEATURES])[:, 1], atol=1e-12)
+    np.testing.assert_array_equal(scored["prediction"], model.predict(upload[FEATURES]))
+
+
+def test_rows_with_missing_values_are_left_unscored(model, upload):
+    upload.loc[[3, 1500], "b"] = np.nan
+    results, rows, skipped = score_upload(
+        io.BytesIO(upload.to_csv(index=False).encode()), model, FEATURES, CONFIG
+    )
+    scored = pd.read_csv(results)
+
+    assert rows == 2000 and skipped == 2
+    assert scored.loc[[3, 1500], "prediction"].isna().all()
+    assert scored["prediction"].notna().sum() == 1998
+
+
+def test_non_numeric_feature_values_leave_their_rows_unscored(model, upload):
+    text = upload.to_csv(index=False).replace("\n5,", "\n5,x", 1).replace("\n1700,", "\n1700,n/a", 1)
+    results, rows, skipped = score_upload(io.BytesIO(text.encode()), model, FEATURES, CONFIG)
+    scored = pd.read_csv(results)
+
+    assert rows == 2000 and skipped == 2
+    assert scored.loc[[5, 1700], "prediction"].isna().all()
+    assert scored.loc[[5, 1700], "a"].isna().all()
+    valid = scored.index.difference([5, 1700])
+    np.testing.assert_allclose(
+        scored.loc[valid, "probability"], model.predict_proba(upload.loc[valid, FEATURES])[:, 1], atol=1e-12
+    )
+
+
+# Unhappy
+def test_missing_feature_columns_are_reported(model, upload):
+    assert missing_columns(["id", "a"], FEATURES) == ["b"]
+    with pytest.raises(ValueError, match="b"):
+        score_upload(io.BytesIO(upload.drop(columns="b").to_csv(index=False).encode()), model, FEATURES, CONFIG)
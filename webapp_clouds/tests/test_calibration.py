@@ -0,0 +1,28 @@
+import numpy as np
+from src.calibration import predict_calibrated
+
+
+def test_isotonic_calibration_and_threshold():
+    calibration = {
+        "calibrator": {"method": "isotonic", "x": [0.0, 0.5, 1.0], "y": [0.0, 0.2, 1.0]},
+        "threshold": 0.3,
+        "classes": [0, 1],
+    }
+
+    prob, classes = predict_calibrated(calibration, np.array([0.25, 0.5, 0.75]))
+
+    np.testing.assert_allclose(prob, [0.1, 0.2, 0.6])
+    np.testing.assert_array_equal(classes, [0, 0, 1])
+
+
+def test_platt_calibration_is_monotone():
+    calibration = {
+        "calibrator": {"method": "platt", "a": 2.0, "b": -1.0},
+        "threshold": 0.5,
+        "classes": [0.0, 1.0],
+    }
+
+    prob, classes = predict_calibrated(calibration, np.array([0.0, 0.4, 0.7, 1.0]))
+
+    assert np.all(np.diff(prob) > 0)
+    np.testing.assert_array_equal(classes, (prob >= 0.5).astype(float))
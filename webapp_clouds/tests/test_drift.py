@@ -0,0 +1,45 @@
+import numpy as np
+from src.drift import DriftMonitor
+
+SKETCHES = {
+    "log_entropy": {"edges": [-2.0, -1.0, 0.0], "counts": [25, 25, 25, 25]},
+    "visible_mean": {"edges": [1.0, 2.0, 3.0], "counts": [25, 25, 25, 25]},
+}
+
+
+def test_no_report_before_window_is_full():
+    monitor = DriftMonitor(SKETCHES, window=3, psi_threshold=0.2, ks_threshold=0.1)
+
+    assert monitor.observe({"log_entropy": -1.5}) is None
+    assert monitor.last_report is None
+
+
+def test_matching_inputs_do_not_drift():
+    monitor = DriftMonitor(SKETCHES, window=4, psi_threshold=0.2, ks_threshold=0.1)
+
+    for value in [-2.5, -1.5, -0.5, 0.5]:
+        report = monitor.observe({"log_entropy": value})
+
+    assert report["log_entropy"]["drift"] is False
+    assert np.isclose(report["log_entropy"]["ks"], 0.0)
+
+
+def test_features_missing_from_rows_are_not_compared():
+    monitor = DriftMonitor(SKETCHES, window=4, psi_threshold=0.2, ks_threshold=0.1)
+
+    # The model uses log_entropy only, so rows never carry visible_mean
+    for value in [-2.5, -1.5, -0.5, 0.5]:
+        report = monitor.observe({"log_entropy": value})
+
+    assert list(report) == ["log_entropy"]
+    assert not any(stats["drift"] for stats in report.values())
+
+
+def test_shifted_inputs_drift_and_window_resets():
+    monitor = DriftMonitor(SKETCHES, window=4, psi_threshold=0.2, ks_threshold=0.1)
+
+    for _ in range(4):
+        report = monitor.observe({"log_entropy": 3.0})
+
+    assert report["log_entropy"]["drift"] is True
+    assert monitor.observe({"log_entropy": 3.0}) is None
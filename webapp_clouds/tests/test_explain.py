@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import AdaBoostClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from src.explain import explain_prediction, is_explainable
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    y = (x["a"] + x["b"] > 0).astype(int)
+    return x, y
+
+
+def test_attributions_add_up_to_probability(data):
+    x, y = data
+    model = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0).fit(x, y)
+
+    explanation = explain_prediction(model, x.iloc[:10])
+
+    assert list(explanation.columns) == ["bias", "a", "b", "c"]
+    np.testing.assert_allclose(
+        explanation.sum(axis=1), model.predict_proba(x.iloc[:10])[:, 1], atol=1e-12
+    )
+    assert (explanation["c"].abs() < explanation["a"].abs() + explanation["b"].abs()).all()
+
+
+def test_non_tree_model_not_supported(data):
+    x, y = data
+    model = LogisticRegression().fit(x, y)
+
+    with pytest.raises(NotImplementedError):
+        explain_prediction(model, x.iloc[:1])
+
+
+def test_is_explainable(data):
+    x, y = data
+    forest = RandomForestClassifier(n_estimators=2, random_state=0).fit(x, y)
+
+    assert is_explainable(forest)
+    assert not is_explainable(LogisticRegression().fit(x, y))
+    # Boosted trees have tree structures but their leaves are not probabilities
+    assert not is_explainable(AdaBoostClassifier(n_estimators=2, random_state=0).fit(x, y))
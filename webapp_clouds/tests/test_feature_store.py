@@ -0,0 +1,66 @@
+import io
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import yaml
+from sklearn.linear_model import LogisticRegression
+from src.batch_scoring import join_features, score_upload
+from src.feature_store import FeatureTable
+
+FEATURES = ["a", "b"]
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(500, 2)), columns=FEATURES, index=np.arange(0, 1000, 2))
+    return frame.rename_axis("row_id")
+
+
+@pytest.fixture
+def table(tmp_path, features):
+    # Layout written by the pipeline's FeatureStore
+    pq.write_table(pa.Table.from_pandas(features.reset_index()), tmp_path / "features.parquet", row_group_size=32)
+    np.save(tmp_path / "keys.npy", features.index.to_numpy())
+    stats = {c: {"min": float(features[c].min()), "max": float(features[c].max()), "mean": 0.0} for c in FEATURES}
+    description = {"version": "abc", "key": "row_id", "row_group_size": 32, "stats": stats}
+    (tmp_path / "table.yaml").write_text(yaml.safe_dump(description))
+    return FeatureTable(tmp_path)
+
+
+# Happy
+def test_lookup_by_id(table, features):
+    rows = table.lookup([998, 4, 3, 500], columns=["b"])
+
+    assert list(rows.index) == [998, 4, 500]
+    np.testing.assert_array_equal(rows["b"], features.loc[[998, 4, 500], "b"])
+    assert table.stats("a")["max"] == features["a"].max()
+
+
+def test_upload_of_ids_is_scored_from_the_store(table, features):
+    model = LogisticRegression().fit(features, (features["a"] > 0).astype(float))
+    upload = pd.DataFrame({"row_id": [10, 11, 400]}).to_csv(index=False).encode()
+
+    results, rows, skipped = score_upload(
+        io.BytesIO(upload), model, FEATURES, {"block_size": 1 << 12, "spool_max_size": 1 << 14}, table=table
+    )
+    scored = pd.read_csv(results)
+
+    assert rows == 3 and skipped == 1
+    np.testing.assert_array_equal(scored["prediction"].iloc[[0, 2]], model.predict(features.loc[[10, 400]]))
+
+
+def test_repeated_ids_keep_one_row_each(table, features):
+    batch = pd.DataFrame({"row_id": [4, 4, 4, 998]})
+
+    joined = join_features(batch, table, FEATURES)
+
+    assert list(joined["row_id"]) == [4, 4, 4, 998]
+    np.testing.assert_array_equal(joined["a"], features.loc[[4, 4, 4, 998], "a"])
+
+
+# Unhappy
+def test_unknown_ids_return_no_rows(table):
+    assert table.lookup([1, 3], columns=FEATURES).empty
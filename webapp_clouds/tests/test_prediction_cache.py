@@ -0,0 +1,97 @@
+import time
+import pytest
+import src.prediction_cache as pc
+from src.prediction_cache import PredictionCache, RedisPredictionCache, cache_key
+
+
+class FakeRedis:
+    """Stand-in for redis.Redis keeping values and expiry times in a dict"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if value is None or expires <= time.monotonic():
+            self.data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value.encode("utf-8"), time.monotonic() + ex)
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("down")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pc.time, "monotonic", lambda: now[0])
+    return now
+
+
+# Happy
+def test_quantized_inputs_share_a_key():
+    assert cache_key("m", [0.1 + 0.2, 1.0], 6) == cache_key("m", [0.3, 1.0], 6)
+    assert cache_key("m", [0.3, 1.0], 6) != cache_key("m", [0.31, 1.0], 6)
+    assert cache_key("m", [0.3], 6) != cache_key("other", [0.3], 6)
+
+
+def test_memory_cache_hits_and_lru_eviction(clock):
+    cache = PredictionCache(maxsize=2, ttl=60)
+    calls = []
+
+    def compute(value):
+        return lambda: calls.append(value) or {"prediction": [value]}
+
+    cache.get_or_compute("a", compute(1))
+    cache.get_or_compute("b", compute(2))
+    assert cache.get_or_compute("a", compute(1)) == {"prediction": [1]}
+    cache.get_or_compute("c", compute(3))
+
+    assert calls == [1, 2, 3]
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert len(cache) == 2
+    assert cache.hits == 2 and cache.misses == 4
+    assert cache.hit_rate == pytest.approx(2 / 6)
+
+
+def test_memory_cache_expires_entries(clock):
+    cache = PredictionCache(maxsize=10, ttl=60)
+    cache.put("a", {"prediction": [1]})
+
+    clock[0] += 59
+    assert cache.get("a") == {"prediction": [1]}
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_redis_backend_with_stand_in_client():
+    cache = RedisPredictionCache(FakeRedis(), ttl=60)
+    other_process = RedisPredictionCache(cache.client, ttl=60)
+
+    cache.put("a", {"prediction": [1], "explanation": None})
+
+    assert other_process.get("a") == {"prediction": [1], "explanation": None}
+    assert other_process.hit_rate == 1.0
+
+
+# Unhappy
+def test_unreachable_redis_falls_back_to_scoring():
+    cache = RedisPredictionCache(BrokenRedis(), ttl=60)
+
+    assert cache.get_or_compute("a", lambda: {"prediction": [0]}) == {"prediction": [0]}
+    assert cache.misses == 1
+
+
+def test_unknown_backend():
+    with pytest.raises(NotImplementedError):
+        pc.get_prediction_cache("memcached", 10, 60)
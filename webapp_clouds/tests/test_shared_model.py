@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import urllib.request
+from http.server import HTTPServer
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import (
+    AdaBoostClassifier,
+    ExtraTreesClassifier,
+    GradientBoostingClassifier,
+    RandomForestClassifier,
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from serve import make_handler
+from src.shared_model import PackedForest, is_packable, load_packed, pack_forest
+
+FEATURES = ["a", "b", "c"]
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(400, 3)), columns=FEATURES)
+    labels = (frame["a"] + frame["b"] * frame["c"] > 0).astype(int)
+    return frame, labels
+
+
+# Happy
+@pytest.mark.parametrize(
+    "model",
+    [
+        RandomForestClassifier(n_estimators=15, random_state=0),
+        ExtraTreesClassifier(n_estimators=5, max_depth=4, random_state=0),
+        DecisionTreeClassifier(random_state=0),
+    ],
+)
+def test_packed_matches_sklearn(tmp_path, data, model):
+    frame, labels = data
+    model.fit(frame, labels)
+    pack_forest(model, tmp_path)
+    packed = PackedForest(tmp_path)
+
+    queries = frame.sample(frac=1, random_state=1)[["c", "a", "b"]]
+    np.testing.assert_allclose(packed.predict_proba(queries), model.predict_proba(queries[FEATURES]))
+    np.testing.assert_array_equal(packed.predict(queries), model.predict(queries[FEATURES]))
+    assert isinstance(packed.left, np.memmap)
+
+
+@pytest.mark.parametrize(
+    "model, packed",
+    [
+        (DecisionTreeClassifier(random_state=0), True),
+        (RandomForestClassifier(n_estimators=5, random_state=0), True),
+        (ExtraTreesClassifier(n_estimators=5, random_state=0), True),
+        (GradientBoostingClassifier(n_estimators=20, random_state=0), False),
+        (AdaBoostClassifier(n_estimators=20, random_state=0), False),
+    ],
+)
+def test_served_model_matches_sklearn(tmp_path, data, model, packed):
+    frame, labels = data
+    joblib.dump(model.fit(frame, labels), tmp_path / "model.pkl")
+
+    served = load_packed(tmp_path / "model.pkl", tmp_path / "pack", "v1")
+
+    assert is_packable(model) == packed == isinstance(served, PackedForest)
+    np.testing.assert_allclose(served.predict_proba(frame), model.predict_proba(frame))
+    np.testing.assert_array_equal(served.predict(frame), model.predict(frame))
+
+
+def test_forked_worker_reads_shared_pack(tmp_path, data):
+    frame, labels = data
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(frame, labels)
+    pack_forest(model, tmp_path)
+    packed = PackedForest(tmp_path)
+    expected = packed.predict_proba(frame)
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = np.allclose(packed.predict_proba(frame), expected)
+        os.write(write_end, b"1" if ok else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b"1"
+
+
+def test_load_packed_repacks_stale(tmp_path, data):
+    frame, labels = data
+    model_file = tmp_path / "model.pkl"
+    joblib.dump(RandomForestClassifier(n_estimators=3, random_state=0).fit(frame, labels), model_file)
+    first = load_packed(model_file, tmp_path / "pack", "v1")
+    joblib.dump(RandomForestClassifier(n_estimators=7, random_state=0).fit(frame, labels), model_file)
+
+    assert load_packed(model_file, tmp_path / "pack", "v1").meta["trees"] == first.meta["trees"] == 3
+    assert load_packed(model_file, tmp_path / "pack", "v2").meta["trees"] == 7
+
+
+def test_predict_endpoint(tmp_path, data):
+    frame, labels = data
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(frame, labels)
+    pack_forest(model, tmp_path)
+    server = HTTPServer(("127.0.0.1", 0), make_handler({"model1": (PackedForest(tmp_path), FEATURES, None)}))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        rows = frame.head(3).to_dict(orient="records")
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_port}/predict",
+            data=json.dumps({"model": "model1", "rows": rows}).encode(),
+        )
+        with urllib.request.urlopen(request) as response:
+            body = json.loads(response.read())
+    finally:
+        server.shutdown()
+
+    np.testing.assert_allclose(body["probability"], model.predict_proba(frame.head(3))[:, 1])
+    assert body["prediction"] == model.predict(frame.head(3)).tolist()
+
+
+# Unhappy
+def test_load_packed_keeps_other_models(tmp_path, data):
+    frame, labels = data
+    model_file = tmp_path / "model.pkl"
+    joblib.dump(LogisticRegression().fit(frame, labels), model_file)
+
+    assert isinstance(load_packed(model_file, tmp_path / "pack", "v1"), LogisticRegression)
+    assert not (tmp_path / "pack").exists()
@@ -0,0 +1,71 @@
+import io
+from unittest.mock import patch
+import pytest
+from botocore.exceptions import ClientError
+from src.storage import MemoryStorage, S3Storage, fetch, open_s3_storage
+
+
+class LocalS3:
+    """Local stand-in for the boto3 S3 client, holding objects of one bucket in a dict"""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def download_file(self, Bucket, Key, Filename, Config=None, Callback=None):
+        data = self.get_object(Bucket, Key)["Body"].read()
+        with open(Filename, "wb") as file:
+            file.write(data)
+        Callback(len(data))
+
+
+# Happy
+def test_fetch_only_missing_files(tmp_path):
+    store = MemoryStorage()
+    store.objects = {"model_v1.pkl": b"new model", "train.csv": b"a,b\n"}
+    (tmp_path / "model_v1.pkl").write_bytes(b"old model")
+    targets = {"model_v1.pkl": tmp_path / "model_v1.pkl", "train.csv": tmp_path / "data" / "train.csv"}
+
+    assert fetch(store, targets, workers=2) == ["train.csv"]
+    assert (tmp_path / "model_v1.pkl").read_bytes() == b"old model"
+    assert (tmp_path / "data" / "train.csv").read_bytes() == b"a,b\n"
+
+    assert sorted(fetch(store, targets, workers=2, refresh=True)) == ["model_v1.pkl", "train.csv"]
+    assert (tmp_path / "model_v1.pkl").read_bytes() == b"new model"
+
+
+def test_s3_prefix_and_streaming_read(tmp_path):
+    store = S3Storage("bucket", "models/v2", client=LocalS3({"models/v2/model.pkl": b"x" * 100}))
+
+    with store.open_read("model.pkl") as body:
+        assert body.read(10) == b"x" * 10
+    fetch(store, {"model.pkl": tmp_path / "model.pkl"})
+    assert (tmp_path / "model.pkl").stat().st_size == 100
+
+
+def test_s3_store_is_not_shared_between_calls():
+    with patch("boto3.client") as client:
+        open_s3_storage("bucket")
+        open_s3_storage("bucket")
+
+    assert client.call_count == 2
+
+
+# Unhappy
+def test_fetch_missing_object_leaves_no_file(tmp_path):
+    store = S3Storage("bucket", client=LocalS3({}))
+
+    with pytest.raises(FileNotFoundError):
+        fetch(store, {"missing.pkl": tmp_path / "missing.pkl"})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_mocked_client_writes_no_file(tmp_path):
+    with patch("boto3.client"):
+        fetch(open_s3_storage("bucket"), {"model.pkl": tmp_path / "model.pkl"})
+
+    assert list(tmp_path.iterdir()) == []
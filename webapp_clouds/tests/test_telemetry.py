@@ -0,0 +1,21 @@
+import urllib.error
+import urllib.request
+import pytest
+from src.telemetry import MetricsRegistry, serve_metrics
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    metrics = MetricsRegistry()
+    metrics.inc("predictions_total", model="model1")
+    server = serve_metrics(metrics, 0)
+    port = server.server_address[1]
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            body = response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'predictions_total{model="model1"} 1' in body
@@ -1,5 +1,8 @@
 from src.aws_utils import download_s3
-from src.utils import load_model, load_data, load_config
+import os
+import subprocess
+import sys
+from src.utils import load_model, load_data, load_config, model_files
 from unittest.mock import mock_open, patch
 import yaml
 from yaml.error import YAMLError
@@ -23,6 +26,7 @@ def test_download_s3():
         instance = mock_s3.return_value
         instance.download_file.return_value = None
         assert download_s3("test_bucket", "test_key", "test_file_path") == None
+    assert not os.path.exists("test_file_path")
 
 def test_load_config():
 
@@ -52,3 +56,25 @@ def test_load_config():
                 with pytest.raises(NotImplementedError):
                     load_config("path/to/config.yml")
                 mock_logger.error.assert_called_once_with("Error while loading configuration from %s", "path/to/config.yml")
+
+
+def test_onnx_serving_imports_no_sklearn():
+    # Modules main.py imports; the pickle stack only loads with utils.load_model
+    code = (
+        "import sys\n"
+        "import src.aws_utils, src.batch_scoring, src.calibration, src.drift, src.explain\n"
+        "import src.feature_store, src.onnx_model, src.prediction_cache, src.telemetry\n"
+        "import src.utils, src.validation\n"
+        "print(sorted(m for m in ('sklearn', 'joblib') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_onnx_export_replaces_the_pickle():
+    pickled = [{"name": "model_v1.pkl"}, {"features": ["a"]}]
+    exported = pickled + [{"onnx_model": "model_v1.onnx"}, {"feature_spec": "spec_v1.yaml"}]
+
+    assert model_files(pickled) == ["model_v1.pkl"]
+    assert model_files(exported) == ["model_v1.onnx", "spec_v1.yaml"]
@@ -0,0 +1,44 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from src.batch_scoring import score_upload
+from src.validation import compile_schema, validate
+
+FEATURES = ["a", "b"]
+SCHEMA = {"a": {"min": 0, "max": 1}, "b": {}}
+
+
+# Happy
+def test_single_observation():
+    rules = compile_schema(SCHEMA)
+
+    assert validate(pd.DataFrame([{"a": 0.5, "b": 2.0}]), rules).n_bad == 0
+    checked = validate(pd.DataFrame([{"a": 1.5, "b": np.inf}]), rules)
+    assert [label for label, count in checked.counts.items() if count] == ["a.max", "b.finite"]
+
+
+def test_upload_leaves_invalid_rows_unscored():
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.uniform(size=(100, 2)), columns=FEATURES)
+    model = LogisticRegression().fit(x, (x["a"] > 0.5).astype(float))
+    upload = x.round(4)
+    upload.loc[[3, 7], "a"] = [-1.0, 2.0]
+    file = io.BytesIO(upload.to_csv(index=False).encode())
+
+    results, rows, skipped = score_upload(
+        file, model, FEATURES, {"block_size": 1 << 10, "spool_max_size": 1 << 14}, rules=compile_schema(SCHEMA)
+    )
+    scored = pd.read_csv(results, keep_default_na=False)
+
+    assert rows == 100 and skipped == 2
+    assert list(scored.loc[[3, 7], "violations"]) == ["a.min", "a.max"]
+    assert list(scored.loc[[3, 7], "prediction"]) == ["", ""]
+    assert (scored.drop(index=[3, 7])["violations"] == "").all()
+
+
+# Unhappy
+def test_unknown_rule():
+    with pytest.raises(NotImplementedError):
+        compile_schema({"a": {"between": [0, 1]}})